@@ -0,0 +1,199 @@
+"""
+Запуск без интерфейса (cron, планировщик задач, сервер):
+
+    python -m cli fetch  [--days N | --since ДАТА [--until ДАТА] | --last]
+    python -m cli parse  [--since ДАТА [--until ДАТА] | --last] [--profile]
+    python -m cli run    [--days N | --since ДАТА [--until ДАТА] | --last] [--profile]   # fetch + parse
+    python -m cli rebuild-config <id или название> [--profile]
+    python -m cli stats
+
+Ход работы печатается в stderr (и pricelist.jsonl, см. utils.logs), в stdout - одна строка JSON со сводкой.
+Коды возврата: 0 - успешно, 1 - ошибка, 2 - неверные аргументы,
+3 - выполнено частично (часть файлов не удалось разобрать).
+"""
+import argparse
+import contextlib
+import json
+import sys
+import time
+import traceback
+from datetime import datetime, timedelta
+
+EXIT_OK = 0
+EXIT_ERROR = 1
+EXIT_USAGE = 2
+EXIT_PARTIAL = 3
+
+DEFAULT_DAYS = 30
+PROFILE_HELP = "замерить этапы разбора и сохранить отчет рядом с выгрузкой (utils.profiler)"
+
+
+def _local_datetime(value: str) -> datetime:
+    """Дата 'ГГГГ-ММ-ДД' или 'ГГГГ-ММ-ДД ЧЧ:ММ' в системном часовом поясе"""
+    try:
+        return datetime.fromisoformat(value).astimezone()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"неверная дата: {value}")
+
+
+def _period(args) -> tuple[datetime | None, datetime | None]:
+    """Окно --since/--until; при равных датах - до конца дня, как в интерфейсе"""
+    if args.since is None:
+        return None, None
+    until = args.until or datetime.now().astimezone()
+    if until == args.since:
+        until = until + timedelta(days=1)
+    return args.since, until
+
+
+def cmd_fetch(args) -> dict:
+    """Загрузка писем с почты (OptimizedYandexIMAPClient.get_all_prices)"""
+    import crud
+    from ya_client import get_client
+
+    client = get_client()
+    if not client.email or not client.password:
+        raise RuntimeError("Не заданы логин и пароль почты (настройки email_username, email_password)")
+
+    since, until = _period(args)
+    if since is not None:
+        print(f'Загрузка по периоду {since.strftime("%d.%m.%Y %H:%M")} - {until.strftime("%d.%m.%Y %H:%M")}')
+        results = client.get_all_prices(since_date=since, before_date=until, max_folder_workers=args.workers)
+    elif args.last:
+        print('Загрузка по последнему прайсу')
+        results = client.get_all_prices(limit_by_folder=10, max_folder_workers=args.workers)
+    else:
+        print(f'Загрузка по глубине: {args.days} дн.')
+        results = client.get_all_prices(days=args.days, max_folder_workers=args.workers)
+
+    for vendor in crud.list_vendors():
+        crud.set_vendor_last_load(vendor.id, datetime.now())
+    summary = client.progress_tracker.get_summary()
+    return {
+        "emails_total": summary["total"],
+        "emails_processed": summary["processed"],
+        "emails_failed": summary["failed"],
+        "files": len(results),
+        "seconds": round(summary["elapsed_seconds"], 2),
+    }
+
+
+def cmd_parse(args) -> dict:
+    """Разбор сохраненных вложений и выгрузка общего прайса (utils.parser_logic.parse)"""
+    from utils.parser_logic import parse
+
+    profile = True if args.profile else None
+    since, until = _period(args)
+    if since is not None:
+        return parse(start_dt=since, end_dt=until, profile=profile)
+    return parse(limit=args.last, profile=profile)
+
+
+def cmd_run(args) -> dict:
+    """Загрузка и разбор за один запуск"""
+    return {"fetch": cmd_fetch(args), "parse": cmd_parse(args)}
+
+
+def cmd_rebuild_config(args) -> dict:
+    """Пересборка одной конфигурации (utils.parser_logic.rebuild_config)"""
+    import crud
+    from utils.parser_logic import rebuild_config
+
+    config_id = int(args.config) if args.config.isdigit() else None
+    if config_id is None:
+        config = crud.get_config_by_name(args.config)
+        if config is None:
+            raise RuntimeError(f"Конфигурация не найдена: {args.config}")
+        config_id = config.id
+    return rebuild_config(config_id, profile=True if args.profile else None)
+
+
+def cmd_stats(args) -> dict:
+    """Сводка по БД и ожидающим изменениям правил и конфигураций"""
+    import crud
+    from utils.db import DB_FILE
+
+    stats = crud.get_stats()
+    changes = crud.resolve_changes()
+    stats["refetch_vendors"] = len(changes.refetch_vendor_ids)
+    stats["reparse_attachments"] = sum(len(ids) for ids in changes.reparse.values())
+    stats["db_file"] = DB_FILE
+    return stats
+
+
+def _failed(summary: dict) -> int:
+    """Сколько файлов не удалось разобрать (в том числе во вложенных сводках)"""
+    return summary.get("failed", 0) + sum(_failed(v) for v in summary.values() if isinstance(v, dict))
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m cli", description="Загрузка и разбор прайс-листов без интерфейса")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    def add_period(p, fetch: bool):
+        group = p.add_mutually_exclusive_group()
+        group.add_argument("--since", type=_local_datetime, help="начало периода (ГГГГ-ММ-ДД[ ЧЧ:ММ])")
+        group.add_argument("--last", action="store_true", help="только последний прайс каждой конфигурации")
+        if fetch:
+            group.add_argument("--days", type=int, default=DEFAULT_DAYS, help="глубина загрузки в днях")
+        p.add_argument("--until", type=_local_datetime, help="конец периода (по умолчанию - сейчас)")
+
+    fetch = commands.add_parser("fetch", help="загрузить письма с почты")
+    add_period(fetch, fetch=True)
+    fetch.add_argument("--workers", type=int, default=10, help="сколько папок сканировать одновременно")
+    fetch.set_defaults(handler=cmd_fetch)
+
+    parse = commands.add_parser("parse", help="разобрать сохраненные вложения и выгрузить общий прайс")
+    add_period(parse, fetch=False)
+    parse.add_argument("--profile", action="store_true", help=PROFILE_HELP)
+    parse.set_defaults(handler=cmd_parse)
+
+    run = commands.add_parser("run", help="загрузить письма и разобрать их")
+    add_period(run, fetch=True)
+    run.add_argument("--workers", type=int, default=10, help="сколько папок сканировать одновременно")
+    run.add_argument("--profile", action="store_true", help=PROFILE_HELP)
+    run.set_defaults(handler=cmd_run)
+
+    rebuild = commands.add_parser("rebuild-config", help="пересобрать одну конфигурацию")
+    rebuild.add_argument("config", help="id или название конфигурации")
+    rebuild.add_argument("--profile", action="store_true", help=PROFILE_HELP)
+    rebuild.set_defaults(handler=cmd_rebuild_config)
+
+    stats = commands.add_parser("stats", help="сводка по БД")
+    stats.set_defaults(handler=cmd_stats)
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = build_parser()
+    try:
+        args = parser.parse_args(argv)
+    except SystemExit as e:
+        return EXIT_OK if e.code == 0 else EXIT_USAGE
+    if getattr(args, "until", None) is not None and getattr(args, "since", None) is None:
+        parser.print_usage(sys.stderr)
+        print("--until указывается вместе с --since", file=sys.stderr)
+        return EXIT_USAGE
+
+    from utils.logs import setup_logging
+    setup_logging()
+
+    started = time.perf_counter()
+    result = {"command": args.command, "started_at": datetime.now().astimezone().isoformat(timespec="seconds")}
+    # Вывод конвейера - в stderr, чтобы stdout содержал только сводку
+    with contextlib.redirect_stdout(sys.stderr):
+        try:
+            summary = args.handler(args)
+            code = EXIT_PARTIAL if _failed(summary) else EXIT_OK
+            result.update(status="partial" if code == EXIT_PARTIAL else "ok", summary=summary)
+        except Exception as e:
+            traceback.print_exc()
+            code = EXIT_ERROR
+            result.update(status="error", error=f"{type(e).__name__}: {e}")
+    result["seconds"] = round(time.perf_counter() - started, 2)
+    print(json.dumps(result, ensure_ascii=False, default=str))
+    return code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
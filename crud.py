@@ -1,21 +1,33 @@
 # crud.py
 import json
+import logging
 import os
-from datetime import datetime, timedelta
+from dataclasses import replace
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
 
-from sqlalchemy import select, update
+from sqlalchemy import select, update, func, case, and_, or_, not_, literal_column
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.exc import NoResultFound, IntegrityError
 from sqlalchemy.orm import selectinload, joinedload
 
 from models.email import RefFiltersConfigs
-from utils.db import SessionLocal
-from models import Role, Vendor, ParsingConfig, RoleMapping, Filters, Settings, Letter, Attachment
+from models.versions import CONFIG, FILTER
+from utils.config_matcher import FilenameMatcher
+from utils.db import SessionLocal, ReadSessionLocal
+from utils.parse_plan import ParsePlan, VendorPlan, ConfigPlan, RulePlan, AttachmentCandidate, ChangeSet
+from models import Role, Vendor, ParsingConfig, RoleMapping, Filters, Settings, Letter, Attachment, MasterPrice, \
+    ParsedAttachment, EntityVersion, Run, RunStage
 from utils.paths import pm
 
+log = logging.getLogger(__name__)
+
+# Сколько id передается в одном IN (...): длинные списки SQLite читает полным сканированием
+IN_CHUNK = 500
+
 
 def list_email_filters():
-    with SessionLocal() as s:
+    with ReadSessionLocal() as s:
         r = s.query(Filters).options(joinedload(Filters.vendor)).all()
         return s.query(Filters).all()
 
@@ -32,9 +44,9 @@ def add_email_filter(filter: Filters):
             s.commit()
             s.refresh(v)
         filter.vendor_id = v.id
+        filter_changed(s, filter.id)
         s.commit()
         s.refresh(filter)
-        filter_changed(filter.id)
         return filter
 
 
@@ -51,17 +63,17 @@ def set_email_filter_vendor_id(filter_id: int, vendor_id: int):
 
 
 def get_email_filter(filter_id: int):
-    with SessionLocal() as s:
+    with ReadSessionLocal() as s:
         return s.query(Filters).options(joinedload(Filters.vendor)).filter(Filters.id == filter_id).first()
 
 
 def get_email_filter_by_vendor(vendor_id: int):
-    with SessionLocal() as s:
+    with ReadSessionLocal() as s:
         return s.query(Filters).options(joinedload(Filters.vendor)).filter(Filters.vendor_id == vendor_id).first()
 
 
 def get_email_filter_by_name(name: str):
-    with SessionLocal() as s:
+    with ReadSessionLocal() as s:
         return s.query(Filters).options(joinedload(Filters.vendor)).filter(Filters.name == name).first()
 
 
@@ -91,9 +103,6 @@ def update_email_filter(filter_id: int, filter: Filters):
             db_filter.extensions = filter.extensions
             db_filter.active = db_filter.active  # Исправлено: было db_filter.active
 
-            s.commit()
-            s.refresh(db_filter)
-
             # Сравниваем старые и новые значения
             new_values = {
                 'name': db_filter.name,
@@ -107,7 +116,9 @@ def update_email_filter(filter_id: int, filter: Filters):
             }
 
             if old_values != new_values:
-                filter_changed(filter_id)
+                filter_changed(s, filter_id)
+            s.commit()
+            s.refresh(db_filter)
             return db_filter
         else:
             raise NoResultFound("Filter not found")
@@ -119,20 +130,20 @@ def delete_email_filter(filter_id: int):
         # cfgs: list[ParsingConfig] = ...
         if db_filter:
             s.delete(db_filter)
+            filter_changed(s, filter_id)
             s.commit()
             v = s.query(Vendor).filter(Vendor.id == db_filter.vendor_id).first()
             if v:
                 s.delete(v)
                 s.commit()
                 s.refresh(v)
-            filter_changed(filter_id)
             return True
         else:
             raise NoResultFound("Filter not found")
 
 
 def get_settings():
-    with SessionLocal() as s:
+    with ReadSessionLocal() as s:
         settings = s.query(Settings).all()
         return {item.setting: item.value for item in settings}
 
@@ -162,12 +173,12 @@ def add_role(name: str, required: bool = False):
 
 
 def list_roles():
-    with SessionLocal() as s:
+    with ReadSessionLocal() as s:
         return s.query(Role).order_by(Role.id).all()
 
 
 def get_role_by_name(name: str):
-    with SessionLocal() as s:
+    with ReadSessionLocal() as s:
         return s.query(Role).filter_by(name=name).first()
 
 
@@ -215,18 +226,72 @@ def toggle_vendor(id: int):
 
 
 def list_vendors() -> list[Vendor]:
-    with SessionLocal() as s:
+    with ReadSessionLocal() as s:
         return s.query(Vendor).order_by(Vendor.name).all()
 
 
-def cfg_changed(id: int):
-    with open(Path(pm.get_user_data() / str(id)), "w") as f:
-        f.write(datetime.now().isoformat())
+def bump_version(s, entity: str, entity_id: int):
+    """
+    Увеличивает версию сущности (models.versions) в транзакции сессии s:
+    версия фиксируется тем же commit, что и само изменение.
+    """
+    now = datetime.now()
+    stmt = sqlite_insert(EntityVersion).values(entity=entity, entity_id=entity_id, version=1, changed_at=now)
+    s.execute(stmt.on_conflict_do_update(
+        index_elements=[EntityVersion.entity, EntityVersion.entity_id],
+        set_={"version": EntityVersion.version + 1, "changed_at": now},
+    ))
+
+
+def cfg_changed(s, id: int):
+    bump_version(s, CONFIG, id)
+
+
+def filter_changed(s, id: int):
+    bump_version(s, FILTER, id)
 
 
-def filter_changed(id: int):
-    with open(Path(pm.get_user_data() / f"v{id}"), "w") as f:
-        f.write(datetime.now().isoformat())
+def get_changed_at(entity: str, ids) -> dict[int, datetime]:
+    """{id: время последнего изменения} для сущностей, которые менялись"""
+    changed = {}
+    with ReadSessionLocal() as s:
+        for chunk in _chunks(ids):
+            stmt = (
+                select(EntityVersion.entity_id, EntityVersion.changed_at)
+                .where(EntityVersion.entity == entity)
+                .where(EntityVersion.entity_id.in_(chunk))
+            )
+            changed.update(dict(s.execute(stmt).all()))
+    return changed
+
+
+def resolve_changes() -> ChangeSet:
+    """
+    Что нужно обновить после изменений правил и конфигураций:
+    - поставщики, правило фильтрации которых изменилось после последней загрузки,
+      сканируются заново (уже сохраненные письма не пропускаются);
+    - вложения, разобранные до изменения своей конфигурации, только разбираются повторно.
+    """
+    with ReadSessionLocal() as s:
+        refetch = (
+            select(Filters.vendor_id)
+            .join(EntityVersion, and_(EntityVersion.entity == FILTER, EntityVersion.entity_id == Filters.id))
+            .join(Vendor, Vendor.id == Filters.vendor_id)
+            .where(or_(Vendor.last_load.is_(None), EntityVersion.changed_at >= Vendor.last_load))
+        )
+        reparse = (
+            select(ParsedAttachment.config_id, ParsedAttachment.attachment_id)
+            .join(EntityVersion, and_(EntityVersion.entity == CONFIG,
+                                      EntityVersion.entity_id == ParsedAttachment.config_id))
+            .where(ParsedAttachment.parsed_at < EntityVersion.changed_at)
+        )
+        attachments = {}
+        for config_id, attachment_id in s.execute(reparse):
+            attachments.setdefault(config_id, []).append(attachment_id)
+        return ChangeSet(
+            refetch_vendor_ids=frozenset(v for v in s.scalars(refetch) if v is not None),
+            reparse={config_id: tuple(ids) for config_id, ids in attachments.items()},
+        )
 
 
 def set_vendor_last_load(vendor_id: int, last_load: datetime):
@@ -241,12 +306,12 @@ def set_vendor_last_load(vendor_id: int, last_load: datetime):
 
 
 def get_vendor_by_name(name: str):
-    with SessionLocal() as s:
+    with ReadSessionLocal() as s:
         return s.query(Vendor).filter_by(name=name).first()
 
 
 def get_vendor_name_by_id(id: int):
-    with SessionLocal() as s:
+    with ReadSessionLocal() as s:
         try:
             return s.query(Vendor).filter_by(id=id).first().name
         except AttributeError:
@@ -254,7 +319,7 @@ def get_vendor_name_by_id(id: int):
 
 
 def get_config_by_name(name: str):
-    with SessionLocal() as s:
+    with ReadSessionLocal() as s:
         try:
             return s.query(ParsingConfig).filter_by(name=name).first()
         except AttributeError:
@@ -347,7 +412,7 @@ def save_config(
             s.flush()
             # добавляем mappings ниже (поскольку их не было)
             existing = {}
-            cfg_changed(cfg.id)
+            cfg_changed(s, cfg.id)
         else:
             # обновляем header_row и vendor_id при изменении
             updated = False
@@ -386,7 +451,7 @@ def save_config(
                 # ничего менять не нужно — завершаем (но всё равно коммитим возможные vendor/header изменения)
                 if updated:
                     s.add(cfg)
-                    cfg_changed(cfg.id)
+                    cfg_changed(s, cfg.id)
                 s.commit()
                 s.refresh(cfg)
                 return cfg
@@ -419,7 +484,7 @@ def save_config(
                 for r in rows:
                     s.delete(r)
                 s.flush()
-                cfg_changed(cfg.id)
+                cfg_changed(s, cfg.id)
 
             # Для каждой требуемой роли — обновим или создадим mapping
             for role_name, col_name in roles_mapping.items():
@@ -430,7 +495,7 @@ def save_config(
                     role = Role(name=role_name, required=False)
                     s.add(role)
                     s.flush()  # чтобы получить role.id
-                    cfg_changed(cfg.id)
+                    cfg_changed(s, cfg.id)
 
                 # найдем существующий RoleMapping для (cfg.id, role.id)
                 stmt_map = (
@@ -446,7 +511,7 @@ def save_config(
                         mapping = RoleMapping(config_id=cfg.id, role_id=role.id, column_name=col_name)
                         s.add(mapping)
                         s.flush()
-                        cfg_changed(cfg.id)
+                        cfg_changed(s, cfg.id)
                     except IntegrityError:
                         s.rollback()
                         # попытка создать еще раз — на случай гонки
@@ -466,7 +531,7 @@ def save_config(
                     if mapping.column_name != col_name:
                         mapping.column_name = col_name
                         s.add(mapping)
-                        cfg_changed(cfg.id)
+                        cfg_changed(s, cfg.id)
 
         # --- 4. Финализируем ---
         s.commit()
@@ -480,8 +545,8 @@ def delete_config(config_id: int):
         cfg = s.query(ParsingConfig).filter_by(id=config_id).first()
         if cfg:
             s.delete(cfg)
+            cfg_changed(s, config_id)
             s.commit()
-            cfg_changed(config_id)
             return True
         else:
             return False
@@ -489,7 +554,7 @@ def delete_config(config_id: int):
 
 def load_config_by_name(config_name: str, vendor_name: str | None = None):
     """Возвращает dict {'id', 'name', 'vendor', 'header_row', 'roles_mapping'} или None"""
-    with SessionLocal() as s:
+    with ReadSessionLocal() as s:
         if vendor_name:
             vendor = s.query(Vendor).filter_by(name=vendor_name).first()
         cfg = s.query(ParsingConfig).filter_by(name=config_name)
@@ -510,7 +575,7 @@ def load_config_by_name(config_name: str, vendor_name: str | None = None):
 
 
 def list_configs_for_vendor(vendor_name: str) -> list[ParsingConfig]:
-    with SessionLocal() as session:
+    with ReadSessionLocal() as session:
         stmt = (
             select(ParsingConfig)
             .join(ParsingConfig.vendor)  # Предполагаем отношение vendor в ParsingConfig
@@ -526,7 +591,7 @@ def list_configs_for_vendor(vendor_name: str) -> list[ParsingConfig]:
 
 
 def list_configs_for_vendor_id(vendor_id: int) -> list[ParsingConfig]:
-    with SessionLocal() as session:
+    with ReadSessionLocal() as session:
         stmt = (
             select(ParsingConfig)
             .join(ParsingConfig.vendor)  # Предполагаем отношение vendor в ParsingConfig
@@ -557,7 +622,7 @@ def list_configs_for_vendor_dict(vendor_name: str) -> dict:
 
 
 def list_all_configs():
-    with SessionLocal() as s:
+    with ReadSessionLocal() as s:
         stmt = (
             select(ParsingConfig)
             .join(ParsingConfig.vendor)  # Предполагаем отношение vendor в ParsingConfig
@@ -576,7 +641,7 @@ def validate_config(config_name: str):
     Проверяет, что конфиг содержит все обязательные роли (из таблицы roles.required=True).
     Возвращает (True, None) или (False, ["role1", "role2"])
     """
-    with SessionLocal() as s:
+    with ReadSessionLocal() as s:
         cfg = s.query(ParsingConfig).filter_by(name=config_name).first()
         if not cfg:
             return False, ["config_not_found"]
@@ -608,7 +673,7 @@ def update_letter(letter: Letter):
 
 
 def list_letters(vendor_id: int | None = None, days: int | None = None):
-    with SessionLocal() as s:
+    with ReadSessionLocal() as s:
         q = (
             s.query(Letter)
             .options(selectinload(Letter.attachments))
@@ -622,12 +687,12 @@ def list_letters(vendor_id: int | None = None, days: int | None = None):
 
 
 def find_attachment_by_filename(filename: str):
-    with SessionLocal() as s:
+    with ReadSessionLocal() as s:
         return s.query(Attachment).filter(Attachment.file_name == filename).first()
 
 
 def list_letters_email_ids(vendor_ids: list[int] | None):
-    with SessionLocal() as s:
+    with ReadSessionLocal() as s:
         stmt = select(Letter.letter_id)
         if vendor_ids:
             stmt = stmt.where(Letter.vendor_id.in_(vendor_ids))
@@ -643,14 +708,14 @@ def add_attachment(attachment: Attachment):
 
 
 def list_attachments_by_vendor(vendor_id: int):
-    with SessionLocal() as s:
+    with ReadSessionLocal() as s:
         letters = s.query(Letter).options(selectinload(Letter.attachments)).filter(Letter.vendor_id == vendor_id).all()
         attachments = [a for l in letters for a in l.attachments]
         return attachments
 
 
 def list_attachments_by_letter(letter_id: int):
-    with SessionLocal() as s:
+    with ReadSessionLocal() as s:
         attachments = s.query(Attachment).filter(Attachment.letter_id == letter_id).all()
         return attachments
 
@@ -665,14 +730,416 @@ def delete_attachments_by_letter(letter_id: int):
                 try:
                     if os.path.exists(att.file_path):
                         os.remove(att.file_path)
-                        print(f"Файл {att.file_path} успешно удален")
+                        log.debug("Файл %s успешно удален", att.file_path)
                     else:
-                        print(f"Файл {att.file_path} не существует")
+                        log.debug("Файл %s не существует", att.file_path)
                 except Exception as e:
-                    print(f"Ошибка при удалении файла {att.file_path}: {e}")
+                    log.warning("Ошибка при удалении файла %s: %s", att.file_path, e)
                     # Можно продолжить удаление записей из БД даже если файл не удален
                     # или прервать операцию в зависимости от требований
 
+            s.query(ParsedAttachment).filter(ParsedAttachment.attachment_id == att.id).delete()
             s.delete(att)
 
         s.commit()
+
+
+def _parsed_marks(s, attachment_ids: list[int]) -> dict[tuple[int, int], datetime]:
+    """{(attachment_id, config_id): parsed_at}, запросами по IN_CHUNK id"""
+    parsed = {}
+    for chunk in _chunks(attachment_ids):
+        stmt = (
+            select(ParsedAttachment.attachment_id, ParsedAttachment.config_id, ParsedAttachment.parsed_at)
+            .where(ParsedAttachment.attachment_id.in_(chunk))
+        )
+        parsed.update({(a_id, c_id): parsed_at for a_id, c_id, parsed_at in s.execute(stmt)})
+    return parsed
+
+
+def upsert_master_prices(vendor_id: int, config_id: int, attachment_id: int | None, date: datetime, rows: list[dict]):
+    """
+    Добавляет строки разобранного файла в общий прайс.
+    rows: [{"article": ..., "data": {...}}]; date - дата письма в UTC (наивная).
+    Для существующего артикула поставщика в этой конфигурации строка заменяется, только если новая не старее.
+    Строки этого вложения от прошлого разбора конфигурацией сначала удаляются, чтобы
+    пропавшие из файла артикулы не оставались в прайсе. Строки с пустым артикулом
+    не схлопываются: их ключ - номер строки во вложении (см. _row_article).
+    Вложение отмечается разобранным в той же транзакции.
+    """
+    with SessionLocal() as s:
+        _write_master_prices(s, vendor_id, config_id, attachment_id, date, rows)
+        s.commit()
+        return len(rows)
+
+
+def replace_config_prices(vendor_id: int, config_id: int, results: list[tuple[int, datetime, list[dict]]]) -> int:
+    """
+    Заменяет строки общего прайса и отметки о разборе одной конфигурации одной транзакцией.
+    results: [(attachment_id, дата письма UTC, rows)] - заново разобранные вложения.
+    Строки других конфигураций не затрагиваются: ключ общего прайса включает конфигурацию,
+    и их версии тех же артикулов снова видны при чтении. Возвращает число записанных строк.
+    """
+    with SessionLocal() as s:
+        s.query(MasterPrice).filter(MasterPrice.config_id == config_id).delete(synchronize_session=False)
+        s.query(ParsedAttachment).filter(ParsedAttachment.config_id == config_id).delete(synchronize_session=False)
+        total = 0
+        for attachment_id, date, rows in sorted(results, key=lambda r: r[1]):
+            _write_master_prices(s, vendor_id, config_id, attachment_id, date, rows)
+            total += len(rows)
+        s.commit()
+        return total
+
+
+def _write_master_prices(s, vendor_id: int, config_id: int, attachment_id: int | None, date: datetime,
+                         rows: list[dict]):
+    """Upsert строк общего прайса и отметки о разборе в транзакции сессии s"""
+    if attachment_id is not None:
+        s.query(MasterPrice).filter(
+            MasterPrice.config_id == config_id, MasterPrice.attachment_id == attachment_id
+        ).delete(synchronize_session=False)
+    if rows:
+        stmt = sqlite_insert(MasterPrice)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[MasterPrice.vendor_id, MasterPrice.config_id, MasterPrice.article],
+            set_={
+                "config_id": stmt.excluded.config_id,
+                "attachment_id": stmt.excluded.attachment_id,
+                "date": stmt.excluded.date,
+                "data": stmt.excluded.data,
+            },
+            where=MasterPrice.date <= stmt.excluded.date,
+        )
+        s.execute(stmt, [
+            {
+                "vendor_id": vendor_id,
+                "article": _row_article(row["article"], config_id, attachment_id, number),
+                "config_id": config_id,
+                "attachment_id": attachment_id,
+                "date": date,
+                "data": row["data"],
+            }
+            for number, row in enumerate(rows)
+        ])
+    if attachment_id is not None:
+        stmt = sqlite_insert(ParsedAttachment).values(
+            attachment_id=attachment_id, config_id=config_id, parsed_at=datetime.now(), rows=len(rows)
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[ParsedAttachment.attachment_id, ParsedAttachment.config_id],
+            set_={"parsed_at": stmt.excluded.parsed_at, "rows": stmt.excluded.rows},
+        )
+        s.execute(stmt)
+
+
+def _row_article(article: str, config_id: int, attachment_id: int | None, number: int) -> str:
+    """Ключ строки общего прайса: артикул, а для строки без артикула - вложение и номер строки"""
+    return article or f"#{config_id}:{attachment_id}:{number}"
+
+
+def list_master_prices(
+        since: datetime | None = None,
+        until: datetime | None = None,
+        attachment_ids: list[int] | None = None,
+) -> list[tuple]:
+    """
+    Строки общего прайса активных поставщиков из активных конфигураций с to_common:
+    [(имя поставщика, дата UTC, data)]. since/until - окно по дате письма (UTC),
+    attachment_ids - только строки из указанных вложений. Если артикул поставщика есть
+    в нескольких конфигурациях, остается самая свежая из попавших в выборку строк.
+    """
+    with SessionLocal() as s:
+        conditions = [
+            func.coalesce(Vendor.active, True),
+            func.coalesce(ParsingConfig.active, True),
+            func.coalesce(ParsingConfig.to_common, True),
+        ]
+        if since is not None:
+            conditions.append(MasterPrice.date >= since)
+        if until is not None:
+            conditions.append(MasterPrice.date <= until)
+        if attachment_ids is not None:
+            # Список id одним параметром (json_each), чтобы окно ниже видело все вложения сразу
+            ids = select(literal_column("value")).select_from(func.json_each(json.dumps(list(attachment_ids))))
+            conditions.append(MasterPrice.attachment_id.in_(ids))
+        ranked = (
+            select(
+                Vendor.name.label("vendor_name"),
+                MasterPrice.date,
+                MasterPrice.data,
+                func.row_number().over(
+                    partition_by=(MasterPrice.vendor_id, MasterPrice.article),
+                    order_by=(MasterPrice.date.desc(), MasterPrice.id.desc()),
+                ).label("rn"),
+            )
+            .join(Vendor, Vendor.id == MasterPrice.vendor_id)
+            .join(ParsingConfig, ParsingConfig.id == MasterPrice.config_id)
+            .where(and_(*conditions))
+            .subquery()
+        )
+        stmt = select(ranked.c.vendor_name, ranked.c.date, ranked.c.data).where(ranked.c.rn == 1)
+        return [tuple(row) for row in s.execute(stmt)]
+
+
+def _chunks(ids: list[int]):
+    """Список id частями по IN_CHUNK"""
+    ids = list(ids)
+    for i in range(0, len(ids), IN_CHUNK):
+        yield ids[i:i + IN_CHUNK]
+
+
+def _keywords(value: str | None, sep: str) -> list[str]:
+    """Непустые ключевые слова правила фильтрации в нижнем регистре"""
+    return [k.strip().lower() for k in (value or "").split(sep) if k.strip()]
+
+
+def _contains_any(column, keywords: list[str]):
+    """SQL: колонка (без учета регистра) содержит хотя бы одно из слов"""
+    return or_(*[func.instr(func.py_lower(column), k) > 0 for k in keywords])
+
+
+def _utc_naive(dt: datetime) -> datetime:
+    """Даты писем хранятся в UTC без часового пояса"""
+    if dt.tzinfo is None:
+        return dt
+    return dt.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _parse_candidates_stmt(
+        vendor_id: int,
+        rule,
+        matcher: FilenameMatcher,
+        start_dt: datetime | None = None,
+        end_dt: datetime | None = None,
+        limit: bool = False,
+        days: int | None = None,
+        only_config_id: int | None = None,
+):
+    """
+    Запрос вложений поставщика для парсинга: окно по дате письма
+    (start_dt/end_dt или последние days дней), условия правила (расширения, тема, имя файла),
+    конфигурация по шаблону имени файла и при limit - только последнее вложение каждой конфигурации.
+    only_config_id - только вложения, которые достаются этой конфигурации.
+    None - у поставщика нет конфигураций с шаблоном.
+    """
+    patterns = matcher.regex_patterns()
+    if not patterns:
+        return None
+    config_id = case(
+        *[(Attachment.file_name.regexp_match(pattern), key) for key, pattern in patterns],
+        else_=None,
+    ).label("config_id")
+
+    conditions = [Letter.vendor_id == vendor_id]
+    if start_dt is not None and end_dt is not None:
+        conditions.append(Letter.date.between(_utc_naive(start_dt), _utc_naive(end_dt)))
+    elif days is not None:
+        conditions.append(Letter.date >= datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=days))
+
+    if rule is not None:
+        extensions = _keywords(rule.extensions, ',')
+        if extensions:
+            conditions.append(or_(*[func.py_lower(Attachment.file_name).endswith(ext) for ext in extensions]))
+        if keywords := _keywords(rule.subject_contains, ';'):
+            conditions.append(_contains_any(Letter.subject, keywords))
+        if keywords := _keywords(rule.subject_excludes, ';'):
+            conditions.append(not_(_contains_any(Letter.subject, keywords)))
+        if keywords := _keywords(rule.filename_contains, ';'):
+            conditions.append(_contains_any(Attachment.file_name, keywords))
+        if keywords := _keywords(rule.filename_excludes, ';'):
+            conditions.append(not_(_contains_any(Attachment.file_name, keywords)))
+
+    columns = [
+        Letter.subject,
+        Letter.date,
+        Attachment.id.label("attachment_id"),
+        Attachment.file_name,
+        Attachment.file_path,
+        config_id,
+    ]
+    if limit:
+        columns.append(
+            func.row_number().over(partition_by=config_id, order_by=Letter.date.desc()).label("rn")
+        )
+    inner = (
+        select(*columns)
+        .join(Attachment, Attachment.letter_id == Letter.letter_id)
+        .where(and_(*conditions))
+        .subquery()
+    )
+    stmt = select(inner).where(inner.c.config_id.is_not(None))
+    if only_config_id is not None:
+        stmt = stmt.where(inner.c.config_id == only_config_id)
+    if limit:
+        stmt = stmt.where(inner.c.rn == 1)
+    return stmt.order_by(inner.c.date)
+
+
+def load_parse_plan(
+        start_dt: datetime | None = None,
+        end_dt: datetime | None = None,
+        limit: bool = False,
+        days: int | None = None,
+        config_id: int | None = None,
+) -> ParsePlan:
+    """
+    Загружает план прогона парсинга в одной сессии: поставщики с правилами,
+    конфигурациями, сопоставлениями и ролями (жадная загрузка, по запросу на таблицу),
+    вложения-кандидаты и отметки о предыдущем разборе.
+    config_id - план пересборки одной конфигурации: только ее поставщик и ее вложения.
+    """
+    with SessionLocal() as s:
+        stmt = (
+            select(Vendor)
+            .options(
+                selectinload(Vendor.filters),
+                selectinload(Vendor.configs)
+                .selectinload(ParsingConfig.mappings)
+                .selectinload(RoleMapping.role),
+            )
+            .order_by(Vendor.name)
+        )
+        if config_id is not None:
+            stmt = stmt.where(Vendor.configs.any(ParsingConfig.id == config_id))
+        vendors = s.execute(stmt).scalars().all()
+
+        vendor_plans = []
+        for vendor in vendors:
+            rule = vendor.filters[0] if vendor.filters else None
+            rule_plan = RulePlan(
+                id=rule.id,
+                extensions=rule.extensions,
+                subject_contains=rule.subject_contains,
+                subject_excludes=rule.subject_excludes,
+                filename_contains=rule.filename_contains,
+                filename_excludes=rule.filename_excludes,
+            ) if rule else None
+            configs = tuple(
+                ConfigPlan(
+                    id=cfg.id,
+                    name=cfg.name,
+                    vendor_id=vendor.id,
+                    header_row=cfg.header_row or 0,
+                    filename_template=cfg.filename_template,
+                    active=bool(cfg.active),
+                    to_common=bool(cfg.to_common),
+                    save_original=bool(cfg.save_original),
+                    save_parsed=bool(cfg.save_parsed),
+                    quantum_config=cfg.quantum_config,
+                    roles_mapping=tuple(cfg.roles_mapping.items()),
+                )
+                for cfg in sorted(vendor.configs, key=lambda c: c.id)
+            )
+            vendor_active = bool(vendor.active)
+            candidates = []
+            if vendor_active:
+                stmt = _parse_candidates_stmt(vendor.id, rule_plan, FilenameMatcher.for_configs(configs),
+                                              start_dt, end_dt, limit, days, only_config_id=config_id)
+                if stmt is not None:
+                    candidates = [
+                        AttachmentCandidate(
+                            attachment_id=row.attachment_id,
+                            config_id=row.config_id,
+                            subject=row.subject,
+                            filename=row.file_name,
+                            filepath=os.path.join(pm.get_user_data(), row.file_path),
+                            date=row.date.replace(tzinfo=timezone.utc),
+                        )
+                        for row in s.execute(stmt)
+                    ]
+            vendor_plans.append(VendorPlan(
+                id=vendor.id,
+                name=vendor.name,
+                active=vendor_active,
+                rule=rule_plan,
+                configs=configs,
+                candidates=tuple(candidates),
+            ))
+
+        # Отметки о разборе - запросами по IN_CHUNK кандидатов
+        attachment_ids = [c.attachment_id for v in vendor_plans for c in v.candidates]
+        parsed = _parsed_marks(s, attachment_ids)
+
+    if parsed:
+        vendor_plans = [
+            replace(v, candidates=tuple(
+                replace(c, parsed_at=parsed.get((c.attachment_id, c.config_id))) for c in v.candidates
+            ))
+            for v in vendor_plans
+        ]
+    config_ids = {c.config_id for v in vendor_plans for c in v.candidates}
+    return ParsePlan(
+        vendors=tuple(vendor_plans),
+        config_changed_at=get_changed_at(CONFIG, config_ids),
+    )
+
+
+def get_stats() -> dict:
+    """Сводка по БД: число записей в основных таблицах и даты последних писем и разбора"""
+    with ReadSessionLocal() as s:
+        def count(model, *where):
+            return s.scalar(select(func.count()).select_from(model).where(*where))
+
+        last_letter = s.scalar(select(func.max(Letter.date)))
+        last_parsed = s.scalar(select(func.max(ParsedAttachment.parsed_at)))
+        return {
+            "vendors": count(Vendor),
+            "active_vendors": count(Vendor, func.coalesce(Vendor.active, True)),
+            "configs": count(ParsingConfig),
+            "letters": count(Letter),
+            "attachments": count(Attachment),
+            "parsed_attachments": count(ParsedAttachment),
+            "master_prices": count(MasterPrice),
+            "last_letter_utc": last_letter.isoformat() if last_letter else None,
+            "last_parsed_at": last_parsed.isoformat() if last_parsed else None,
+        }
+
+
+# Сколько последних запусков хранится в истории
+MAX_RUNS = 1000
+
+
+def add_run(run: Run, stages: list[RunStage]) -> int:
+    """Сохраняет запуск с его этапами; самые старые запуски сверх MAX_RUNS удаляются"""
+    with SessionLocal() as s:
+        run.stages = stages
+        s.add(run)
+        s.flush()
+        run_id = run.id
+        stale = select(Run.id).order_by(Run.id.desc()).offset(MAX_RUNS)
+        stale_ids = list(s.scalars(stale))
+        for chunk in _chunks(stale_ids):
+            s.query(RunStage).filter(RunStage.run_id.in_(chunk)).delete(synchronize_session=False)
+            s.query(Run).filter(Run.id.in_(chunk)).delete(synchronize_session=False)
+        s.commit()
+        return run_id
+
+
+def list_runs(kind: str | None = None, limit: int = 200) -> list[Run]:
+    """Последние запуски (новые первыми) вместе с этапами"""
+    with ReadSessionLocal() as s:
+        stmt = select(Run).options(selectinload(Run.stages)).order_by(Run.id.desc()).limit(limit)
+        if kind is not None:
+            stmt = stmt.where(Run.kind == kind)
+        return list(s.scalars(stmt))
+
+
+def get_stage_history(kind: str, mode: str, runs: int,
+                      before_id: int | None = None) -> dict[str, list[tuple[float, int, int | None]]]:
+    """
+    Этапы последних runs успешных запусков вида kind в режиме mode (раньше запуска before_id):
+    {этап: [(секунды, вызовы, строки) от старых к новым]}
+    """
+    with ReadSessionLocal() as s:
+        last_runs = select(Run.id).where(Run.kind == kind, Run.mode == mode, Run.status == "ok")
+        if before_id is not None:
+            last_runs = last_runs.where(Run.id < before_id)
+        last_runs = last_runs.order_by(Run.id.desc()).limit(runs).subquery()
+        stmt = (
+            select(RunStage.stage, RunStage.seconds, RunStage.calls, RunStage.rows)
+            .where(RunStage.run_id.in_(select(last_runs.c.id)))
+            .order_by(RunStage.run_id)
+        )
+        history: dict[str, list[tuple[float, int, int | None]]] = {}
+        for stage, seconds, calls, rows in s.execute(stmt):
+            history.setdefault(stage, []).append((seconds, calls, rows))
+        return history
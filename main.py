@@ -4,6 +4,8 @@ import os
 from ui.gui import App
 
 if __name__ == "__main__":
+    from utils.logs import setup_logging
+    setup_logging()
 
     app = App()
     app.mainloop()
@@ -2,6 +2,9 @@ from .parser import ParsingConfig, RoleMapping, Role, Vendor
 from .email import Filters
 from .common import Settings
 from .letters import Letter, Attachment
+from .prices import MasterPrice, ParsedAttachment
+from .versions import EntityVersion
+from .runs import Run, RunStage
 
 __all__ = [
     "ParsingConfig",
@@ -11,5 +14,10 @@ __all__ = [
     "Settings",
     "Filters",
     "Letter",
-    "Attachment"
+    "Attachment",
+    "MasterPrice",
+    "ParsedAttachment",
+    "EntityVersion",
+    "Run",
+    "RunStage"
 ]
\ No newline at end of file
@@ -12,7 +12,7 @@ class Filters(Base):
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     name: Mapped[str] = mapped_column(String)
     senders: Mapped[str] = mapped_column(String, unique=True, default="")
-    vendor_id: Mapped[int | None] = mapped_column(Integer, ForeignKey("vendors.id"))
+    vendor_id: Mapped[int | None] = mapped_column(Integer, ForeignKey("vendors.id"), index=True)
     subject_contains: Mapped[str | None] = mapped_column(String)
     subject_excludes: Mapped[str | None] = mapped_column(String)
     filename_contains: Mapped[str | None] = mapped_column(String)
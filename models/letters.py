@@ -1,6 +1,6 @@
 from datetime import datetime, timezone
 
-from sqlalchemy import Integer, String, DateTime, ForeignKey
+from sqlalchemy import Integer, String, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship, mapped_column, Mapped
 
 from utils.db import Base
@@ -13,11 +13,15 @@ class Letter(Base):
     vendor_id: Mapped[int] = mapped_column(Integer, ForeignKey('vendors.id'), index=True)
     sender: Mapped[str] = mapped_column(String)
     subject: Mapped[str] = mapped_column(String)
-    date: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+    date: Mapped[datetime] = mapped_column(DateTime(timezone=True), index=True)
 
     attachments: Mapped[list["Attachment"]] = relationship(back_populates="letter", cascade="all, delete-orphan")
     vendor: Mapped["Vendor"] = relationship(back_populates="letters")
 
+    __table_args__ = (
+        Index("ix_letters_vendor_id_date", "vendor_id", "date"),
+    )
+
     def __init__(self, **kwargs):
         if 'date' in kwargs and kwargs['date'] is not None:
             # Приводим к UTC, если дата не наивная
@@ -33,7 +37,7 @@ class Attachment(Base):
     __tablename__ = 'attachments'
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     letter_id: Mapped[int] = mapped_column(Integer, ForeignKey('letters.letter_id'), index=True)
-    file_name: Mapped[str] = mapped_column(String)
+    file_name: Mapped[str] = mapped_column(String, index=True)
     file_path: Mapped[str] = mapped_column(String)
     content_type: Mapped[str | None] = mapped_column(String)
     size: Mapped[int] = mapped_column(Integer)
@@ -1,7 +1,7 @@
 from datetime import datetime
 
 from sqlalchemy import (
-    Column, Integer, String, Boolean, ForeignKey, UniqueConstraint, DateTime, JSON
+    Column, Integer, String, Boolean, ForeignKey, UniqueConstraint, DateTime, JSON, Index
 )
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 
@@ -38,7 +38,7 @@ class Vendor(Base):
 class ParsingConfig(Base):
     __tablename__ = "parsing_configs"
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
-    name: Mapped[str] = mapped_column(String, unique=False)
+    name: Mapped[str] = mapped_column(String, unique=False, index=True)
     vendor_id: Mapped[int | None] = mapped_column(ForeignKey("vendors.id"))
     header_row: Mapped[int] = mapped_column(Integer, default=0)
     filename_template: Mapped[str | None] = mapped_column(String)
@@ -52,6 +52,15 @@ class ParsingConfig(Base):
     mappings: Mapped[list["RoleMapping"]] = relationship(back_populates="config", cascade="all, delete-orphan")
     filters_configs: Mapped[list["RefFiltersConfigs"]] = relationship(back_populates="config")
 
+    __table_args__ = (
+        Index("ix_parsing_configs_vendor_id_name", "vendor_id", "name"),
+    )
+
+    @property
+    def roles_mapping(self) -> dict:
+        """{роль: колонка в Excel}"""
+        return {m.role.name: m.column_name for m in self.mappings}
+
     def __repr__(self):
         return f"<ParsingConfig(id={self.id} name={self.name} header_row={self.header_row} vendor_id={self.vendor_id})>"
 
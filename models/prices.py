@@ -0,0 +1,45 @@
+from datetime import datetime
+
+from sqlalchemy import Integer, String, DateTime, ForeignKey, UniqueConstraint, JSON
+from sqlalchemy.orm import mapped_column, Mapped
+
+from utils.db import Base
+
+
+class MasterPrice(Base):
+    """
+    Общий прайс: последняя по дате строка артикула поставщика в каждой конфигурации.
+    Между конфигурациями одного поставщика последняя версия выбирается при чтении (crud.list_master_prices).
+    """
+    __tablename__ = "master_prices"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    vendor_id: Mapped[int] = mapped_column(Integer, ForeignKey("vendors.id"), index=True)
+    article: Mapped[str] = mapped_column(String)
+    config_id: Mapped[int] = mapped_column(Integer, ForeignKey("parsing_configs.id"), index=True)
+    attachment_id: Mapped[int | None] = mapped_column(Integer, ForeignKey("attachments.id"), index=True)
+    date: Mapped[datetime] = mapped_column(DateTime, index=True)  # дата письма в UTC
+    data: Mapped[dict] = mapped_column(JSON)  # {роль: значение} строки прайса
+
+    __table_args__ = (
+        UniqueConstraint('vendor_id', 'config_id', 'article', name='_vendor_config_article_uc'),
+    )
+
+    def __repr__(self):
+        return f"<MasterPrice(vendor_id={self.vendor_id} article={self.article} date={self.date})>"
+
+
+class ParsedAttachment(Base):
+    """Вложение, уже разобранное конфигурацией (повторно разбирается только после изменения конфигурации)"""
+    __tablename__ = "parsed_attachments"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    attachment_id: Mapped[int] = mapped_column(Integer, ForeignKey("attachments.id"), index=True)
+    config_id: Mapped[int] = mapped_column(Integer, ForeignKey("parsing_configs.id"), index=True)
+    parsed_at: Mapped[datetime] = mapped_column(DateTime)  # локальное время, как entity_versions.changed_at
+    rows: Mapped[int] = mapped_column(Integer, default=0)
+
+    __table_args__ = (
+        UniqueConstraint('attachment_id', 'config_id', name='_attachment_config_uc'),
+    )
+
+    def __repr__(self):
+        return f"<ParsedAttachment(attachment_id={self.attachment_id} config_id={self.config_id} parsed_at={self.parsed_at})>"
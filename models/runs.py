@@ -0,0 +1,52 @@
+from datetime import datetime
+
+from sqlalchemy import Integer, String, DateTime, Float, ForeignKey, JSON
+from sqlalchemy.orm import mapped_column, Mapped, relationship
+
+from utils.db import Base
+
+# Виды запусков
+FETCH = "fetch"  # загрузка писем (OptimizedYandexIMAPClient.get_all_prices)
+PARSE = "parse"  # разбор вложений (utils.parser_logic.parse)
+REBUILD = "rebuild"  # пересборка конфигурации (utils.parser_logic.rebuild_config)
+
+
+class Run(Base):
+    """Запуск загрузки или разбора: параметры, объемы и пиковая память"""
+    __tablename__ = "runs"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    kind: Mapped[str] = mapped_column(String, index=True)
+    mode: Mapped[str] = mapped_column(String)  # period / depth / limit / config
+    params: Mapped[dict] = mapped_column(JSON, default=dict)
+    started_at: Mapped[datetime] = mapped_column(DateTime, index=True)  # локальное время, как vendors.last_load
+    seconds: Mapped[float] = mapped_column(Float, default=0)
+    status: Mapped[str] = mapped_column(String, default="ok")  # ok / error
+    emails_scanned: Mapped[int | None] = mapped_column(Integer)
+    emails_matched: Mapped[int | None] = mapped_column(Integer)
+    bytes_fetched: Mapped[int | None] = mapped_column(Integer)
+    files_parsed: Mapped[int | None] = mapped_column(Integer)
+    rows_in: Mapped[int | None] = mapped_column(Integer)
+    rows_out: Mapped[int | None] = mapped_column(Integer)
+    peak_rss: Mapped[int | None] = mapped_column(Integer)  # байт
+    warnings: Mapped[list | None] = mapped_column(JSON)  # этапы, которые шли заметно дольше обычного
+
+    stages: Mapped[list["RunStage"]] = relationship(back_populates="run", cascade="all, delete-orphan")
+
+    def __repr__(self):
+        return f"<Run(kind={self.kind} mode={self.mode} started_at={self.started_at} seconds={self.seconds})>"
+
+
+class RunStage(Base):
+    """Время одного этапа запуска (этапы utils.profiler или команды IMAP из utils.metrics)"""
+    __tablename__ = "run_stages"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    run_id: Mapped[int] = mapped_column(Integer, ForeignKey("runs.id", ondelete="CASCADE"), index=True)
+    stage: Mapped[str] = mapped_column(String)
+    seconds: Mapped[float] = mapped_column(Float)
+    calls: Mapped[int] = mapped_column(Integer, default=1)
+    rows: Mapped[int | None] = mapped_column(Integer)
+
+    run: Mapped[Run] = relationship(back_populates="stages")
+
+    def __repr__(self):
+        return f"<RunStage(run_id={self.run_id} stage={self.stage} seconds={self.seconds})>"
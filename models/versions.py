@@ -0,0 +1,27 @@
+from datetime import datetime
+
+from sqlalchemy import Integer, String, DateTime, UniqueConstraint
+from sqlalchemy.orm import mapped_column, Mapped
+
+from utils.db import Base
+
+# Виды отслеживаемых сущностей
+CONFIG = "config"  # конфигурация парсинга: изменилась -> повторный разбор сохраненных вложений
+FILTER = "filter"  # правило фильтрации: изменилось -> повторное сканирование почты поставщика
+
+
+class EntityVersion(Base):
+    """Версия сущности: увеличивается в той же транзакции, что и изменение сущности"""
+    __tablename__ = "entity_versions"
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    entity: Mapped[str] = mapped_column(String)
+    entity_id: Mapped[int] = mapped_column(Integer)
+    version: Mapped[int] = mapped_column(Integer, default=1)
+    changed_at: Mapped[datetime] = mapped_column(DateTime)  # локальное время, как vendors.last_load
+
+    __table_args__ = (
+        UniqueConstraint('entity', 'entity_id', name='_entity_version_uc'),
+    )
+
+    def __repr__(self):
+        return f"<EntityVersion(entity={self.entity} entity_id={self.entity_id} version={self.version})>"
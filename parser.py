@@ -1,6 +1,5 @@
 import json
-import re
-import traceback
+import logging
 
 import pandas as pd
 import ttkbootstrap as ttk
@@ -12,11 +11,15 @@ from tkinter import filedialog, simpledialog, messagebox
 
 import crud
 import utils.db
+from ui.file_loader import BackgroundFileLoader
+from ui.virtual_table import VirtualTable, SELECT_EVENT
 from utils.convert_df import to_excel_with_role_widths
-from utils.file_reader import read_excel_safe
-from utils.stock_normalizer import normalize_stock_value
+from utils.mapping_preview import MappingPreview
 
-utils.db.init_db()
+log = logging.getLogger(__name__)
+
+# Период опроса фоновой загрузки файла, мс
+LOAD_POLL_MS = 100
 
 
 class QuantumConfigDialog(ttk.Toplevel):
@@ -29,7 +32,7 @@ class QuantumConfigDialog(ttk.Toplevel):
         self.transient(parent)
         self.grab_set()
         self.config = quantum_config
-        print(self.config)
+        log.debug("%s", self.config)
 
         # Центрируем окно
         self.update_idletasks()
@@ -191,7 +194,7 @@ class QuantumConfigDialog(ttk.Toplevel):
                 if unit and column != "(не выбрано)":
                     config['unit_mappings'][unit] = column
             except Exception as e:
-                print(e)
+                log.warning("%s", e)
 
         if not config['quantum_column']:
             messagebox.showerror("Ошибка", "Выберите колонку с единицами измерения")
@@ -213,7 +216,7 @@ class PriceParserApp(ttk.Toplevel):
         else:
             self.parent = parent
 
-        print(file_in)
+        log.debug("%s", file_in)
         super().__init__(self.parent)
         self.geometry("1200x800")
         # Добавляем атрибут для хранения конфигурации кванта
@@ -304,6 +307,7 @@ class PriceParserApp(ttk.Toplevel):
         vendor_name = self.vendor_combobox.get()
 
         # Переходим к основному интерфейсу парсера
+        self._selection_mode = True
         self._initialize_app(vendor_name, file_path, "", None)
 
     def _select_file(self):
@@ -374,17 +378,16 @@ class PriceParserApp(ttk.Toplevel):
         self.ROLES = crud.list_roles()
 
         self.CONFIG = crud.load_config_by_name(self.config_name, vendor_name=vendor)
-        print(self.CONFIG)
+        log.debug("%s", self.CONFIG)
         try:
             self.quantum_config = self.CONFIG.get('quantum_config')
-            print("Quantum config found in config file.")
+            log.debug("Quantum config found in config file.")
             #self._update_table()
         except Exception as e:
-            traceback.print_exc()
-            print("Quantum config not found in config file.")
+            log.debug("Quantum config not found in config file.", exc_info=True)
             self.quantum_config = None
 
-        self.df_raw = read_excel_safe(self.file_path)
+        self.df_raw = None
         self.df = None
         self.df_filtered = None
         self.header_row = None
@@ -395,7 +398,121 @@ class PriceParserApp(ttk.Toplevel):
         self.preview_tree_bottom = None
         self.preview_visible = False
 
-        self._build_header_selector()
+        # Файл читается в фоне: первые строки сразу показываются в выборе шапки,
+        # весь лист нужен только для _apply_header
+        self.full_loaded = False
+        self._apply_when_loaded = False
+        self._load_status = None
+        self._loader = BackgroundFileLoader(self.file_path)
+        self._loader.start()
+        self.bind("<Destroy>", self._on_destroy, add="+")
+        self._show_loading_screen()
+        self.after(LOAD_POLL_MS, self._poll_loader)
+
+    # ----------------- Фоновая загрузка файла -----------------
+    def _show_loading_screen(self):
+        """Экран до появления первых строк файла"""
+        for w in self.winfo_children(): w.destroy()
+        frame = ttk.Frame(self)
+        frame.pack(expand=YES)
+        ttk.Label(frame, text=f"Загрузка {self.file_path.name}...", font="-size 11 -weight bold").pack(pady=10)
+        self._build_load_status(frame)
+
+    def _build_load_status(self, parent=None):
+        """Прогресс загрузки файла и кнопка отмены"""
+        frame = ttk.Frame(parent or self)
+        frame.pack(side=BOTTOM, fill=X, padx=10, pady=5)
+        bar = ttk.Progressbar(frame, bootstyle="info-striped", mode="indeterminate", length=300)
+        bar.pack(side=LEFT, fill=X, expand=YES)
+        bar.start()
+        label = ttk.Label(frame, text="Чтение файла...", width=40)
+        label.pack(side=LEFT, padx=10)
+        ttk.Button(frame, text="Отмена", bootstyle=DANGER, command=self._cancel_loading).pack(side=RIGHT)
+        self._load_status = {"frame": frame, "bar": bar, "label": label}
+
+    def _update_load_status(self, read: int, total: int | None):
+        if not self._load_status:
+            return
+        bar, label = self._load_status["bar"], self._load_status["label"]
+        if total:
+            if str(bar.cget("mode")) != "determinate":
+                bar.stop()
+                bar.configure(mode="determinate", maximum=total)
+            bar.configure(value=min(read, total))
+            label.configure(text=f"Прочитано строк: {read} из {total}")
+        else:
+            label.configure(text=f"Прочитано строк: {read}")
+
+    def _remove_load_status(self):
+        if self._load_status:
+            self._load_status["frame"].destroy()
+            self._load_status = None
+
+    def _poll_loader(self):
+        if not self.winfo_exists():
+            return
+        for message in self._loader.poll():
+            kind = message[0]
+            if kind == "sample":
+                self.df_raw = message[1]
+                self._build_header_selector()
+            elif kind == "progress":
+                self._update_load_status(message[1], message[2])
+            elif kind == "done":
+                self.df_raw = message[1]
+                self.full_loaded = True
+                self._remove_load_status()
+                if self.preview_tree is not None and self.preview_tree.winfo_exists():
+                    self.preview_tree.set_data(self.df_raw, keep_position=True)
+                if self._apply_when_loaded and self.header_row is not None:
+                    self._apply_header()
+                return
+            elif kind == "cancelled":
+                self._on_loading_cancelled()
+                return
+            elif kind == "error":
+                log.error("Не удалось прочитать %s: %s", self.file_path, message[1])
+                messagebox.showerror("Ошибка", f"Не удалось прочитать файл:\n{self.file_path}", parent=self)
+                self._close_or_back()
+                return
+        self.after(LOAD_POLL_MS, self._poll_loader)
+
+    def _cancel_loading(self):
+        self._loader.cancel()
+        if self._load_status:
+            self._load_status["label"].configure(text="Отмена...")
+
+    def _on_loading_cancelled(self):
+        if self.df_raw is None:
+            # Ничего еще не показано - возвращаемся к выбору файла или закрываем окно
+            self._close_or_back()
+            return
+        # Остаемся на выборке: шапку и роли можно настроить по первым строкам
+        self._remove_load_status()
+        self._apply_when_loaded = False
+        if hasattr(self, "info_label") and self.info_label.winfo_exists():
+            self.info_label.config(
+                text=f"Загрузка отменена: доступны первые {len(self.df_raw)} строк файла",
+                bootstyle=WARNING
+            )
+
+    def _close_or_back(self):
+        if getattr(self, "_selection_mode", False):
+            self._show_file_vendor_selection()
+        else:
+            self.destroy()
+
+    def _on_destroy(self, event):
+        if event.widget is self and getattr(self, "_loader", None) is not None:
+            self._loader.cancel()
+
+    def _continue_to_roles(self):
+        """Переход к ролям; если файл еще читается - после окончания загрузки"""
+        if self.full_loaded or not self._loader.running:
+            self._apply_header()
+            return
+        self._apply_when_loaded = True
+        self.info_label.config(text=f"Выбрана строка {self.header_row + 1}, дождитесь окончания загрузки файла")
 
     # ----------------- Этап 1: выбор шапки -----------------
     def _auto_detect_header_row(self):
@@ -436,12 +553,12 @@ class PriceParserApp(ttk.Toplevel):
                         best_match_row = row_idx
 
                 except Exception as e:
-                    print(f"Ошибка при проверке строки {row_idx}: {e}")
+                    log.debug("Ошибка при проверке строки %s: %s", row_idx, e)
                     continue
 
             # Если нашли хорошее совпадение (хотя бы 2 колонки), возвращаем эту строку
             if best_match_score >= 2:
-                print(f"Автоопределение по конфигу: строка {best_match_row} (совпадений: {best_match_score})")
+                log.info("Автоопределение по конфигу: строка %s (совпадений: %s)", best_match_row, best_match_score)
                 return best_match_row
 
         # Если нет конфига или автоопределение по конфигу не сработало - используем ключевые слова
@@ -647,61 +764,53 @@ class PriceParserApp(ttk.Toplevel):
         frame.pack(fill=BOTH, expand=YES, padx=10, pady=5)
 
         cols = [f"Кол {i + 1}" for i in range(len(self.df_raw.columns))]
-        self.preview_tree = ttk.Treeview(frame, show="headings", columns=cols, height=20)
-        for i, c in enumerate(cols):
-            self.preview_tree.heading(c, text=c)
-            self.preview_tree.column(c, width=120, anchor=W)
-        vsb = ttk.Scrollbar(frame, orient=VERTICAL, command=self.preview_tree.yview)
-        self.preview_tree.configure(yscroll=vsb.set)
-        self.preview_tree.pack(side=LEFT, fill=BOTH, expand=YES)
-        vsb.pack(side=LEFT, fill=Y)
+        self.preview_tree = VirtualTable(frame, coldata=cols, rowdata=self.df_raw, height=20, maxlen=40,
+                                         virtual_columns=True)
+        self.preview_tree.pack(fill=BOTH, expand=YES)
 
         # Пытаемся автоматически определить строку заголовка
         auto_detected_row = self._auto_detect_header_row()
 
-        for idx, row in self.df_raw.head(50).iterrows():
-            self.preview_tree.insert("", END, values=[self._short_str(x) for x in row.tolist()], iid=str(idx))
+        # --- если ранее был выбран заголовок или автоопределен ---
+        try:
+            saved_header_row = self.CONFIG.get("header_row", None)
+        except:
+            saved_header_row = None
 
-            # --- если ранее был выбран заголовок или автоопределен ---
-            try:
-                saved_header_row = self.CONFIG.get("header_row", None)
-            except:
-                saved_header_row = None
+        # Приоритет: автоопределенная строка > сохраненная строка
+        row_to_select = auto_detected_row if auto_detected_row is not None else saved_header_row
 
-            # Приоритет: автоопределенная строка > сохраненная строка
-            row_to_select = auto_detected_row if auto_detected_row is not None else saved_header_row
+        if row_to_select is not None and 0 <= row_to_select < self.preview_tree.row_count:
+            try:
+                self.preview_tree.select(row_to_select)
 
-            if row_to_select is not None:
-                try:
-                    if str(row_to_select) in self.preview_tree.get_children():
-                        self.preview_tree.selection_set(str(row_to_select))
-                        self.preview_tree.see(str(row_to_select))
-
-                        if auto_detected_row is not None and auto_detected_row == idx:
-                            self.info_label = ttk.Label(
-                                self,
-                                text=f"Автоопределена строка {auto_detected_row + 1} (на основе сохраненных настроек)",
-                                bootstyle=SUCCESS
-                            )
-                            self.info_label.pack(pady=5)
+                if auto_detected_row is not None:
+                    self.info_label = ttk.Label(
+                        self,
+                        text=f"Автоопределена строка {auto_detected_row + 1} (на основе сохраненных настроек)",
+                        bootstyle=SUCCESS
+                    )
+                    self.info_label.pack(pady=5)
 
-                except Exception as e:
-                    print(f"[WARN] Ошибка при восстановлении выделения: {e}")
+            except Exception as e:
+                log.warning("Ошибка при восстановлении выделения: %s", e)
 
-        self.preview_tree.bind("<<TreeviewSelect>>", self._on_header_row_select)
+        self.preview_tree.bind(SELECT_EVENT, self._on_header_row_select)
 
         if not hasattr(self, 'info_label'):
             self.info_label = ttk.Label(self, text="Нажмите на строку, где располагается заголовок", bootstyle=INFO)
             self.info_label.pack(pady=5)
 
+        if not self.full_loaded and self._loader.running:
+            self._build_load_status()
+
     def _auto_select_header(self):
         """Принудительное автоопределение строки заголовка"""
         auto_detected_row = self._auto_detect_header_row()
         if auto_detected_row is not None:
             # Выделяем найденную строку
-            if str(auto_detected_row) in self.preview_tree.get_children():
-                self.preview_tree.selection_set(str(auto_detected_row))
-                self.preview_tree.see(str(auto_detected_row))
+            if auto_detected_row < self.preview_tree.row_count:
+                self.preview_tree.select(auto_detected_row)
 
                 # Определяем тип автоопределения для сообщения
                 if self.CONFIG and 'roles_mapping' in self.CONFIG:
@@ -729,18 +838,13 @@ class PriceParserApp(ttk.Toplevel):
                 bootstyle=WARNING
             ).show_toast()
 
-    def _short_str(self, v, maxlen=40):
-        s = "" if pd.isna(v) else str(v)
-        return s if len(s) <= maxlen else s[:maxlen - 3] + "..."
-
     def _on_header_row_select(self, event):
-        sel = self.preview_tree.selection()
-        if not sel:
+        if self.preview_tree.selected_row is None:
             return
-        self.header_row = int(sel[0])
+        self.header_row = self.preview_tree.selected_row
         self.info_label.config(text=f"Вы выбрали строку {self.header_row + 1}")
         if not hasattr(self, "_continue_btn"):
-            self._continue_btn = ttk.Button(self, text="Продолжить", bootstyle=SUCCESS, command=self._apply_header)
+            self._continue_btn = ttk.Button(self, text="Продолжить", bootstyle=SUCCESS, command=self._continue_to_roles)
             self._continue_btn.pack(pady=8)
 
     # ----------------- Этап 2: строим второй экран -----------------
@@ -760,6 +864,8 @@ class PriceParserApp(ttk.Toplevel):
         # ---------------- фильтруем колонки без названия ----------------
         valid_columns = [c for c in self.df.columns if c.strip() != ""]
         self.df = self.df[valid_columns]
+        # Преобразования колонок для предпросмотра кэшируются до следующего выбора шапки
+        self.mapping_preview = MappingPreview(self.df)
 
         # чистим окно и строим интерфейс выбора ролей
         for w in self.winfo_children(): w.destroy()
@@ -837,7 +943,7 @@ class PriceParserApp(ttk.Toplevel):
         auto_assigned_mapping = None
         if not self.CONFIG or 'roles_mapping' not in self.CONFIG:
             auto_assigned_mapping = self._auto_assign_roles(self.df.columns)
-            print(f"Автоназначенные роли: {auto_assigned_mapping}")
+            log.info("Автоназначенные роли: %s", auto_assigned_mapping)
 
         quantum_row = None
         for role in self.ROLES:
@@ -854,7 +960,7 @@ class PriceParserApp(ttk.Toplevel):
                     m = self.CONFIG.get('roles_mapping')
                     cmb.set(m.get(role.name, "(не выбрано)"))
                 if self.quantum_config:
-                    print(f"Quantum config found: {self.quantum_config}")
+                    log.debug("Quantum config found: %s", self.quantum_config)
                     m = self.quantum_config.get('quantum_column')
                     cmb.set(m)
 
@@ -917,7 +1023,7 @@ class PriceParserApp(ttk.Toplevel):
 
     def _configure_quantum(self, quantum_cmb):
         """Открывает диалог для настройки сложной логики кванта"""
-        print(self.quantum_config)
+        log.debug("%s", self.quantum_config)
         dialog = QuantumConfigDialog(self, self.available_columns, self.quantum_config)
         self.wait_window(dialog)
 
@@ -984,7 +1090,7 @@ class PriceParserApp(ttk.Toplevel):
                 return 1  # Значение по умолчанию
 
         except Exception as e:
-            print(f"Ошибка вычисления кванта: {e}")
+            log.warning("Ошибка вычисления кванта: %s", e)
             return 1
 
     def _auto_assign_roles_ui(self):
@@ -1083,135 +1189,67 @@ class PriceParserApp(ttk.Toplevel):
         # Затем обновляем таблицу
         self._update_table()
 
-    def _update_table(self):
-        # получаем выбранные роли -> колонки
-        mapping = {role.name: cmb.get() for role, cmb in self.role_comboboxes.items() if cmb.get() != "(не выбрано)"}
-        columns = list(mapping.values())
-        headers = list(mapping.keys())
+    def _role_mapping(self) -> dict[str, str]:
+        """Выбранные роли -> колонки"""
+        return {role.name: cmb.get() for role, cmb in self.role_comboboxes.items() if cmb.get() != "(не выбрано)"}
 
-        # обрабатываем данные
-        if columns:
-            try:
-                self.df_filtered = self.df[columns].copy()
-            except:
-                self.CONFIG = None
-                self._apply_header()
-            # ключевые колонки
-            price_col = mapping.get("Закупочная цена")
-            name_col = mapping.get("Наименование")
-            stock_col = mapping.get("Остаток")
-
-            # фильтр по названию
-            if name_col:
-                try:
-                    self.df_filtered = self.df_filtered[
-                        self.df_filtered[name_col].notna() & (self.df_filtered[name_col].astype(str).str.strip() != "")]
-                except KeyError as e:
-                    print(e)
-
-            # фильтр по цене
-            def valid_price(v):
-                if pd.isna(v):
-                    return False
-                if isinstance(v, (int, float)):
-                    return True
-                s = str(v).strip()
-                # ищем число внутри строки
-                match = re.search(r"\d+(\.\d+)?", s)
-                if not match:
-                    return False
-                # ограничиваем общую длину до 10 символов (чтобы исключить длинный текст)
-                return len(s) <= 10
-
-            if price_col:
-                try:
-                    self.df_filtered = self.df_filtered[self.df_filtered[price_col].apply(valid_price)]
-                except KeyError as e:
-                    print(e)
-
-            # Нормализация остатков
-            if stock_col and stock_col in self.df_filtered.columns:
-                self.df_filtered[stock_col] = self.df_filtered[stock_col].apply(normalize_stock_value)
-
-            mapping = {role.name: cmb.get() for role, cmb in self.role_comboboxes.items() if
-                       cmb.get() != "(не выбрано)"}
-            quantum_col = mapping.get("Квант")
-
-            if quantum_col and self.quantum_config and quantum_col == self.quantum_config['quantum_column']:
-                # Применяем сложную логику для кванта
-                print("Применяем сложную логику для кванта...")
-                self.df_filtered[quantum_col] = self.df.apply(self._calculate_quantum_value, axis=1)
-            elif quantum_col:
-                # Стандартная обработка кванта
-                try:
-                    self.df_filtered[quantum_col] = pd.to_numeric(self.df_filtered[quantum_col], errors='coerce')
-                except:
-                    self.df_filtered[quantum_col] = 1
-
-            # переименовываем колонки на роли
-            self.df_filtered.columns = headers
-            self.df_filtered["Поставщик"] = self.VENDOR
-
-            # Управление видимостью предпросмотра
-            if columns:  # если есть назначенные роли
-                if not self.preview_visible:
-                    self.preview_visible = True
-                    self._create_preview()
-                else:
-                    self._create_preview()  # обновляем существующий
-            else:  # если нет назначенных ролей
-                if self.preview_visible:
-                    # Скрываем предпросмотр
-                    for widget in self.bottom_frame.winfo_children():
-                        widget.destroy()
-                    self.preview_visible = False
-                self.df_filtered = None
-                return
+    def _build_result(self, full: bool = False) -> pd.DataFrame:
+        """Итоговая таблица: для предпросмотра - по первым строкам листа, при сохранении - по всему листу"""
+        return self.mapping_preview.build(
+            self._role_mapping(), self.VENDOR, full=full,
+            quantum_config=self.quantum_config, quantum_row=self._calculate_quantum_value,
+        )
 
-        # Обновляем компоновку
-        self.update_idletasks()
+    def _update_table(self):
+        # получаем выбранные роли -> колонки
+        mapping = self._role_mapping()
+
+        if not mapping:
+            # Скрываем предпросмотр
+            if self.preview_visible:
+                for widget in self.bottom_frame.winfo_children():
+                    widget.destroy()
+                self.preview_visible = False
+            self.df_filtered = None
+            return
 
-    def _create_preview(self):
-        # Очищаем предпросмотр
-        for widget in self.bottom_frame.winfo_children():
-            widget.destroy()
+        if any(column not in self.df.columns for column in mapping.values()):
+            # Сохраненная конфигурация не подходит к выбранной шапке
+            self.CONFIG = None
+            self._apply_header()
+            return
 
-        # Создаем таблицу предпросмотра с прокруткой
-        tree_frame = ttk.Frame(self.bottom_frame)
-        tree_frame.pack(fill=BOTH, expand=YES, padx=5, pady=5)
+        # Пересчитываются только колонки, у которых сменилась роль, остальные берутся из кэша
+        self.df_filtered = self._build_result()
 
-        self.preview_tree_bottom = ttk.Treeview(tree_frame, show="headings", height=15)
+        if self.mapping_preview.is_sample:
+            self.bottom_frame.configure(
+                text=f"Предпросмотр данных (первые {len(self.mapping_preview.sample)} из {len(self.df)} строк)")
+        self.preview_visible = True
+        self._create_preview()
 
+    def _create_preview(self):
         # Настраиваем колонки
-        mapping = {role.name: cmb.get() for role, cmb in self.role_comboboxes.items() if cmb.get() != "(не выбрано)"}
-        columns = list(mapping.values())
-        columns.append("Поставщик")
-        headers = list(mapping.keys())
+        headers = list(self._role_mapping().keys())
         headers.append("Поставщик")
+        data = self.df_filtered if self.df_filtered is not None else []
 
-        self.preview_tree_bottom["columns"] = columns
-        for c, h in zip(columns, headers):
-            self.preview_tree_bottom.heading(c, text=h)
-            self.preview_tree_bottom.column(c, width=120, anchor=W)
-
-        # Заполняем данными
-        if columns and hasattr(self, 'df_filtered') and self.df_filtered is not None:
-            for _, row in self.df_filtered.head(100).iterrows():
-                self.preview_tree_bottom.insert("", END, values=list(row))
+        # Таблица создается один раз, при смене ролей подменяются только данные
+        if self.preview_tree_bottom is not None and self.preview_tree_bottom.winfo_exists():
+            self.preview_tree_bottom.set_data(data, columns=headers)
+            return
 
-        # Добавляем скроллбары
-        prev_vsb = ttk.Scrollbar(tree_frame, orient=VERTICAL, command=self.preview_tree_bottom.yview)
-        # prev_hsb = ttk.Scrollbar(tree_frame, orient=HORIZONTAL, command=self.preview_tree_bottom.xview)
-        self.preview_tree_bottom.configure(yscroll=prev_vsb.set)  # , xscroll=prev_hsb.set)
+        # Очищаем предпросмотр
+        for widget in self.bottom_frame.winfo_children():
+            widget.destroy()
 
-        self.preview_tree_bottom.pack(side=LEFT, fill=BOTH, expand=YES)
-        prev_vsb.pack(side=RIGHT, fill=Y)
-        # prev_hsb.pack(side=BOTTOM, fill=X)
+        self.preview_tree_bottom = VirtualTable(self.bottom_frame, coldata=headers, rowdata=data, height=15)
+        self.preview_tree_bottom.pack(fill=BOTH, expand=YES, padx=5, pady=5)
 
     # ----------------- сохранение -----------------
     def _save_roles(self):
-        mapping = {role.name: cmb.get() for role, cmb in self.role_comboboxes.items() if cmb.get() != "(не выбрано)"}
-        print(self.quantum_config)
+        mapping = self._role_mapping()
+        log.debug("%s", self.quantum_config)
         crud.save_config(
             config_name=self.config_name,
             vendor_name=self.VENDOR,
@@ -1228,7 +1266,9 @@ class PriceParserApp(ttk.Toplevel):
     # ----------------- быстрое сохранение -----------------
     def _quick_save(self):
         """Быстрое сохранение результата в выбранный файл"""
-        if not hasattr(self, 'df_filtered') or self.df_filtered is None or self.df_filtered.empty:
+        # df_filtered - только предпросмотр по первым строкам, проверяем весь лист
+        result = self._build_result(full=True) if getattr(self, 'df_filtered', None) is not None else None
+        if result is None or result.empty:
             ToastNotification(
                 title="Ошибка",
                 message="Нет данных для сохранения",
@@ -1248,8 +1288,8 @@ class PriceParserApp(ttk.Toplevel):
             return  # Пользователь отменил сохранение
 
         try:
-            # Сохраняем файл
-            to_excel_with_role_widths(self.df_filtered, output_file)
+            # Сохраняем файл (весь лист, предпросмотр строится только по первым строкам)
+            to_excel_with_role_widths(result, output_file)
 
             ToastNotification(
                 title="Успешно",
@@ -1266,5 +1306,9 @@ class PriceParserApp(ttk.Toplevel):
 
 
 if __name__ == "__main__":
+    from utils.logs import setup_logging
+
+    setup_logging()
+    utils.db.init_db()
     app = PriceParserApp()
     app.mainloop()
\ No newline at end of file
@@ -1,8 +1,26 @@
 from crud import get_settings
 from utils.db import init_db
 
-try:
-    settings = get_settings()
-except:
-    init_db()
-    settings = get_settings()
\ No newline at end of file
+_settings: dict | None = None
+
+
+def load_settings() -> dict:
+    """
+    Настройки приложения, загруженные из БД при первом обращении.
+    Возвращается один и тот же dict: изменения в нем видны всем модулям.
+    """
+    global _settings
+    if _settings is None:
+        try:
+            _settings = get_settings()
+        except Exception:
+            init_db()
+            _settings = get_settings()
+    return _settings
+
+
+def __getattr__(name):
+    # settings.settings / from settings import settings - ленивая загрузка
+    if name == "settings":
+        return load_settings()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
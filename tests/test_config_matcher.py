@@ -0,0 +1,17 @@
+from utils.config_matcher import FilenameMatcher, template_kind
+
+
+def test_glob_needs_prefix():
+    assert template_kind("Прайс [опт]") == "substring"
+    assert template_kind("price*") == "substring"
+    assert template_kind("glob:*прайс*.xls?") == "glob"
+    assert template_kind("re:прайс_\\d+") == "regex"
+
+
+def test_substring_templates_with_glob_characters_keep_meaning():
+    matcher = FilenameMatcher([(1, "Прайс [опт]"), (2, "glob:остатки_*.xlsx")])
+
+    assert matcher.match("Прайс [опт] 01.02.xlsx") == 1
+    assert matcher.match("Прайс о.xlsx") is None
+    assert matcher.match("Остатки_склад.xlsx") == 2
+    assert matcher.match("мои остатки_склад.xlsx") is None
@@ -0,0 +1,62 @@
+import re
+import zipfile
+
+import pandas as pd
+from openpyxl import Workbook
+
+from utils.file_reader import iter_excel_batches, read_excel_for_config, read_excel_safe
+
+
+def _articles(series: pd.Series) -> list[str]:
+    """Артикулы так, как из них строится ключ общего прайса (frame_to_master_rows)"""
+    return ["" if pd.isna(v) else str(v).strip() for v in series]
+
+
+def _write_price(path, rows):
+    wb = Workbook()
+    ws = wb.active
+    ws.append(["Прайс-лист"])
+    ws.append(["Артикул", "Цена", "Наименование"])
+    for row in rows:
+        ws.append(row)
+    wb.save(path)
+    return path
+
+
+def test_projected_read_keeps_integer_articles_with_blank_cell(tmp_path):
+    path = _write_price(tmp_path / "price.xlsx", [(12345, 10.5, "Товар"), (None, 3, "Без артикула"), (777, 1, "Еще")])
+
+    projected = read_excel_for_config(path, 1, ["Артикул", "Цена"])
+    full = read_excel_safe(path).iloc[2:, 0]
+
+    assert _articles(projected["Артикул"]) == ["12345", "", "777"]
+    assert _articles(projected["Артикул"]) == _articles(full)
+
+
+def _set_dimension(path, ref: str):
+    """Переписывает <dimension> первого листа, как это делают некоторые выгрузки 1С"""
+    with zipfile.ZipFile(path) as src:
+        items = {name: src.read(name) for name in src.namelist()}
+    sheet = "xl/worksheets/sheet1.xml"
+    items[sheet] = re.sub(rb'<dimension ref="[^"]*"', b'<dimension ref="' + ref.encode() + b'"', items[sheet])
+    with zipfile.ZipFile(path, "w") as dst:
+        for name, data in items.items():
+            dst.writestr(name, data)
+    return path
+
+
+def test_batches_do_not_depend_on_batch_boundaries(tmp_path):
+    path = _write_price(tmp_path / "price.xlsx", [(12345, 10, "a"), (None, None, "b"), (777, 5, "c"), (888, 6, "d")])
+
+    batches = list(iter_excel_batches(path, 1, ["Артикул", "Цена"], batch_size=2))
+
+    assert [str(b["Артикул"].dtype) for b in batches] == ["object", "object"]
+    assert _articles(pd.concat(batches)["Артикул"]) == ["12345", "", "777", "888"]
+
+
+def test_batches_ignore_wrong_dimension_tag(tmp_path):
+    path = _set_dimension(_write_price(tmp_path / "price.xlsx", [(i, i, "x") for i in range(1, 11)]), "A1:C3")
+
+    batches = list(iter_excel_batches(path, 1, ["Артикул", "Цена"], batch_size=4))
+
+    assert sum(len(b) for b in batches) == 10
@@ -0,0 +1,20 @@
+import pandas as pd
+
+from utils.price_compare import normalize_articles
+
+
+def test_float_and_text_articles_match():
+    articles = pd.Series([12345.0, "12345", "AB-0012", None], dtype=object)
+
+    key = normalize_articles(articles)
+
+    assert key.iloc[0] == key.iloc[1] == "12345"
+    assert key.iloc[2] == "ab12"
+    assert pd.isna(key.iloc[3])
+
+
+def test_float_column_articles():
+    floats = normalize_articles(pd.Series([12345.0, float("nan"), 12.5]))
+
+    assert floats.iloc[0] == "12345"
+    assert floats.iloc[2] == "125"
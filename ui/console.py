@@ -1,17 +1,169 @@
 import io
+import queue
 import sys
 import threading
+import time
+from collections import deque
 from tkinter import scrolledtext
 from pathlib import Path
-from datetime import datetime
 import logging
+from logging.handlers import QueueHandler, QueueListener
 
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
 from contextlib import redirect_stdout, redirect_stderr
 
+from utils import metrics
 from utils.paths import pm
 
+# Период переноса накопившегося вывода в текстовое поле, мс
+POLL_MS = 100
+# Сколько последних строк хранит текстовое поле
+MAX_LINES = 5000
+
+
+class QueueStream(io.TextIOBase):
+    """
+    Поток для sys.stdout/sys.stderr задачи: полные строки передаются в ConsoleSink,
+    незаконченная строка копится отдельно для каждого потока, Tk из рабочих потоков не вызывается.
+    """
+
+    def __init__(self, sink: "ConsoleSink", level: int = logging.INFO):
+        self.sink = sink
+        self.level = level
+        self._local = threading.local()
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        buffer = getattr(self._local, "buffer", "") + text
+        if "\n" in buffer:
+            *lines, buffer = buffer.split("\n")
+            for line in lines:
+                self.sink.put(line, self.level)
+        self._local.buffer = buffer
+        return len(text)
+
+    def flush(self):
+        buffer = getattr(self._local, "buffer", "")
+        if buffer:
+            self._local.buffer = ""
+            self.sink.put(buffer, self.level)
+
+
+class SinkHandler(logging.Handler):
+    """Записи журнала приложения (utils.logs) в окно задачи"""
+
+    def __init__(self, sink: "ConsoleSink", level: int = logging.INFO):
+        super().__init__(level)
+        self.sink = sink
+
+    def emit(self, record):
+        try:
+            self.sink.put(self.format(record), record.levelno)
+        except Exception:
+            self.handleError(record)
+
+
+class ConsoleSink:
+    """
+    Вывод задачи в текстовое поле и файл журнала.
+
+    Строки из любых потоков складываются в очередь; drain() из цикла Tk раз в POLL_MS
+    вставляет их одной пачкой, оставляя в поле последние max_lines строк.
+    В файл пишет QueueListener в своем потоке, рабочий поток на запись не ждет.
+    Пока окно открыто, в него попадают и записи журнала приложения уровня INFO и выше.
+    """
+
+    def __init__(self, widget, log_name: str, max_lines: int = MAX_LINES):
+        self.widget = widget
+        self.max_lines = max_lines
+        self._lines = queue.SimpleQueue()
+
+        # Создаем логгер
+        self.logger = logging.getLogger(log_name)
+        self.logger.setLevel(logging.INFO)
+
+        # Очищаем предыдущие обработчики; свои записи в общий журнал не передаем
+        self.logger.handlers.clear()
+        self.logger.propagate = False
+
+        # Создаем обработчик для файла
+        self._file_handler = logging.FileHandler(Path(pm.get_logs()) / f"{log_name}.log", encoding='utf-8')
+        self._file_handler.setLevel(logging.INFO)
+
+        # Форматирование с временными метками
+        self._file_handler.setFormatter(logging.Formatter(
+            '%(asctime)s - %(levelname)s - %(message)s',
+            datefmt='%Y-%m-%d %H:%M:%S'
+        ))
+
+        # Запись в файл - в потоке QueueListener
+        log_queue = queue.SimpleQueue()
+        self.logger.addHandler(QueueHandler(log_queue))
+        self._listener = QueueListener(log_queue, self._file_handler, respect_handler_level=True)
+        self._listener.start()
+
+        self.stdout = QueueStream(self, logging.INFO)
+        self.stderr = QueueStream(self, logging.ERROR)
+
+        # Подписка на журнал приложения
+        self._log_handler = SinkHandler(self)
+        logging.getLogger().addHandler(self._log_handler)
+
+    def put(self, line: str, level: int = logging.INFO):
+        """Строка вывода (из любого потока); пустые строки пропускаются"""
+        if not line.strip():
+            return
+        self.logger.log(level, line)
+        self._lines.put(line)
+
+    def drain(self) -> int:
+        """Переносит накопившиеся строки в текстовое поле (только из потока Tk)"""
+        # Из длинной очереди в поле попадут только последние max_lines строк
+        batch = deque(maxlen=self.max_lines)
+        for _ in range(self._lines.qsize()):
+            try:
+                batch.append(self._lines.get_nowait())
+            except queue.Empty:
+                break
+        if not batch:
+            return 0
+
+        self.widget.insert(END, "\n".join(batch) + "\n")
+        lines = int(self.widget.index("end-1c").split(".")[0]) - 1
+        if lines > self.max_lines:
+            self.widget.delete("1.0", f"{lines - self.max_lines + 1}.0")
+        self.widget.see(END)
+        return len(batch)
+
+    def close(self):
+        """Дописывает журнал и закрывает файл"""
+        logging.getLogger().removeHandler(self._log_handler)
+        self.stdout.flush()
+        self.stderr.flush()
+        self._listener.stop()
+        self._file_handler.close()
+        self.logger.handlers.clear()
+
+
+class MetricsBar:
+    """Строка метрик загрузки писем (utils.metrics); появляется, когда загрузка запущена из этого окна"""
+
+    def __init__(self, master, before):
+        self.opened = time.time()
+        self.before = before
+        self.label = ttk.Label(master, text="", anchor=W)
+
+    def refresh(self):
+        registry = metrics.current()
+        if registry is None or registry.started < self.opened:
+            return
+        if not self.label.winfo_ismapped():
+            self.label.pack(fill=X, padx=10, pady=(10, 0), before=self.before)
+        self.label.configure(text=registry.status_line())
+
 
 class ConsoleWindow:
     def __init__(self, parent):
@@ -27,6 +179,7 @@ class ConsoleWindow:
             height=20
         )
         self.text_area.pack(padx=10, pady=10, fill=BOTH, expand=True)
+        self.metrics_bar = MetricsBar(self.window, self.text_area)
 
         # Кнопка отмены
         self.cancel_button = ttk.Button(
@@ -39,105 +192,25 @@ class ConsoleWindow:
         self.is_running = True
         self.thread = None
         self.logger = None
-
-    def setup_logging(self, function_name):
-        """Настраивает логирование в файл"""
-        log_path = Path(pm.get_logs()) / f"{function_name}.log"
-
-        # Создаем логгер
-        self.logger = logging.getLogger(function_name)
-        self.logger.setLevel(logging.INFO)
-
-        # Очищаем предыдущие обработчики
-        self.logger.handlers.clear()
-
-        # Создаем обработчик для файла
-        file_handler = logging.FileHandler(log_path, encoding='utf-8')
-        file_handler.setLevel(logging.INFO)
-
-        # Форматирование с временными метками
-        formatter = logging.Formatter(
-            '%(asctime)s - %(levelname)s - %(message)s',
-            datefmt='%Y-%m-%d %H:%M:%S'
-        )
-        file_handler.setFormatter(formatter)
-
-        self.logger.addHandler(file_handler)
-
-        return self.logger
+        self.sink = None
 
     def redirect_output(self, function_name):
         """Перенаправляет stdout и stderr в текстовое поле и файл"""
-        self.setup_logging(function_name)
-
-        class TextRedirector(io.TextIOBase):
-            def __init__(self, widget, logger, tag="stdout"):
-                self.widget = widget
-                self.logger = logger
-                self.tag = tag
-                self.is_running = True
-                self.buffer = ""
-
-            def write(self, text):
-                if not self.is_running:
-                    return
-
-                # Добавляем в буфер
-                self.buffer += text
-
-                # Если есть полная строка (заканчивается переводом строки)
-                if '\n' in self.buffer:
-                    lines = self.buffer.split('\n')
-                    # Обрабатываем все полные строки
-                    for line in lines[:-1]:
-                        if line.strip():  # Игнорируем пустые строки
-                            # Логируем с временной меткой
-                            if self.tag == "stderr":
-                                self.logger.error(line)
-                            else:
-                                self.logger.info(line)
-
-                            # Выводим в текстовое поле
-                            self.widget.insert(END, line + '\n')
-                            self.widget.see(END)
-
-                    # Оставляем неполную строку в буфере
-                    self.buffer = lines[-1]
-
-                self.widget.update_idletasks()
-
-            def flush(self):
-                # Обрабатываем оставшиеся данные в буфере
-                if self.buffer.strip():
-                    if self.tag == "stderr":
-                        self.logger.error(self.buffer)
-                    else:
-                        self.logger.info(self.buffer)
-
-                    self.widget.insert(END, self.buffer)
-                    self.widget.see(END)
-                    self.buffer = ""
-                self.widget.update_idletasks()
-
-        sys.stdout = TextRedirector(self.text_area, self.logger, "stdout")
-        sys.stderr = TextRedirector(self.text_area, self.logger, "stderr")
+        self.sink = ConsoleSink(self.text_area, function_name)
+        self.logger = self.sink.logger
+        sys.stdout = self.sink.stdout
+        sys.stderr = self.sink.stderr
 
     def restore_output(self):
         """Восстанавливает стандартные потоки вывода"""
-        # Обрабатываем оставшиеся данные перед восстановлением
-        if hasattr(sys.stdout, 'flush'):
-            sys.stdout.flush()
-        if hasattr(sys.stderr, 'flush'):
-            sys.stderr.flush()
-
         sys.stdout = sys.__stdout__
         sys.stderr = sys.__stderr__
 
-        # Закрываем обработчики логгера
-        if self.logger:
-            for handler in self.logger.handlers:
-                handler.close()
-            self.logger.handlers.clear()
+        # Переносим остаток вывода и закрываем журнал
+        if self.sink:
+            self.sink.close()
+            self.sink.drain()
+            self.sink = None
 
     def run_task(self, task_function, *args, **kwargs):
         """Запускает задачу в отдельном потоке"""
@@ -175,8 +248,10 @@ class ConsoleWindow:
     def _check_thread(self):
         """Проверяет статус выполнения потока"""
         if self.thread.is_alive():
-            # Поток еще работает, проверяем снова через 100мс
-            self.window.after(100, self._check_thread)
+            # Поток еще работает: переносим накопившийся вывод и проверяем снова
+            self.sink.drain()
+            self.metrics_bar.refresh()
+            self.window.after(POLL_MS, self._check_thread)
         else:
             # Задача завершена, закрываем окно
             self.restore_output()
@@ -199,6 +274,7 @@ class SimpleConsoleWindow:
 
         self.text_area = scrolledtext.ScrolledText(self.window)
         self.text_area.pack(fill=BOTH, expand=True, padx=10, pady=10)
+        self.metrics_bar = MetricsBar(self.window, self.text_area)
 
         self.task_function = task_function
         self.args = args
@@ -212,28 +288,9 @@ class SimpleConsoleWindow:
         self.start_task()
 
     def setup_logging(self):
-        """Настраивает логирование в файл"""
-        log_path = Path(pm.get_logs()) / f"{self.function_name}.log"
-
-        # Создаем логгер
-        self.logger = logging.getLogger(self.function_name)
-        self.logger.setLevel(logging.INFO)
-
-        # Очищаем предыдущие обработчики
-        self.logger.handlers.clear()
-
-        # Создаем обработчик для файла
-        file_handler = logging.FileHandler(log_path, encoding='utf-8')
-        file_handler.setLevel(logging.INFO)
-
-        # Форматирование с временными метками
-        formatter = logging.Formatter(
-            '%(asctime)s - %(levelname)s - %(message)s',
-            datefmt='%Y-%m-%d %H:%M:%S'
-        )
-        file_handler.setFormatter(formatter)
-
-        self.logger.addHandler(file_handler)
+        """Настраивает вывод в текстовое поле и логирование в файл"""
+        self.sink = ConsoleSink(self.text_area, self.function_name)
+        self.logger = self.sink.logger
 
         # Логируем начало выполнения
         self.logger.info(f"Начало выполнения функции: {self.function_name}")
@@ -250,23 +307,19 @@ class SimpleConsoleWindow:
 
     def start_task(self):
         """Запускает задачу с перенаправлением вывода"""
-        import io
-        from contextlib import redirect_stdout, redirect_stderr
-
-        # Создаем буфер для вывода
-        self.output_buffer = io.StringIO()
 
         def run_in_thread():
             """Выполняет задачу в потоке с перехватом вывода"""
             try:
-                with redirect_stdout(self.output_buffer), redirect_stderr(self.output_buffer):
+                with redirect_stdout(self.sink.stdout), redirect_stderr(self.sink.stderr):
                     self.task_function(*self.args, **self.kwargs)
                 self.log_message(f"Функция {self.function_name} выполнена успешно")
             except Exception as e:
-                error_msg = f"Ошибка при выполнении задачи: {e}"
-                self.output_buffer.write(error_msg + "\n")
-                self.log_message(error_msg, 'error')
+                self.sink.put(f"Ошибка при выполнении задачи: {e}", logging.ERROR)
             finally:
+                # Незаконченная строка этого потока
+                self.sink.stdout.flush()
+                self.sink.stderr.flush()
                 self.task_completed = True
 
         self.task_completed = False
@@ -278,43 +331,17 @@ class SimpleConsoleWindow:
         self.update_output()
 
     def update_output(self):
-        """Обновляет вывод в текстовом поле и логирует его"""
-        # Получаем весь вывод из буфера
-        output = self.output_buffer.getvalue()
-        if output:
-            # Очищаем буфер после чтения
-            self.output_buffer.truncate(0)
-            self.output_buffer.seek(0)
-
-            # Логируем вывод
-            for line in output.splitlines():
-                if line.strip():  # Игнорируем пустые строки
-                    self.log_message(line)
-
-            # Обновляем текстовое поле
-            self.text_area.insert(END, output)
-            self.text_area.see(END)
+        """Переносит накопившийся вывод в текстовое поле"""
+        self.sink.drain()
+        self.metrics_bar.refresh()
 
         # Проверяем, завершена ли задача
         if self.thread.is_alive():
             # Если нет, продолжаем обновление
-            self.window.after(100, self.update_output)
+            self.window.after(POLL_MS, self.update_output)
         else:
-            # Если да, выводим оставшийся вывод и закрываем окно
-            final_output = self.output_buffer.getvalue()
-            if final_output:
-                # Логируем оставшийся вывод
-                for line in final_output.splitlines():
-                    if line.strip():
-                        self.log_message(line)
-
-                self.text_area.insert(END, final_output)
-                self.text_area.see(END)
-
-            # Закрываем обработчики логгера
-            if self.logger:
-                for handler in self.logger.handlers:
-                    handler.close()
-                self.logger.handlers.clear()
-
-            self.window.after(1000, self.window.destroy)  # Закрываем через 1 секунду
\ No newline at end of file
+            # Если да, выводим оставшийся вывод и закрываем журнал
+            self.sink.close()
+            self.sink.drain()
+
+            self.window.after(1000, self.window.destroy)  # Закрываем через 1 секунду
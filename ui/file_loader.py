@@ -0,0 +1,64 @@
+import queue
+import threading
+from pathlib import Path
+
+from utils.file_reader import read_excel_rows, LoadCancelled, SAMPLE_ROWS
+
+
+class BackgroundFileLoader:
+    """
+    Читает прайс-лист в фоновом потоке (utils.file_reader.read_excel_rows).
+    Окно забирает сообщения через poll() по таймеру (after), виджеты из потока не трогаются.
+
+    Сообщения:
+    - ("sample", df)              - первые SAMPLE_ROWS строк, можно строить предпросмотр;
+    - ("progress", read, total)   - прочитано строк (total - None, если размер листа неизвестен);
+    - ("done", df)                - лист прочитан целиком;
+    - ("cancelled",)              - чтение отменено;
+    - ("error", exception)        - файл прочитать не удалось.
+    """
+
+    def __init__(self, file_path: str | Path, sample_rows: int = SAMPLE_ROWS):
+        self.file_path = file_path
+        self.sample_rows = sample_rows
+        self._messages = queue.Queue()
+        self._cancel = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def running(self) -> bool:
+        return self._thread.is_alive()
+
+    def poll(self) -> list[tuple]:
+        """Все накопившиеся сообщения (без ожидания)"""
+        messages = []
+        while True:
+            try:
+                messages.append(self._messages.get_nowait())
+            except queue.Empty:
+                return messages
+
+    def _run(self):
+        try:
+            df = read_excel_rows(
+                self.file_path,
+                cancel=self._cancel,
+                progress=lambda read, total: self._messages.put(("progress", read, total)),
+                on_sample=lambda sample: self._messages.put(("sample", sample)),
+                sample_rows=self.sample_rows,
+            )
+        except LoadCancelled:
+            self._messages.put(("cancelled",))
+        except Exception as e:
+            self._messages.put(("error", e))
+        else:
+            if self._cancel.is_set():
+                self._messages.put(("cancelled",))
+            else:
+                self._messages.put(("done", df))
@@ -1,11 +1,9 @@
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
 
-from crud import get_settings
 from ui.about_frame import create_about_frame
 from ui.main_frame import MainFrame
 from ui.settings_frame import create_settings_frame
-from ya_client import OptimizedYandexIMAPClient
 
 
 class App(ttk.Window):
@@ -16,9 +14,6 @@ class App(ttk.Window):
             size=(1280, 800),
             resizable=(True, True)
         )
-        s = get_settings()
-        #print(s)
-        self.email_client = OptimizedYandexIMAPClient(s.get('email_username'), s.get('email_password'))
         self.create_tabs()
 
     def create_tabs(self):
@@ -3,14 +3,13 @@ from datetime import datetime, timedelta, timezone
 import time
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
-from ttkbootstrap.tableview import Tableview
 from ttkbootstrap.toast import ToastNotification
 from ttkbootstrap.validation import add_regex_validation
 
 from crud import list_letters, list_vendors, set_vendor_last_load, list_configs_for_vendor
 from ui.console import ConsoleWindow, SimpleConsoleWindow
-from utils.parser_logic import parse
-from ya_client import client as email_client
+from ui.virtual_table import VirtualTable
+from ya_client import get_client
 
 
 class ValidatedDateEntry(ttk.DateEntry):
@@ -233,14 +232,13 @@ class MainFrame:
                               vendor.last_load.strftime('%Y-%m-%d %H:%M:%S') if vendor.last_load else ''] for vendor in
                              list_vendors()]
 
-        self.suppliers_table = Tableview(
+        self.suppliers_table = VirtualTable(
             suppliers_frame,
             coldata=columns,
             rowdata=self.vendors_list,
-            # paginated=True,
-            # searchable=True,
+            height=10,
+            sortable=True,
             bootstyle=PRIMARY,
-            # stripecolor=("gray", None),
         )
         self.suppliers_table.pack(fill=BOTH, expand=YES)
 
@@ -307,14 +305,14 @@ class MainFrame:
             {"text": "Сохранить обработанный", "stretch": False, "width": 150}
         ]
 
-        self.config_table = Tableview(
+        self.config_table = VirtualTable(
             config_frame,
             coldata=columns,
             rowdata=[],
-            paginated=True,
+            height=10,
             searchable=True,
+            sortable=True,
             bootstyle=PRIMARY,
-            # stripecolor=("gray", None),
         )
         self.config_table.pack(fill=BOTH, expand=YES)
 
@@ -322,6 +320,13 @@ class MainFrame:
         buttons_frame = ttk.Frame(config_frame)
         buttons_frame.pack(fill=X, pady=(10, 0))
 
+        ttk.Button(
+            buttons_frame,
+            text="🔁 Пересобрать конфигурацию",
+            bootstyle="warning-outline",
+            command=self.rebuild_selected_config,
+        ).pack(side=LEFT)
+
         # Кнопка запуска парсинга
         ttk.Button(
             tab_parsing,
@@ -361,6 +366,7 @@ class MainFrame:
         """Запуск загрузки прайс-листов"""
 
         def wrapper_loading():
+            from utils.parser_logic import parse  # pandas загружается только при парсинге
             start_hours, start_minutes = self.start_time_var.get().split(':')
             start_hours = int(start_hours)
             start_minutes = int(start_minutes)
@@ -383,21 +389,20 @@ class MainFrame:
                 if end_dt == start_dt:
                     end_dt = end_dt + timedelta(days=1)
                 print(f'Загрузка и парсинг по периоду {start_dt.strftime("%d.%m.%Y %H:%M")} - {end_dt.strftime("%d.%m.%Y %H:%M")}')
-                email_client.get_all_prices(since_date=start_dt, before_date=end_dt)
+                get_client().get_all_prices(since_date=start_dt, before_date=end_dt)
             elif self.loading_mode.get() == 'depth':
                 print('Загрузка и парсинг по глубине')
-                email_client.get_all_prices(days=days_depth)
+                get_client().get_all_prices(days=days_depth)
             else:
                 print('Загрузка и парсинг по последнему прайсу')
-                email_client.get_all_prices(limit_by_folder=10)
+                get_client().get_all_prices(limit_by_folder=10)
 
             for vid, _, _, _ in self.vendors_list:
                 set_vendor_last_load(vid, datetime.now())
             self.vendors_list = [[str(vendor.id), vendor.name, "Да" if vendor.active else "Нет",
                                   vendor.last_load.strftime('%Y-%m-%d %H:%M:%S') if vendor.last_load else ''] for vendor
                                  in list_vendors()]
-            self.suppliers_table.delete_rows()
-            self.suppliers_table.insert_rows(0, self.vendors_list)
+            self.suppliers_table.set_data(self.vendors_list)
 
             if self.loading_mode.get() == 'period':
                 parse(start_dt=start_dt, end_dt=end_dt)
@@ -426,8 +431,7 @@ class MainFrame:
             ]
             for config in list_configs_for_vendor(self.selected_vendor_var.get())
         ]
-        self.config_table.delete_rows()
-        self.config_table.insert_rows(0, self.config_list)
+        self.config_table.set_data(self.config_list)
 
     def edit_config(self):
         """Редактирование выбранной конфигурации"""
@@ -445,20 +449,45 @@ class MainFrame:
         pass
 
     def start_parsing(self):
-        """Запуск парсинга"""
+        """Запуск парсинга сохраненных вложений без загрузки почты"""
 
         def wrapper_parse():
-            fname = 'price.xlsx'
-            days_depth = 7
-            parse(fname, days_depth)
+            from utils.parser_logic import parse
+            parse()
             ToastNotification(
                 title="Сохранено",
-                message=f"Прайс-лист {fname} сохранён",
+                message="Прайс-лист сохранён",
                 bootstyle=SUCCESS
             ).show_toast()
 
         SimpleConsoleWindow(wrapper_parse)
 
+    def rebuild_selected_config(self):
+        """Пересборка выбранной в таблице конфигурации по всем сохраненным вложениям"""
+        selected = self.config_table.selected_values()
+        if selected is None:
+            ToastNotification(
+                title="Пересборка",
+                message="Выберите конфигурацию в таблице",
+                bootstyle=WARNING,
+                duration=3000
+            ).show_toast()
+            return
+        config_id = int(selected[0])
+        config_name = selected[1]
+
+        def wrapper_rebuild():
+            from utils.parser_logic import rebuild_config
+            summary = rebuild_config(config_id)
+            ToastNotification(
+                title="Сохранено",
+                message=f"Конфигурация {config_name} пересобрана: {summary['rows']} строк "
+                        f"из {summary['parsed']} файлов",
+                bootstyle=SUCCESS
+            ).show_toast()
+
+        SimpleConsoleWindow(wrapper_rebuild)
+
     def load_suppliers_data(self):
         """Загрузка данных поставщиков из БД"""
         # TODO: Загрузка данных из БД через SQLAlchemy
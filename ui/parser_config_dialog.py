@@ -13,8 +13,10 @@ from crud import list_vendors, list_configs_for_vendor, get_vendor_by_name, get_
     delete_config, list_letters, find_attachment_by_filename
 from models import Filters, ParsingConfig
 from ui.console import SimpleConsoleWindow
+from ui.virtual_table import VirtualTable, SELECT_EVENT
+from utils.config_matcher import FilenameMatcher
 from utils.paths import pm
-from ya_client import client as email_client
+from ya_client import get_client
 
 class ParserConfigWindow(ttk.Toplevel):
     def __init__(self, parent, rule_data: Filters):
@@ -190,42 +192,28 @@ class ParserConfigWindow(ttk.Toplevel):
         email_tree_frame = ttk.Frame(right_frame)
         email_tree_frame.pack(fill=BOTH, expand=YES, padx=10, pady=5)
 
-        self.email_tree = ttk.Treeview(
+        self.email_tree = VirtualTable(
             email_tree_frame,
-            columns=("subject", "filename", "date", "config"),
-            show="headings",
-            height=20
+            coldata=[
+                {"text": "Тема", "width": 150},
+                {"text": "Файл", "width": 120},
+                {"text": "Дата", "width": 80},
+                {"text": "Конфигурация", "width": 100},
+            ],
+            height=20,
+            xscroll=True,
         )
-
-        self.email_tree.heading("subject", text="Тема")
-        self.email_tree.heading("filename", text="Файл")
-        self.email_tree.heading("date", text="Дата")
-        self.email_tree.heading("config", text="Конфигурация")
-
-        self.email_tree.column("subject", width=150)
-        self.email_tree.column("filename", width=120)
-        self.email_tree.column("date", width=80)
-        self.email_tree.column("config", width=100)
-
-        # Скроллбары для таблицы писем
-        email_vsb = ttk.Scrollbar(email_tree_frame, orient=VERTICAL, command=self.email_tree.yview)
-        email_hsb = ttk.Scrollbar(email_tree_frame, orient=HORIZONTAL, command=self.email_tree.xview)
-        self.email_tree.configure(yscrollcommand=email_vsb.set, xscrollcommand=email_hsb.set)
-
-        self.email_tree.grid(row=0, column=0, sticky="nsew")
-        email_vsb.grid(row=0, column=1, sticky="ns")
-        email_hsb.grid(row=1, column=0, sticky="ew")
-
-        email_tree_frame.grid_rowconfigure(0, weight=1)
-        email_tree_frame.grid_columnconfigure(0, weight=1)
+        self.email_tree.pack(fill=BOTH, expand=YES)
 
         def on_email_tree_select(event):
-            selected_item = self.email_tree.selection()[0]
+            selected = self.email_tree.selected_values()
+            if selected is None:
+                return
 
-            self.current_file = os.path.join(pm.get_user_data(), find_attachment_by_filename(self.email_tree.item(selected_item, "values")[1]).file_path)
+            self.current_file = os.path.join(pm.get_user_data(), find_attachment_by_filename(selected[1]).file_path)
             print(f"Selected configuration: {self.current_file}")
 
-        self.email_tree.bind("<<TreeviewSelect>>", on_email_tree_select)
+        self.email_tree.bind(SELECT_EVENT, on_email_tree_select)
 
         # Подсказка
         ttk.Label(
@@ -299,7 +287,7 @@ class ParserConfigWindow(ttk.Toplevel):
     def _load_emails(self):
         """Моковая функция загрузки писем"""
         def wrapper():
-            email_client.get_all_prices(simple_scope=self.rule_data, limit_by_folder=10)
+            get_client().get_all_prices(simple_scope=self.rule_data, limit_by_folder=10)
             emails = []
             if self.rule_data.senders:
                 if self.rule_data.vendor_id:
@@ -433,56 +421,34 @@ class ParserConfigWindow(ttk.Toplevel):
 
         return filtered
 
-    def _display_emails_in_tree(self, emails):
-        """Отображает письма в таблице справа"""
-        # Очищаем таблицу
-        for item in self.email_tree.get_children():
-            self.email_tree.delete(item)
-
-        # Цвета для разных конфигураций
-        # config_colors = {
-        #     'Основной прайс': '#e6f3ff',  # голубой
-        #     'Акционный прайс': '#fff0e6',  # оранжевый
-        #     'Остатки': '#e6ffe6',  # зеленый
-        # }
-
+    def _display_emails_in_tree(self, emails, keep_position: bool = False):
+        """Отображает письма в таблице справа (keep_position - те же письма, сохранить прокрутку и выбор)"""
+        matcher = self._build_config_matcher()
+        rows = []
         for email in emails:
             # Определяем, какая конфигурация подходит для этого файла
-            matched_config = self._find_matching_config(email['filename'])
-
-            # Вставляем запись
-            item_id = self.email_tree.insert(
-                "",
-                END,
-                values=(
-                    email['subject'],
-                    email['filename'],
-                    email['date'],
-                    matched_config if matched_config else "Не назначено"
-                )
-            )
-
-            # Раскрашиваем строку если есть совпадение
-            # if matched_config and matched_config in config_colors:
-            #     self.email_tree.item(item_id, tags=(matched_config,))
-
-        # Настраиваем теги для цветов
-        # for config_name, color in config_colors.items():
-        #     self.email_tree.tag_configure(config_name, background=color)
+            matched_config = self._find_matching_config(email['filename'], matcher)
+            rows.append([
+                email['subject'],
+                email['filename'],
+                email['date'],
+                matched_config if matched_config else "Не назначено"
+            ])
+        self.email_tree.set_data(rows, keep_position=keep_position)
+
+    def _build_config_matcher(self) -> FilenameMatcher:
+        """Матчер по шаблонам из открытых конфигураций (ключ - название конфигурации)"""
+        return FilenameMatcher(
+            (config_frame.vars['config_name'].get(), config_frame.vars['pattern'].get())
+            for config_frame in self.configurations
+            if config_frame.winfo_exists()
+        )
 
-    def _find_matching_config(self, filename):
+    def _find_matching_config(self, filename, matcher: FilenameMatcher | None = None):
         """Находит конфигурацию, подходящую для файла"""
-        filename_lower = filename.lower()
-
-        for config_frame in self.configurations:
-            if not config_frame.winfo_exists():
-                continue
-
-            pattern = config_frame.vars['pattern'].get().strip().lower()
-            if pattern and pattern in filename_lower:
-                return config_frame.vars['config_name'].get()
-
-        return None
+        if matcher is None:
+            matcher = self._build_config_matcher()
+        return matcher.match(filename)
 
     def _on_pattern_change(self, pattern_var, *args):
         """Обработчик изменения шаблона файла"""
@@ -490,23 +456,23 @@ class ParserConfigWindow(ttk.Toplevel):
         if new_pattern != self.current_pattern:
             self.current_pattern = new_pattern
             # Обновляем отображение писем
-            if hasattr(self, 'email_tree') and self.email_tree.get_children():
+            if hasattr(self, 'email_tree') and self.email_tree.row_count:
                 self._update_email_display()
 
     def _update_email_display(self):
         """Обновляет отображение писем при изменении шаблонов"""
         # Получаем текущие данные из таблицы
-        emails = []
-        for item in self.email_tree.get_children():
-            values = self.email_tree.item(item)['values']
-            emails.append({
+        emails = [
+            {
                 'subject': values[0],
                 'filename': values[1],
                 'date': values[2]
-            })
+            }
+            for values in self.email_tree.rows()
+        ]
 
         # Перерисовываем таблицу
-        self._display_emails_in_tree(emails)
+        self._display_emails_in_tree(emails, keep_position=True)
 
     def _add_configuration(self):
         """Добавляет новую конфигурацию парсера"""
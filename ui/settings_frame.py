@@ -16,14 +16,17 @@ import json
 
 import crud
 from models import Filters
-from settings import settings
+from settings import load_settings
 from ui.console import SimpleConsoleWindow
 from ui.parser_config_dialog import ParserConfigWindow
 from ui.role_editor import RolesEditor
+from ui.virtual_table import VirtualTable
 from utils.db import DB_FILE
 from utils.imap import decode_folder_name
+from utils.output_sinks import OUTPUT_FORMATS, DEFAULT_OUTPUT_FORMATS
 from utils.paths import pm
-from ya_client import client as email_client, ThreadSafeIMAPConnection
+from utils.run_history import stage_trends, SLOWDOWN
+from ya_client import ThreadSafeIMAPConnection, reset_client
 
 if TYPE_CHECKING:
     from ui.gui import App
@@ -32,6 +35,8 @@ if TYPE_CHECKING:
 class EmailSettingsFrame(ttk.Frame):
     def __init__(self, parent):
         super().__init__(parent)
+        # Общий dict настроек (settings.load_settings) - читается при открытии вкладки, не при импорте
+        self.settings = load_settings()
         self.pack(fill=BOTH, expand=YES, padx=10, pady=10)
         self._create_widgets()
 
@@ -49,25 +54,25 @@ class EmailSettingsFrame(ttk.Frame):
 
         # Логин (email)
         ttk.Label(container, text="Логин (email):", width=20).grid(row=0, column=0, sticky=W, pady=5)
-        self.email_var = ttk.StringVar(value=settings.get('email_username'))
+        self.email_var = ttk.StringVar(value=self.settings.get('email_username'))
         email_entry = ttk.Entry(container, textvariable=self.email_var, width=30)
         email_entry.grid(row=0, column=1, sticky=W, pady=5, padx=(0, 10))
 
         # Пароль
         ttk.Label(container, text="Пароль:", width=20).grid(row=1, column=0, sticky=W, pady=5)
-        self.password_var = ttk.StringVar(value=settings.get('email_password'))
+        self.password_var = ttk.StringVar(value=self.settings.get('email_password'))
         password_entry = ttk.Entry(container, textvariable=self.password_var, show="*", width=30)
         password_entry.grid(row=1, column=1, sticky=W, pady=5, padx=(0, 10))
 
         # IMAP сервер
         ttk.Label(container, text="IMAP сервер:", width=20).grid(row=2, column=0, sticky=W, pady=5)
-        self.imap_var = ttk.StringVar(value=settings.get('email_server'))
+        self.imap_var = ttk.StringVar(value=self.settings.get('email_server'))
         imap_entry = ttk.Entry(container, textvariable=self.imap_var, width=30)
         imap_entry.grid(row=2, column=1, sticky=W, pady=5, padx=(0, 10))
 
         # Порт
         ttk.Label(container, text="Порт:", width=20).grid(row=3, column=0, sticky=W, pady=5)
-        self.port_var = ttk.StringVar(value=settings.get('email_port'))
+        self.port_var = ttk.StringVar(value=self.settings.get('email_port'))
         port_entry = ttk.Entry(container, textvariable=self.port_var, width=30)
         port_entry.grid(row=3, column=1, sticky=W, pady=5, padx=(0, 10))
 
@@ -97,6 +102,9 @@ class EmailSettingsFrame(ttk.Frame):
             'email_port': self.port_var.get()
         }
         crud.set_settings(s)
+        self.settings.update(s)
+        # Клиент почты пересоздается с новыми настройками при следующей загрузке
+        reset_client()
         ToastNotification(
             title="Сохранено",
             message="Настройки почты сохранены",
@@ -132,6 +140,149 @@ class EmailSettingsFrame(ttk.Frame):
             client.disconnect()
 
 
+class OutputSettingsFrame(ttk.Frame):
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.settings = load_settings()
+        self.pack(fill=BOTH, expand=YES, padx=10, pady=10)
+        self._create_widgets()
+
+    def _create_widgets(self):
+        # Заголовок
+        ttk.Label(
+            self,
+            text="Форматы выгрузки общего прайса",
+            font=("Helvetica", 14, "bold")
+        ).pack(anchor=W, pady=(0, 15))
+
+        container = ttk.Frame(self)
+        container.pack(fill=X, padx=5)
+
+        selected = self.settings.get('output_formats')
+        selected = [f.strip() for f in selected.split(',')] if selected else DEFAULT_OUTPUT_FORMATS
+        self.format_vars = {}
+        for row, (fmt, title) in enumerate(OUTPUT_FORMATS.items()):
+            var = ttk.BooleanVar(value=fmt in selected)
+            ttk.Checkbutton(container, text=title, variable=var).grid(row=row, column=0, sticky=W, pady=5)
+            self.format_vars[fmt] = var
+
+        ttk.Button(
+            container,
+            text="Сохранить настройки",
+            bootstyle=SUCCESS,
+            command=self._save_output_settings
+        ).grid(row=len(OUTPUT_FORMATS), column=0, pady=15, sticky=W)
+
+    def _save_output_settings(self):
+        formats = [fmt for fmt, var in self.format_vars.items() if var.get()]
+        if not formats:
+            messagebox.showwarning("Выгрузка", "Выберите хотя бы один формат")
+            return
+        value = ",".join(formats)
+        crud.set_settings({'output_formats': value})
+        self.settings['output_formats'] = value
+        ToastNotification(
+            title="Сохранено",
+            message="Форматы выгрузки сохранены",
+            bootstyle=SUCCESS
+        ).show_toast()
+
+
+class RunHistoryFrame(ttk.Frame):
+    """История запусков загрузки и разбора (crud.list_runs) и тренды этапов"""
+    KINDS = {"fetch": "Загрузка", "parse": "Разбор", "rebuild": "Пересборка"}
+    MODES = {"period": "Период", "depth": "Глубина", "limit": "Последний", "config": "Конфигурация"}
+
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.pack(fill=BOTH, expand=YES, padx=10, pady=10)
+        self._create_widgets()
+        self.refresh()
+
+    def _create_widgets(self):
+        header = ttk.Frame(self)
+        header.pack(fill=X, pady=(0, 10))
+        ttk.Label(header, text="История запусков", font=("Helvetica", 14, "bold")).pack(side=LEFT)
+        ttk.Button(header, text="Обновить", command=self.refresh).pack(side=RIGHT)
+
+        self.warning_label = ttk.Label(self, text="", bootstyle=WARNING)
+        self.warning_label.pack(fill=X)
+
+        runs_frame = ttk.Labelframe(self, text="Запуски", padding=5)
+        runs_frame.pack(fill=BOTH, expand=YES, pady=(5, 5))
+        self.runs_table = VirtualTable(
+            runs_frame,
+            coldata=["Начало", "Вид", "Режим", "Время, с", "Писем", "Прошли фильтр", "МБ",
+                     "Файлов", "Строк прочитано", "Строк в прайс", "Пик памяти, МБ", "Статус", "Замедлились"],
+            height=8,
+            column_width=100,
+            sortable=True,
+            xscroll=True,
+        )
+        self.runs_table.pack(fill=BOTH, expand=YES)
+
+        trends_frame = ttk.Labelframe(
+            self, text=f"Этапы: последние запуски (⚠️ - дольше {SLOWDOWN:g} медиан на строку)", padding=5)
+        trends_frame.pack(fill=BOTH, expand=YES)
+        self.trends_table = VirtualTable(
+            trends_frame,
+            coldata=["Вид", "Режим", "Этап", "Запусков", "Последний, с", "Медиана, с", "Мин, с", "Макс, с",
+                     {"text": "Тренд", "width": 200}, ""],
+            height=8,
+            column_width=100,
+            sortable=True,
+        )
+        self.trends_table.pack(fill=BOTH, expand=YES)
+
+    @staticmethod
+    def _mb(value):
+        return f"{value / (1024 * 1024):.1f}" if value is not None else ""
+
+    @staticmethod
+    def _number(value):
+        return "" if value is None else str(value)
+
+    def refresh(self):
+        runs = crud.list_runs()
+        self.runs_table.set_data([
+            [
+                run.started_at.strftime('%Y-%m-%d %H:%M:%S'),
+                self.KINDS.get(run.kind, run.kind),
+                self.MODES.get(run.mode, run.mode),
+                f"{run.seconds:.1f}",
+                self._number(run.emails_scanned),
+                self._number(run.emails_matched),
+                self._mb(run.bytes_fetched),
+                self._number(run.files_parsed),
+                self._number(run.rows_in),
+                self._number(run.rows_out),
+                self._mb(run.peak_rss),
+                "Ошибка" if run.status != "ok" else "",
+                ", ".join(w["stage"] for w in run.warnings or []),
+            ]
+            for run in runs
+        ], keep_position=True)
+        self.trends_table.set_data([
+            [
+                self.KINDS.get(t["kind"], t["kind"]), self.MODES.get(t["mode"], t["mode"]), t["stage"], t["runs"],
+                f"{t['last']:.2f}", f"{t['median']:.2f}", f"{t['min']:.2f}", f"{t['max']:.2f}",
+                t["trend"], "⚠️" if t["slow"] else "",
+            ]
+            for t in stage_trends(runs)
+        ], keep_position=True)
+
+        latest = {}
+        for run in runs:
+            latest.setdefault((run.kind, run.mode), run)
+        warnings = [
+            f"{self.KINDS.get(kind, kind)} ({self.MODES.get(mode, mode)}): {w['stage']} {w['seconds']:.1f} с "
+            f"(медиана на тот же объем {w['median']:.1f} с)"
+            for (kind, mode), run in latest.items() for w in run.warnings or []
+        ]
+        self.warning_label.configure(text=("⚠️ Замедление в последних запусках: " + "; ".join(warnings))
+                                     if warnings else "")
+
+
 class FilterRuleRow(ttk.Frame):
     def __init__(self, parent, rule_data=None, on_delete=None):
         super().__init__(parent)
@@ -397,6 +548,21 @@ def create_settings_frame(self, notebook):
     settings_notebook.add(filter_tab, text="🔍 Фильтрация писем")
     filter_frame = FilterSettingsFrame(filter_tab)
 
+    # Вкладка выгрузки
+    output_tab = ttk.Frame(settings_notebook)
+    settings_notebook.add(output_tab, text="📤 Выгрузка")
+    OutputSettingsFrame(output_tab)
+
+    # Вкладка истории запусков
+    history_tab = ttk.Frame(settings_notebook)
+    settings_notebook.add(history_tab, text="📈 История запусков")
+    history_frame = RunHistoryFrame(history_tab)
+    settings_notebook.bind(
+        "<<NotebookTabChanged>>",
+        lambda e: history_frame.refresh() if settings_notebook.select() == str(history_tab) else None,
+        add="+",
+    )
+
     # Кнопка сохранения всех настроек
     bottom_frame = ttk.Frame(tab_settings)
     bottom_frame.pack(fill=X, padx=10, pady=10)
@@ -0,0 +1,480 @@
+"""
+Таблица с виртуальной прокруткой.
+
+В ttk.Treeview всегда столько строк, сколько помещается в окне: при прокрутке в те же
+строки подставляются значения из данных (DataFrame, двумерный массив NumPy, словарь
+колонок или список строк), поэтому размер данных на скорость отрисовки не влияет.
+При virtual_columns=True так же по окну выбираются и колонки - для листов в сотни колонок.
+
+Выбор строки - событие <<TableSelect>> на самой таблице, номер строки - selected_row.
+"""
+import ttkbootstrap as ttk
+from ttkbootstrap.constants import *
+
+SELECT_EVENT = "<<TableSelect>>"
+# Строк за один шаг колесика мыши
+WHEEL_ROWS = 3
+# Высота строки, пока Treeview еще не отрисован и в стиле она не задана
+DEFAULT_ROW_HEIGHT = 20
+
+
+def cell_text(value, maxlen: int | None = None) -> str:
+    """Текст ячейки: None, NaN и NaT - пустая строка, длинные значения обрезаются"""
+    if value is None:
+        return ""
+    try:
+        if value != value:  # NaN, NaT
+            return ""
+    except (TypeError, ValueError):  # pd.NA и массивы в ячейках
+        return ""
+    s = str(value)
+    return s if maxlen is None or len(s) <= maxlen else s[:maxlen - 3] + "..."
+
+
+def _sort_key(value):
+    """Числа (в том числе записанные строкой) - по значению, перед текстом; пустые - отдельно (2, ...)"""
+    text = cell_text(value)
+    if not text:
+        return 2, 0, ""
+    try:
+        return 0, float(text), ""
+    except ValueError:
+        return 1, 0, text.lower()
+
+
+class TableData:
+    """
+    Данные таблицы, хранятся по колонкам (массивы NumPy не копируются).
+    Строки представления (после поиска и сортировки) переводятся в строки данных через order.
+    """
+
+    def __init__(self, data=None, columns: list[str] | None = None):
+        self.columns: list[str] = []
+        self._values: list = []
+        self._rows = 0
+        self.order: list[int] | None = None
+        self._query = ""
+        self._sort: tuple[int, bool] | None = None
+        if data is not None:
+            self.set(data, columns)
+
+    def set(self, data, columns: list[str] | None = None):
+        if hasattr(data, "iloc"):  # DataFrame
+            values = [self._column_array(data.iloc[:, i]) for i in range(data.shape[1])]
+            names = [str(c) for c in data.columns]
+            rows = len(data)
+        elif getattr(data, "ndim", None) == 2:  # массив NumPy
+            values = [data[:, i] for i in range(data.shape[1])]
+            names = [str(i + 1) for i in range(data.shape[1])]
+            rows = data.shape[0]
+        elif isinstance(data, dict):  # {колонка: значения}
+            values = [self._column_array(v) if hasattr(v, "to_numpy") else list(v) for v in data.values()]
+            names = [str(k) for k in data]
+            rows = len(values[0]) if values else 0
+        else:  # список строк
+            data = list(data)
+            width = len(columns) if columns else max((len(r) for r in data), default=0)
+            values = [[r[i] if i < len(r) else None for r in data] for i in range(width)]
+            names = [str(i + 1) for i in range(width)]
+            rows = len(data)
+        self._values = values
+        self._rows = rows
+        self.columns = list(columns) if columns is not None and len(columns) == len(values) else names
+        self._rebuild_order()
+
+    @staticmethod
+    def _column_array(series):
+        """Значения колонки без копирования; даты и типы pandas (Int64, string) - объектами, чтобы текст был как в pandas"""
+        from pandas.api.types import is_extension_array_dtype  # pandas уже загружен, раз передан DataFrame
+
+        if series.dtype.kind in "mM" or is_extension_array_dtype(series.dtype):
+            return series.to_numpy(dtype=object)
+        return series.to_numpy()
+
+    def __len__(self):
+        return self._rows if self.order is None else len(self.order)
+
+    @property
+    def total_rows(self) -> int:
+        """Сколько строк в данных (без учета поиска)"""
+        return self._rows
+
+    @property
+    def column_count(self) -> int:
+        return len(self._values)
+
+    def row_index(self, view_row: int) -> int:
+        """Строка данных для строки представления"""
+        return view_row if self.order is None else self.order[view_row]
+
+    def view_row(self, row: int) -> int | None:
+        """Строка представления для строки данных (None - скрыта поиском)"""
+        if self.order is None:
+            return row if 0 <= row < self._rows else None
+        try:
+            return self.order.index(row)
+        except ValueError:
+            return None
+
+    def row(self, row: int) -> list:
+        return [values[row] for values in self._values]
+
+    def rows(self) -> list[list]:
+        """Все строки в исходном порядке"""
+        return [list(r) for r in zip(*self._values)] if self._values else [[] for _ in range(self._rows)]
+
+    def window(self, first: int, count: int, columns: list[int], maxlen: int | None = None) -> list[list[str]]:
+        """Тексты ячеек строк представления first..first+count для колонок columns"""
+        last = min(first + count, len(self))
+        if last <= first:
+            return []
+        if self.order is None:
+            cells = [self._values[c][first:last] for c in columns]
+        else:
+            index = self.order[first:last]
+            cells = [[self._values[c][i] for i in index] for c in columns]
+        return [[cell_text(v, maxlen) for v in row] for row in zip(*cells)] if cells else [[] for _ in range(last - first)]
+
+    def set_cell(self, row: int, column: int, value):
+        """Записывает значение в массив колонки (для DataFrame - это может быть его собственный массив)"""
+        self._values[column][row] = value
+
+    def set_column(self, column: int, values):
+        self._values[column] = values
+        if self._query or (self._sort and self._sort[0] == column):
+            self._rebuild_order()
+
+    def filter(self, query: str):
+        self._query = query.strip().lower()
+        self._rebuild_order()
+
+    def sort(self, column: int | None, reverse: bool = False):
+        self._sort = None if column is None else (column, reverse)
+        self._rebuild_order()
+
+    def _rebuild_order(self):
+        if self._sort and self._sort[0] >= len(self._values):
+            self._sort = None
+        if not self._query and not self._sort:
+            self.order = None
+            return
+        order = range(self._rows)
+        if self._query:
+            order = [i for i in order if any(self._query in cell_text(values[i]).lower() for values in self._values)]
+        if self._sort:
+            column, reverse = self._sort
+            values = self._values[column]
+            keys = {i: _sort_key(values[i]) for i in order}
+            blank = [i for i in order if keys[i][0] == 2]
+            order = sorted((i for i in order if keys[i][0] != 2), key=keys.__getitem__, reverse=reverse) + blank
+        self.order = list(order)
+
+
+class VirtualTable(ttk.Frame):
+    """
+    Таблица на ttk.Treeview, отрисовывающая только видимые строки (и колонки при virtual_columns).
+
+    coldata - заголовки колонок: строки или словари {"text", "width", "stretch", "anchor"}, как у Tableview.
+    """
+
+    def __init__(self, master, coldata=(), rowdata=None, height: int = 20, column_width: int = 120,
+                 maxlen: int | None = None, virtual_columns: bool = False, searchable: bool = False,
+                 sortable: bool = False, xscroll: bool = False, bootstyle=DEFAULT, **kwargs):
+        super().__init__(master, **kwargs)
+        self.data = TableData()
+        self.coldata = [self._normalize_column(c) for c in coldata]
+        self.column_width = column_width
+        self.maxlen = maxlen
+        self.virtual_columns = virtual_columns
+        self.sortable = sortable
+
+        self.first_row = 0
+        self.first_column = 0
+        self.selected_row: int | None = None  # индекс строки данных
+        self._pool: list[str] = []  # строки Treeview
+        self._slots: list[str] = []  # колонки Treeview
+        self._row_metrics: tuple[int, int] | None = None  # (высота строки, высота шапки)
+        self._sort: tuple[int, bool] | None = None
+
+        if searchable:
+            search_frame = ttk.Frame(self)
+            search_frame.pack(fill=X, pady=(0, 5))
+            ttk.Label(search_frame, text="Поиск:").pack(side=LEFT, padx=(0, 5))
+            self.search_var = ttk.StringVar()
+            self.search_var.trace_add("write", lambda *_: self.search(self.search_var.get()))
+            ttk.Entry(search_frame, textvariable=self.search_var).pack(side=LEFT, fill=X, expand=YES)
+
+        body = ttk.Frame(self)
+        body.pack(fill=BOTH, expand=YES)
+        self.tree = ttk.Treeview(body, show="headings", height=height, selectmode="none", bootstyle=bootstyle)
+        self._vsb = ttk.Scrollbar(body, orient=VERTICAL, command=self._yview)
+        self.tree.grid(row=0, column=0, sticky="nsew")
+        self._vsb.grid(row=0, column=1, sticky="ns")
+        if virtual_columns or xscroll:
+            self._hsb = ttk.Scrollbar(body, orient=HORIZONTAL,
+                                      command=self._xview if virtual_columns else self.tree.xview)
+            if not virtual_columns:
+                self.tree.configure(xscrollcommand=self._hsb.set)
+            self._hsb.grid(row=1, column=0, sticky="ew")
+        else:
+            self._hsb = None
+        body.grid_rowconfigure(0, weight=1)
+        body.grid_columnconfigure(0, weight=1)
+
+        self.tree.bind("<Configure>", self._on_resize)
+        self.tree.bind("<Button-1>", self._on_click)
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.tree.bind(sequence, self._on_wheel)
+        if virtual_columns:
+            self.tree.bind("<Shift-MouseWheel>", self._on_shift_wheel)
+        for key in ("<Up>", "<Down>", "<Prior>", "<Next>", "<Home>", "<End>"):
+            self.tree.bind(key, self._on_key)
+
+        self._resize_pool(height)
+        self.set_data(rowdata if rowdata is not None else [])
+
+    # ----------------- данные -----------------
+    def set_data(self, data, columns: list | None = None, keep_position: bool = False):
+        """
+        Заменяет данные таблицы. columns - заголовки (по умолчанию из coldata или из данных).
+        keep_position - сохранить прокрутку и выбранную строку (обновление тех же данных).
+        """
+        if columns is not None:
+            self.coldata = [self._normalize_column(c) for c in columns]
+        # Поиск и сортировка сохраняются в TableData и применяются к новым данным
+        self.data.set(data, [c["text"] for c in self.coldata] if self.coldata else None)
+        if not keep_position:
+            self.first_row = 0
+            self.first_column = 0
+            self.selected_row = None
+        elif self.selected_row is not None and self.selected_row >= self.data.total_rows:
+            self.selected_row = None
+        self._configure_slots()
+        self._render()
+
+    @property
+    def row_count(self) -> int:
+        """Сколько строк показано (с учетом поиска)"""
+        return len(self.data)
+
+    def rows(self) -> list[list]:
+        """Все строки данных в исходном порядке"""
+        return self.data.rows()
+
+    def row_values(self, row: int) -> list:
+        return self.data.row(row)
+
+    def selected_values(self) -> list | None:
+        return None if self.selected_row is None else self.data.row(self.selected_row)
+
+    def set_cell(self, row: int, column: int, value):
+        """Меняет одну ячейку; если она на экране - перерисовывается только она"""
+        self.data.set_cell(row, column, value)
+        view_row = self.data.view_row(row)
+        if view_row is None or not self.first_row <= view_row < self.first_row + len(self._pool):
+            return
+        columns = self._visible_columns()
+        if column in columns:
+            self.tree.set(self._pool[view_row - self.first_row], self._slots[columns.index(column)],
+                          cell_text(value, self.maxlen))
+
+    def set_column(self, column: int, values, heading: str | None = None):
+        """Меняет значения колонки целиком; перерисовывается только видимое окно"""
+        self.data.set_column(column, values)
+        if heading is not None:
+            self.data.columns[column] = heading
+            self._render_headings()
+        self._render()
+
+    # ----------------- выбор и прокрутка -----------------
+    def select(self, row: int | None, see: bool = True):
+        """Выбирает строку данных (None - снять выбор) и генерирует <<TableSelect>>"""
+        self.selected_row = row
+        if see and row is not None:
+            self.see(row)
+        self._render()
+        self.event_generate(SELECT_EVENT, when="tail")
+
+    def see(self, row: int):
+        """Прокручивает так, чтобы строка данных была видна"""
+        view_row = self.data.view_row(row)
+        if view_row is None:
+            return
+        if view_row < self.first_row:
+            self._scroll_to(view_row)
+        elif view_row >= self.first_row + len(self._pool):
+            self._scroll_to(view_row - len(self._pool) + 1)
+
+    def search(self, query: str):
+        self.data.filter(query)
+        self.first_row = 0
+        self._render()
+
+    def sort(self, column: int | None, reverse: bool = False):
+        self._sort = None if column is None else (column, reverse)
+        self.data.sort(column, reverse)
+        self._render()
+
+    def _scroll_to(self, first_row: int):
+        self.first_row = max(0, min(first_row, len(self.data) - len(self._pool)))
+        self._render()
+
+    def _scroll_columns_to(self, first_column: int):
+        first_column = max(0, min(first_column, self.data.column_count - len(self._slots)))
+        if first_column != self.first_column:
+            self.first_column = first_column
+            self._render_headings()
+            self._render()
+
+    def _yview(self, *args):
+        if args[0] == "moveto":
+            self._scroll_to(round(float(args[1]) * len(self.data)))
+        elif args[0] == "scroll":
+            step = len(self._pool) if args[2] == "pages" else 1
+            self._scroll_to(self.first_row + int(args[1]) * step)
+
+    def _xview(self, *args):
+        if args[0] == "moveto":
+            self._scroll_columns_to(round(float(args[1]) * self.data.column_count))
+        elif args[0] == "scroll":
+            step = len(self._slots) if args[2] == "pages" else 1
+            self._scroll_columns_to(self.first_column + int(args[1]) * step)
+
+    # ----------------- события -----------------
+    def _on_resize(self, event):
+        measured = self._row_metrics is not None
+        self._fit(event.width, event.height)
+        if not measured:
+            # Первая отрисовка: размеры строк взяты из стиля, уточняем по отрисованной строке
+            self.after_idle(lambda: self.winfo_exists() and self._fit(self.tree.winfo_width(), self.tree.winfo_height()))
+
+    def _fit(self, width: int, height: int):
+        """Столько строк (и колонок), сколько помещается в Treeview"""
+        row_height, header_height = self._measure_rows()
+        self._resize_pool(max(1, (height - header_height) // row_height))
+        if self.virtual_columns:
+            self._configure_slots(width)
+        self._render()
+
+    def _on_click(self, event):
+        if self.tree.identify_region(event.x, event.y) not in ("cell", "tree"):
+            return None  # шапка и границы колонок - стандартная обработка
+        self.tree.focus_set()
+        item = self.tree.identify_row(event.y)
+        if item in self._pool:
+            view_row = self.first_row + self._pool.index(item)
+            if view_row < len(self.data):
+                self.select(self.data.row_index(view_row), see=False)
+        return "break"
+
+    def _on_wheel(self, event):
+        if event.num == 4 or getattr(event, "delta", 0) > 0:
+            self._scroll_to(self.first_row - WHEEL_ROWS)
+        else:
+            self._scroll_to(self.first_row + WHEEL_ROWS)
+        return "break"
+
+    def _on_shift_wheel(self, event):
+        self._scroll_columns_to(self.first_column + (-1 if event.delta > 0 else 1))
+        return "break"
+
+    def _on_key(self, event):
+        count = len(self.data)
+        if not count:
+            return "break"
+        current = self.data.view_row(self.selected_row) if self.selected_row is not None else None
+        page = max(1, len(self._pool) - 1)
+        target = {
+            "Up": (current if current is not None else 1) - 1,
+            "Down": (current if current is not None else -1) + 1,
+            "Prior": (current or 0) - page,
+            "Next": (current or 0) + page,
+            "Home": 0,
+            "End": count - 1,
+        }.get(event.keysym)
+        if target is not None:
+            self.select(self.data.row_index(max(0, min(target, count - 1))))
+        return "break"
+
+    # ----------------- отрисовка -----------------
+    def _measure_rows(self) -> tuple[int, int]:
+        """Высота строки и шапки по уже отрисованной строке Treeview"""
+        if self._pool:
+            bbox = self.tree.bbox(self._pool[0])
+            if bbox:
+                self._row_metrics = (max(1, bbox[3]), bbox[1])
+        if self._row_metrics:
+            return self._row_metrics
+        try:
+            row_height = int(ttk.Style().lookup(self.tree.cget("style") or "Treeview", "rowheight"))
+        except (TypeError, ValueError):
+            row_height = DEFAULT_ROW_HEIGHT
+        return row_height, row_height + 4
+
+    def _resize_pool(self, count: int):
+        while len(self._pool) < count:
+            self._pool.append(self.tree.insert("", END, values=()))
+        while len(self._pool) > count:
+            self.tree.delete(self._pool.pop())
+
+    def _visible_columns(self) -> list[int]:
+        return list(range(self.first_column, min(self.first_column + len(self._slots), self.data.column_count)))
+
+    def _configure_slots(self, width: int | None = None):
+        """Колонки Treeview: все колонки данных или столько, сколько помещается по ширине"""
+        count = self.data.column_count
+        if self.virtual_columns:
+            width = width or self.tree.winfo_width()
+            if width <= 1:  # еще не отрисована
+                width = 10 * self.column_width
+            count = min(count, width // self.column_width + 1)
+            self.first_column = max(0, min(self.first_column, self.data.column_count - count))
+        slots = [f"c{i}" for i in range(count)]
+        if slots != self._slots:
+            self._slots = slots
+            self.tree.configure(columns=slots)
+        self._render_headings()
+
+    def _render_headings(self):
+        for slot, column in zip(self._slots, self._visible_columns()):
+            settings = self.coldata[column] if column < len(self.coldata) else {}
+            text = self.data.columns[column] if column < len(self.data.columns) else settings.get("text", "")
+            if self._sort and self._sort[0] == column:
+                text += " ▼" if self._sort[1] else " ▲"
+            command = (lambda c=column: self._on_heading(c)) if self.sortable else ""
+            self.tree.heading(slot, text=text, anchor=W, command=command)
+            if self.virtual_columns:
+                self.tree.column(slot, width=self.column_width, stretch=False, anchor=W)
+            else:
+                self.tree.column(slot, width=settings.get("width", self.column_width),
+                                 stretch=settings.get("stretch", True), anchor=settings.get("anchor", W))
+
+    def _on_heading(self, column: int):
+        reverse = bool(self._sort and self._sort[0] == column and not self._sort[1])
+        self.sort(column, reverse)
+        self._render_headings()
+
+    def _render(self):
+        count = len(self.data)
+        self.first_row = max(0, min(self.first_row, count - len(self._pool)))
+        texts = self.data.window(self.first_row, len(self._pool), self._visible_columns(), self.maxlen)
+        selected = []
+        for k, item in enumerate(self._pool):
+            self.tree.item(item, values=texts[k] if k < len(texts) else ())
+            if k < len(texts) and self.data.row_index(self.first_row + k) == self.selected_row:
+                selected.append(item)
+        self.tree.selection_set(selected)
+
+        self._vsb.set(*self._fraction(self.first_row, len(self._pool), count))
+        if self.virtual_columns and self._hsb is not None:
+            self._hsb.set(*self._fraction(self.first_column, len(self._slots), self.data.column_count))
+
+    @staticmethod
+    def _fraction(first: int, visible: int, total: int) -> tuple[float, float]:
+        if total <= 0:
+            return 0.0, 1.0
+        return first / total, min(1.0, (first + visible) / total)
+
+    @staticmethod
+    def _normalize_column(column) -> dict:
+        return dict(column) if isinstance(column, dict) else {"text": str(column)}
@@ -0,0 +1,102 @@
+import fnmatch
+import logging
+import re
+from typing import Hashable, Iterable
+
+log = logging.getLogger(__name__)
+
+# Префикс шаблона-регулярного выражения: 're:прайс_\d+\.xlsx'
+REGEX_PREFIX = "re:"
+# Префикс шаблона-glob-маски: 'glob:*прайс*.xls?'. Без префикса * ? [ - обычные символы
+# подстроки: сохраненные шаблоны вроде 'Прайс [опт]' не меняют смысл
+GLOB_PREFIX = "glob:"
+
+# Приоритет видов шаблонов: регулярное выражение > glob > подстрока
+_PRIORITY = {"regex": 0, "glob": 1, "substring": 2}
+
+
+def template_kind(template: str) -> str:
+    """Вид шаблона имени файла: regex, glob или substring"""
+    if template.lower().startswith(REGEX_PREFIX):
+        return "regex"
+    if template.lower().startswith(GLOB_PREFIX):
+        return "glob"
+    return "substring"
+
+
+class FilenameMatcher:
+    """
+    Сопоставляет имя вложения с шаблонами конфигураций.
+    Шаблоны компилируются один раз; регистр не учитывается.
+
+    Виды шаблонов:
+    - 're:<выражение>' - регулярное выражение (re.search);
+    - 'glob:<маска>' - glob-маска (* ? [...]) на все имя файла;
+    - иначе - подстрока.
+    При нескольких совпадениях побеждает шаблон с большим приоритетом
+    (regex > glob > подстрока), затем более длинный, затем добавленный раньше.
+    """
+
+    def __init__(self, entries: Iterable[tuple[Hashable, str | None]]):
+        rules = []
+        for order, (key, template) in enumerate(entries):
+            template = (template or "").strip()
+            if not template:
+                continue
+            kind = template_kind(template)
+            if kind == "regex":
+                source = template[len(REGEX_PREFIX):]
+                try:
+                    matcher = re.compile(source, re.IGNORECASE).search
+                except re.error as e:
+                    log.warning("Некорректное регулярное выражение в шаблоне '%s': %s", template, e)
+                    continue
+            elif kind == "glob":
+                source = template[len(GLOB_PREFIX):]
+                matcher = re.compile(fnmatch.translate(source.casefold())).match
+            else:
+                source = template.casefold()
+                matcher = None
+            rules.append((_PRIORITY[kind], -len(source), order, kind, source, matcher, key))
+        rules.sort(key=lambda rule: rule[:3])
+        self._rules = [(kind, source, matcher, key) for _, _, _, kind, source, matcher, key in rules]
+
+    @classmethod
+    def for_configs(cls, configs) -> "FilenameMatcher":
+        """Матчер по конфигурациям парсинга: ключ - id конфигурации"""
+        return cls((config.id, config.filename_template) for config in configs)
+
+    def regex_patterns(self) -> list[tuple[Hashable, str]]:
+        """
+        Шаблоны в порядке приоритета как регулярные выражения для re.search
+        (используются в SQL через функцию regexp, см. utils.db)
+        """
+        patterns = []
+        for kind, source, _, key in self._rules:
+            if kind == "substring":
+                pattern = re.escape(source)
+            elif kind == "glob":
+                pattern = "^" + fnmatch.translate(source.casefold())
+            else:
+                pattern = source
+            patterns.append((key, "(?i)" + pattern))
+        return patterns
+
+    def match(self, filename: str | None) -> Hashable | None:
+        """Ключ первой подходящей конфигурации или None"""
+        if not filename:
+            return None
+        folded = filename.casefold()
+        for kind, source, matcher, key in self._rules:
+            if kind == "substring":
+                if source in folded:
+                    return key
+            elif kind == "glob":
+                if matcher(folded):
+                    return key
+            elif matcher(filename):
+                return key
+        return None
+
+    def __bool__(self):
+        return bool(self._rules)
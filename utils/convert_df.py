@@ -1,17 +1,25 @@
+import logging
 from datetime import datetime
+from pathlib import Path
 
 import pandas as pd
-import re
 import json
 
-from openpyxl.styles import Side, Border, PatternFill, Font, Alignment
+from openpyxl.styles import Side, Border, PatternFill, Font, Alignment, NamedStyle
 from openpyxl.utils import get_column_letter
-from openpyxl import load_workbook
+from openpyxl import load_workbook, Workbook
+from openpyxl.cell import WriteOnlyCell
 
 from models import ParsingConfig
+from utils import profiler
+from utils.file_reader import join_header_rows, iter_excel_batches, STREAM_BATCH_SIZE
+from utils.parse_plan import ConfigPlan
 from utils.paths import pm
+from utils.price_parser import parse_price_series
 from utils.stock_normalizer import normalize_stock_value
 
+log = logging.getLogger(__name__)
+
 
 def old_to_excel_with_role_widths(df: pd.DataFrame, filename: str, widths: dict | None = None):
     """
@@ -43,192 +51,196 @@ def old_to_excel_with_role_widths(df: pd.DataFrame, filename: str, widths: dict
     wb.save(filename)
 
 
-def to_excel_with_role_widths(df: pd.DataFrame, filename: str, widths: dict | None = None):
+# Ширина колонок по ролям (для остальных колонок - DEFAULT_COLUMN_WIDTH)
+ROLE_WIDTHS = {
+    "Наименование": 100,
+    "Артикул": 18,
+    "Цена": 16,
+    "Дата": 20,
+    "Остаток": 16,
+    "(?) Бренд": 18,
+    "(?) РРЦ": 16
+}
+DEFAULT_COLUMN_WIDTH = 15
+# Колонки, выравниваемые по правому краю
+RIGHT_ALIGNED_COLUMNS = ("Остаток",)
+
+
+def order_columns(columns: list) -> list:
+    """Порядок колонок в выгрузке: Артикул, Наименование, Закупочная цена, ..., Поставщик, Дата"""
+    priority_columns = ["Артикул", "Наименование", "Закупочная цена"]
+    last_columns = ["Поставщик", "Дата"]
+    ordered_columns = [col for col in priority_columns if col in columns]
+    ordered_columns.extend(col for col in columns if col not in ordered_columns and col not in last_columns)
+    ordered_columns.extend(col for col in last_columns if col in columns)
+    return ordered_columns
+
+
+def _column_values(series: pd.Series) -> list:
+    """Значения колонки для записи в Excel: NaN -> None, даты без часового пояса"""
+    if isinstance(series.dtype, pd.DatetimeTZDtype):
+        series = series.dt.tz_localize(None)
+    values = series.astype(object)
+    return values.where(series.notna(), None).tolist()
+
+
+def _write_sheet(wb, title: str, df: pd.DataFrame, widths: dict):
+    """Пишет DataFrame на новый лист книги в режиме write_only (строки сразу уходят в файл)"""
+    ws = wb.create_sheet(title=title)
+    columns = list(df.columns)
+
+    for i, col in enumerate(columns, 1):
+        ws.column_dimensions[get_column_letter(i)].width = widths.get(col, DEFAULT_COLUMN_WIDTH)
+    if len(df) > 0 and columns:
+        ws.auto_filter.ref = f"A1:{get_column_letter(len(columns))}{len(df) + 1}"
+
+    header = []
+    for col in columns:
+        cell = WriteOnlyCell(ws, value=str(col))
+        cell.style = "price_header"
+        header.append(cell)
+    ws.append(header)
+
+    # Данные пишутся значениями без стилей (даты получают формат автоматически);
+    # стиль нужен только колонкам с выравниванием вправо
+    styled = [i for i, col in enumerate(columns) if col in RIGHT_ALIGNED_COLUMNS]
+    values = [_column_values(df[col]) for col in df.columns]
+    for row in zip(*values):
+        if styled:
+            row = list(row)
+            for i in styled:
+                cell = WriteOnlyCell(ws, value=row[i])
+                cell.style = "price_right"
+                row[i] = cell
+        ws.append(row)
+
+
+def _register_styles(wb):
+    """Именованные стили выгрузки: шапка и ячейка с выравниванием вправо"""
+    thin = Side(style='thin')
+
+    header = NamedStyle(name="price_header")
+    header.fill = PatternFill(start_color="D3D3D3", end_color="D3D3D3", fill_type="solid")
+    header.border = Border(left=thin, right=thin, top=thin, bottom=thin)
+    header.font = Font(bold=True)
+
+    right = NamedStyle(name="price_right")
+    right.alignment = Alignment(horizontal='right')
+
+    for style in (header, right):
+        wb.add_named_style(style)
+
+
+def to_excel_with_role_widths(df: pd.DataFrame, filename: str, widths: dict | None = None,
+                              extra_sheets: dict[str, pd.DataFrame] | None = None):
     """
-    Сохраняет DataFrame в Excel и устанавливает ширину колонок по ролям.
+    Сохраняет DataFrame в Excel за один проход (openpyxl write_only):
+    ширина колонок по ролям, автофильтр, серая шапка с границами.
 
     Аргументы:
     - df: DataFrame
     - filename: путь к Excel файлу
     - widths: словарь {роль: ширина}
+    - extra_sheets: дополнительные листы {название: DataFrame}
     """
-    role_widths = {
-        "Наименование": 100,
-        "Артикул": 18,
-        "Цена": 16,
-        "Дата": 20,
-        "Остаток": 16,
-        "(?) Бренд": 18,
-        "(?) РРЦ": 16
-    }
     if not widths:
-        widths = role_widths
-
-    for col in df.columns:
-        if pd.api.types.is_datetime64_any_dtype(df[col]):
-            # Убираем временные зоны, если они есть
-            df[col] = df[col].dt.tz_localize(None)
-    # Если есть колонка "Поставщик", перемещаем ее в конец
-    # if "Поставщик" in df.columns:
-    #     cols = [col for col in df.columns if col != "Поставщик"] + ["Поставщик"]
-    #     df = df[cols]
-
-    # Жестко задаем порядок колонок
-    priority_columns = ["Артикул", "Наименование", "Закупочная цена"]
-    last_columns = ["Поставщик", "Дата"]
-
-    # Создаем новый порядок колонок
-    current_columns = list(df.columns)
-
-    # Приоритетные колонки (в указанном порядке)
-    ordered_columns = [col for col in priority_columns if col in current_columns]
-
-    # Остальные колонки (кроме тех, что уже добавлены и кроме последних)
-    remaining_columns = [col for col in current_columns
-                         if col not in ordered_columns and col not in last_columns]
+        widths = ROLE_WIDTHS
 
-    # Последние колонки
-    ordered_columns.extend(remaining_columns)
-    ordered_columns.extend([col for col in last_columns if col in current_columns])
-
-    # Применяем новый порядок
-    df = df[ordered_columns]
-
-    # Сохраняем DataFrame в Excel
-    df.to_excel(filename, index=False)
-
-    # Открываем книгу для форматирования
-    wb = load_workbook(filename)
-    ws = wb.active
-
-    # Устанавливаем ширину колонок
-    for i, col in enumerate(df.columns, 1):
-        width = widths.get(col, 15)  # если роль не в словаре, ставим ширину по умолчанию
-        ws.column_dimensions[get_column_letter(i)].width = width
-
-    # Добавляем автофильтр на заголовки
-    if len(df) > 0:
-        ws.auto_filter.ref = f"A1:{get_column_letter(len(df.columns))}{len(df) + 1}"
-
-    # Форматируем заголовки (цвет фона и границы)
-    header_fill = PatternFill(start_color="D3D3D3", end_color="D3D3D3", fill_type="solid")
-    thin_border = Border(
-        left=Side(style='thin'),
-        right=Side(style='thin'),
-        top=Side(style='thin'),
-        bottom=Side(style='thin')
-    )
-
-    # Применяем форматирование к заголовкам
-    for cell in ws[1]:
-        cell.fill = header_fill
-        cell.border = thin_border
-        cell.font = Font(bold=True)
-    right_align = Alignment(horizontal='right')
-    # Применяем границы ко всем ячейкам с данными
-    if len(df) > 0:
-        for row in ws.iter_rows(min_row=1, max_row=len(df) + 1, max_col=len(df.columns)):
-            for cell in row:
-                cell.border = thin_border
-                # Если это колонка "Остаток" - выравниваем по правому краю
-                if cell.column_letter == get_column_letter(list(df.columns).index("Остаток") + 1) and cell.row > 1:
-                    cell.alignment = right_align
-
-    # Сохраняем изменения
+    wb = Workbook(write_only=True)
+    _register_styles(wb)
+    _write_sheet(wb, "Sheet1", df[order_columns(list(df.columns))], widths)
+    for title, sheet_df in (extra_sheets or {}).items():
+        _write_sheet(wb, title, sheet_df, widths)
     wb.save(filename)
 
 
+def get_roles_mapping(settings: ParsingConfig | ConfigPlan) -> dict:
+    """Возвращает словарь {роль: исходная колонка} для конфигурации (модели или плана парсинга)"""
+    return dict(settings.roles_mapping)
 
-def apply_parser_settings(df_original: pd.DataFrame, settings: ParsingConfig, vendor_name: str,
-                          date: datetime | None = None, quantum_config: dict | None = None) -> pd.DataFrame:
-    """
-    Применяет настройки парсинга к исходному DataFrame и возвращает отфильтрованный DataFrame.
-
-    Параметры:
-    - df_original: исходный DataFrame (все строки Excel)
-    - settings_file: путь к JSON-файлу с настройками
 
-    Возвращает:
-    - df_filtered: DataFrame с колонками, переименованными в роли, только валидные записи
+def source_columns(roles_mapping: dict, quantum_config: dict | None = None) -> tuple[list[str], list[str]]:
+    """
+    Возвращает колонки листа, нужные для конфигурации:
+    (обязательные колонки ролей, дополнительные колонки для логики кванта)
     """
-    # with open(settings_file, "r", encoding="utf-8") as f:
-    #     settings = json.load(f)
-    def calculate_quantum_value(row):
-        """Вычисляет значение кванта на основе конфигурации"""
-        if not quantum_config:
+    required = list(dict.fromkeys(roles_mapping.values()))
+    optional = []
+    if quantum_config:
+        candidates = [
+            quantum_config.get('quantum_column'),
+            quantum_config.get('box_quantity_column'),
+            quantum_config.get('block_quantity_column'),
+            *(quantum_config.get('unit_mappings') or {}).values(),
+        ]
+        optional = [c for c in dict.fromkeys(candidates) if c and c != "1" and c not in required]
+    return required, optional
+
+
+def calculate_quantum_value(row, quantum_config: dict | None):
+    """Вычисляет значение кванта на основе конфигурации"""
+    if not quantum_config:
+        return None
+
+    try:
+        quantum_col = quantum_config['quantum_column']
+        if not quantum_col or quantum_col not in row:
             return None
 
+        unit = str(row[quantum_col]).strip().lower()
+        if not unit:
+            return None
+
+        # Ищем сопоставление для единицы измерения
+        for unit_pattern, target_column in quantum_config['unit_mappings'].items():
+            if unit_pattern.lower() in unit or unit in unit_pattern.lower():
+                if target_column == "1":
+                    return 1
+                elif target_column in row and pd.notna(row[target_column]):
+                    try:
+                        return float(row[target_column])
+                    except (ValueError, TypeError):
+                        pass
+
+                # Проверяем специальные колонки
+                if (unit_pattern.lower() in ['кор', 'коробка', 'кор.'] and
+                        quantum_config['box_quantity_column'] in row):
+                    try:
+                        return float(row[quantum_config['box_quantity_column']])
+                    except (ValueError, TypeError):
+                        pass
+
+                if (unit_pattern.lower() in ['бл', 'блок', 'дисплейбокс'] and
+                        quantum_config['block_quantity_column'] in row):
+                    try:
+                        return float(row[quantum_config['block_quantity_column']])
+                    except (ValueError, TypeError):
+                        pass
+
+        # Если не нашли сопоставление, пробуем распарсить как число
         try:
-            quantum_col = quantum_config['quantum_column']
-            if not quantum_col or quantum_col not in row:
-                return None
-
-            unit = str(row[quantum_col]).strip().lower()
-            if not unit:
-                return None
-
-            # Ищем сопоставление для единицы измерения
-            for unit_pattern, target_column in quantum_config['unit_mappings'].items():
-                if unit_pattern.lower() in unit or unit in unit_pattern.lower():
-                    if target_column == "1":
-                        return 1
-                    elif target_column in row and pd.notna(row[target_column]):
-                        try:
-                            return float(row[target_column])
-                        except (ValueError, TypeError):
-                            pass
-
-                    # Проверяем специальные колонки
-                    if (unit_pattern.lower() in ['кор', 'коробка', 'кор.'] and
-                            quantum_config['box_quantity_column'] in row):
-                        try:
-                            return float(row[quantum_config['box_quantity_column']])
-                        except (ValueError, TypeError):
-                            pass
-
-                    if (unit_pattern.lower() in ['бл', 'блок', 'дисплейбокс'] and
-                            quantum_config['block_quantity_column'] in row):
-                        try:
-                            return float(row[quantum_config['block_quantity_column']])
-                        except (ValueError, TypeError):
-                            pass
-
-            # Если не нашли сопоставление, пробуем распарсить как число
-            try:
-                return float(unit)
-            except (ValueError, TypeError):
-                return 1  # Значение по умолчанию
+            return float(unit)
+        except (ValueError, TypeError):
+            return 1  # Значение по умолчанию
 
-        except Exception as e:
-            print(f"Ошибка вычисления кванта: {e}")
-            return 1
-    if not settings.active:
-        return pd.DataFrame([])
+    except Exception as e:
+        log.warning("Ошибка вычисления кванта: %s", e)
+        return 1
 
-    header_row = settings.header_row
-    roles_mapping = {}
-    for mapping in settings.mappings:
-        roles_mapping.update({mapping.role.name: mapping.column_name})
-    # roles_mapping = settings.roles_mapping  # dict: роль -> исходная колонка
-
-    # формируем DataFrame с правильными колонками
-    df = df_original.copy()
-    # объединяем шапку, если она многострочная
-    header_part = df.iloc[header_row:header_row + 1]
-    headers = header_part.fillna("").astype(str).agg(lambda col: " ".join([v.strip() for v in col if v.strip()]),
-                                                     axis=0)
-    df = df.iloc[header_row + 1:].copy()
-    df.columns = headers
-    df.dropna(how="all", inplace=True)
-    df.reset_index(drop=True, inplace=True)
-
-    # отбрасываем колонки без названия
-    valid_columns = [c for c in df.columns if c.strip() != ""]
-    df = df[valid_columns]
+
+def transform_frame(df: pd.DataFrame, roles_mapping: dict, vendor_name: str,
+                    date: datetime | None = None, quantum_config: dict | None = None) -> pd.DataFrame:
+    """
+    Применяет роли к DataFrame с названиями колонок из шапки:
+    нормализует остаток и квант, фильтрует строки без названия и цены,
+    переименовывает колонки в роли и добавляет поставщика и дату.
+    """
+    df = df.dropna(how="all")
+    df.index = pd.RangeIndex(len(df))
 
     # оставляем только колонки из ролей, которые есть в DataFrame
     used_columns = [roles_mapping[r] for r in roles_mapping if roles_mapping[r] in df.columns]
-    df_filtered = df[used_columns].copy()
+    df_filtered = df[used_columns].copy(deep=False)
 
     # фильтрация строк ---------------------------------
     # имя и цена по ролям
@@ -243,56 +255,129 @@ def apply_parser_settings(df_original: pd.DataFrame, settings: ParsingConfig, ve
     stock_col = roles_mapping.get("Остаток")
 
     if stock_col and stock_col in df_filtered.columns:
-        df_filtered[stock_col] = df_filtered[stock_col].apply(normalize_stock_value)
+        with profiler.stage("stock", len(df_filtered)):
+            df_filtered[stock_col] = df_filtered[stock_col].apply(normalize_stock_value)
 
     quantum_col = roles_mapping.get("Квант")
 
-    if quantum_col and quantum_config and quantum_col == quantum_config['quantum_column']:
-        # Применяем сложную логику для кванта
-        print("Применяем сложную логику для кванта...")
-        df_filtered[quantum_col] = df.apply(calculate_quantum_value, axis=1)
-    elif quantum_col:
-        # Стандартная обработка кванта
-        try:
-            df_filtered[quantum_col] = pd.to_numeric(df_filtered[quantum_col], errors='coerce')
-        except:
-            df_filtered[quantum_col] = 1
-
-
+    with profiler.stage("quantum", len(df_filtered)):
+        if quantum_col and quantum_config and quantum_col == quantum_config['quantum_column']:
+            # Применяем сложную логику для кванта
+            df_filtered[quantum_col] = df.apply(calculate_quantum_value, axis=1, args=(quantum_config,))
+        elif quantum_col:
+            # Стандартная обработка кванта
+            try:
+                df_filtered[quantum_col] = pd.to_numeric(df_filtered[quantum_col], errors='coerce')
+            except:
+                df_filtered[quantum_col] = 1
 
     # переименуем колонки на роли
     df_filtered.columns = [r for r in roles_mapping if roles_mapping[r] in df_filtered.columns]
 
+    mask = pd.Series(True, index=df_filtered.index)
+
     # фильтруем по названию
     if name_role and name_role in df_filtered.columns:
-        df_filtered = df_filtered[
-            df_filtered[name_role].notna() & (df_filtered[name_role].astype(str).str.strip() != "")]
-
-    # фильтруем по цене
-    def valid_price(v):
-        if pd.isna(v):
-            return False
-        if isinstance(v, (int, float)):
-            return True
-        s = str(v).strip()
-        match = re.search(r"\d+(\.\d+)?", s)
-        if not match:
-            return False
-        return len(s) <= 10  # ограничение по длине
+        mask &= df_filtered[name_role].notna() & (df_filtered[name_role].astype(str).str.strip() != "")
 
+    # фильтруем по цене и приводим ее к числу
     if price_role and price_role in df_filtered.columns:
-        df_filtered = df_filtered[df_filtered[price_role].apply(valid_price)]
-
-    df_filtered["Поставщик"] = vendor_name
+        with profiler.stage("price", len(df_filtered)):
+            prices, valid = parse_price_series(df_filtered[price_role])
+        df_filtered[price_role] = prices
+        mask &= valid
 
+    extra = {"Поставщик": vendor_name}
     if date is not None:
-        df_filtered["Дата"] = date
+        extra["Дата"] = date
+    return df_filtered[mask].assign(**extra)
+
 
+def _finish_parsed(df_filtered: pd.DataFrame, settings: ParsingConfig, vendor_name: str,
+                   date: datetime | None) -> pd.DataFrame:
+    """Сохраняет разобранный файл (save_parsed) и решает, идет ли он в общий прайс (to_common)"""
     if settings.save_parsed:
         out_fname = f"{vendor_name} - {settings.name} - {date.strftime('%d.%m.%Y %H-%M')}.xlsx"
-        to_excel_with_role_widths(df_filtered.drop(["Дата"], axis=1), pm.save_file(out_fname, mode='parsed'))
+        with profiler.stage("save_parsed", len(df_filtered)):
+            to_excel_with_role_widths(df_filtered.drop(["Дата"], axis=1), pm.save_file(out_fname, mode='parsed'))
 
     if not settings.to_common:
         return pd.DataFrame([])
 
     return df_filtered
+
+
+def apply_parser_settings(df_original: pd.DataFrame, settings: ParsingConfig, vendor_name: str,
+                          date: datetime | None = None, quantum_config: dict | None = None,
+                          header_applied: bool = False) -> pd.DataFrame:
+    """
+    Применяет настройки парсинга к исходному DataFrame и возвращает отфильтрованный DataFrame.
+
+    Параметры:
+    - df_original: исходный DataFrame (все строки Excel)
+    - settings: конфигурация парсинга
+    - header_applied: df_original уже прочитан с заголовками (см. read_excel_for_config)
+      и содержит только строки после шапки
+
+    Возвращает:
+    - df_filtered: DataFrame с колонками, переименованными в роли, только валидные записи
+    """
+    if not settings.active:
+        return pd.DataFrame([])
+
+    roles_mapping = get_roles_mapping(settings)
+
+    if header_applied:
+        df = df_original
+    else:
+        with profiler.stage("header", len(df_original)):
+            # объединяем шапку, если она многострочная
+            header_row = settings.header_row
+            headers = join_header_rows(df_original.iloc[header_row:header_row + 1])
+            df = df_original.iloc[header_row + 1:]
+            df.columns = headers
+            # отбрасываем колонки без названия
+            df = df[[c for c in df.columns if c.strip() != ""]]
+
+    with profiler.stage("transform", len(df)):
+        df_filtered = transform_frame(df, roles_mapping, vendor_name, date, quantum_config)
+    return _finish_parsed(df_filtered, settings, vendor_name, date)
+
+
+def apply_parser_settings_stream(file_path: str | Path, settings: ParsingConfig, vendor_name: str,
+                                 date: datetime | None = None, quantum_config: dict | None = None,
+                                 batch_size: int = STREAM_BATCH_SIZE) -> pd.DataFrame:
+    """
+    Потоковый вариант apply_parser_settings для очень больших файлов.
+    Лист читается пачками по batch_size строк (см. iter_excel_batches), каждая пачка
+    сразу преобразуется, так что в памяти одновременно только одна сырая пачка
+    и уже отфильтрованный результат.
+    Если обязательных колонок нет в шапке - KeyError (нужно читать файл обычным способом).
+    """
+    if not settings.active:
+        return pd.DataFrame([])
+
+    roles_mapping = get_roles_mapping(settings)
+    columns, optional_columns = source_columns(roles_mapping, quantum_config)
+
+    parts = []
+    rows_read = 0
+    batches = iter_excel_batches(file_path, settings.header_row, columns, optional_columns, batch_size)
+    while True:
+        # Чтение пачки - отдельный этап stream_read: его время не сравнивается с чтением листа целиком (read)
+        with profiler.stage("stream_read") as st:
+            batch = next(batches, None)
+            st.rows = len(batch) if batch is not None else None
+        if batch is None:
+            break
+        rows_read += len(batch)
+        with profiler.stage("transform", len(batch)):
+            parts.append(transform_frame(batch, roles_mapping, vendor_name, date, quantum_config))
+        del batch
+    log.debug("Потоково прочитано строк: %s (%s)", rows_read, file_path)
+
+    if parts:
+        df_filtered = pd.concat(parts, ignore_index=True)
+    else:
+        df_filtered = transform_frame(pd.DataFrame(columns=columns), roles_mapping, vendor_name, date, quantum_config)
+    return _finish_parsed(df_filtered, settings, vendor_name, date)
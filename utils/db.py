@@ -1,18 +1,98 @@
 # db.py
+import logging
 import os
+import re
+from functools import lru_cache
 
-from sqlalchemy import create_engine, MetaData
+from sqlalchemy import create_engine, MetaData, event
 from sqlalchemy.orm import sessionmaker, declarative_base
 
 from utils.paths import pm
 
+log = logging.getLogger(__name__)
+
 #ENGINE_URL = "sqlite:///" + os.path.join(os.getcwd(), "emailparser.db")  # можно сменить путь
 DB_FILE = os.path.join(pm.get_user_data(), "emailparser.db")
 ENGINE_URL = "sqlite:///" + DB_FILE
-print(ENGINE_URL)
+
+# Настройки соединений SQLite:
+# - WAL: читатели не блокируются писателем (интерфейс читает, пока идет сбор писем);
+# - busy_timeout: при занятой БД ждем, а не падаем с "database is locked";
+# - synchronous=NORMAL: в режиме WAL безопасно и заметно быстрее FULL;
+# - cache_size: отрицательное значение - размер в КиБ (64 МБ).
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "busy_timeout": 30_000,
+    "synchronous": "NORMAL",
+    "cache_size": -64_000,
+    "temp_store": "MEMORY",
+}
+# Политика контрольных точек: автоматически каждые WAL_AUTOCHECKPOINT страниц,
+# после checkpoint() WAL-файл усекается до WAL_SIZE_LIMIT байт
+WAL_AUTOCHECKPOINT = 1000
+WAL_SIZE_LIMIT = 64 * 1024 * 1024
 
 engine = create_engine(ENGINE_URL, echo=False, future=True)
+# Отдельный пул соединений только для чтения - для запросов интерфейса
+read_engine = create_engine(ENGINE_URL, echo=False, future=True)
+
 SessionLocal = sessionmaker(bind=engine, expire_on_commit=False, future=True)
+ReadSessionLocal = sessionmaker(bind=read_engine, expire_on_commit=False, future=True)
+
+
+@lru_cache(maxsize=256)
+def _compile(pattern: str) -> re.Pattern:
+    return re.compile(pattern)
+
+
+def _regexp(pattern: str | None, value: str | None) -> bool:
+    """REGEXP для SQLite (column.regexp_match): re.search по шаблону"""
+    if pattern is None or value is None:
+        return False
+    return _compile(pattern).search(value) is not None
+
+
+def _py_lower(value: str | None) -> str | None:
+    """lower() с поддержкой кириллицы (встроенный lower в SQLite понимает только ASCII)"""
+    return value.lower() if value is not None else None
+
+
+@event.listens_for(engine, "connect")
+@event.listens_for(read_engine, "connect")
+def _register_sqlite_functions(dbapi_connection, connection_record):
+    dbapi_connection.create_function("regexp", 2, _regexp, deterministic=True)
+    dbapi_connection.create_function("py_lower", 1, _py_lower, deterministic=True)
+
+
+@event.listens_for(engine, "connect")
+@event.listens_for(read_engine, "connect")
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for name, value in SQLITE_PRAGMAS.items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.execute(f"PRAGMA wal_autocheckpoint={WAL_AUTOCHECKPOINT}")
+    cursor.execute(f"PRAGMA journal_size_limit={WAL_SIZE_LIMIT}")
+    cursor.close()
+
+
+@event.listens_for(read_engine, "connect")
+def _set_query_only(dbapi_connection, connection_record):
+    dbapi_connection.execute("PRAGMA query_only=ON")
+
+
+def checkpoint(mode: str = "TRUNCATE") -> tuple[int, int, int] | None:
+    """
+    Переносит WAL в основной файл БД и усекает его.
+    Вызывается после массовой записи (сбор писем, парсинг).
+    Возвращает (busy, страниц в WAL, перенесено страниц) или None при ошибке.
+    """
+    try:
+        with engine.connect() as conn:
+            return tuple(conn.exec_driver_sql(f"PRAGMA wal_checkpoint({mode})").one())
+    except Exception as e:
+        log.warning("Не удалось выполнить контрольную точку WAL: %s", e)
+        return None
+
 
 naming_convention = {
     "ix": "ix_%(column_0_label)s",
@@ -27,7 +107,7 @@ Base = declarative_base(metadata=metadata)
 
 
 def init_db():
-    print(ENGINE_URL)
+    log.debug("БД: %s", ENGINE_URL)
     Base.metadata.create_all(engine)
 
 
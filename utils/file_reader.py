@@ -1,15 +1,37 @@
+import logging
+import threading
+from itertools import islice
 from pathlib import Path
+from typing import Callable, Iterator
+
 import pandas as pd
 
+log = logging.getLogger(__name__)
+
+# Размер пачки строк при потоковом чтении
+STREAM_BATCH_SIZE = 50_000
+# Строк в быстрой выборке для предпросмотра
+SAMPLE_ROWS = 200
+# Как часто (в строках) полное чтение сообщает прогресс и проверяет отмену
+PROGRESS_EVERY = 5_000
+
+
+class LoadCancelled(Exception):
+    """Чтение файла отменено"""
+
 
-def read_excel_safe(file_path: str | Path) -> pd.DataFrame:
+def read_excel_safe(file_path: str | Path, **kwargs) -> pd.DataFrame:
+    """
+    Читает первый лист без заголовка, перебирая доступные движки.
+    Дополнительные параметры (nrows, usecols, skiprows) передаются в pd.read_excel.
+    """
     # Сначала пробуем стандартный openpyxl
     engines = ['openpyxl', 'xlrd', 'calamine']
 
     for engine in engines:
         try:
-            df = pd.read_excel(file_path, header=None, engine=engine)
-            print(f"Успешно прочитали {file_path} через {engine}")
+            df = pd.read_excel(file_path, header=None, engine=engine, **kwargs)
+            log.debug("Прочитан %s через %s", file_path, engine)
             return df
         except Exception as e:
             continue
@@ -28,3 +50,184 @@ def read_excel_safe(file_path: str | Path) -> pd.DataFrame:
     # except Exception as e2:
     #     print(f"Не удалось прочитать через xlwings: {e2}")
     #     raise
+
+
+def join_header_rows(header_part: pd.DataFrame) -> pd.Series:
+    """Склеивает строки шапки в названия колонок (пустые значения пропускаются)"""
+    return header_part.fillna("").astype(str).agg(
+        lambda col: " ".join([v.strip() for v in col if v.strip()]), axis=0
+    )
+
+
+def read_excel_for_config(file_path: str | Path, header_row: int, columns: list[str],
+                          optional_columns: list[str] | None = None) -> pd.DataFrame | None:
+    """
+    Читает только нужные колонки и только строки после шапки.
+
+    Сначала читается строка заголовка, по ней определяются позиции колонок,
+    затем лист читается повторно с usecols/skiprows.
+    Возвращает DataFrame с названиями колонок из шапки или None,
+    если какая-то из обязательных колонок в шапке не найдена (тогда нужно читать лист целиком).
+    """
+    header_df = read_excel_safe(file_path, nrows=header_row + 1)
+    if len(header_df) <= header_row:
+        return None
+    headers = join_header_rows(header_df.iloc[header_row:header_row + 1])
+
+    positions = {}
+    for pos, name in enumerate(headers):
+        if name.strip() and name not in positions:
+            positions[name] = pos
+
+    if any(c not in positions for c in columns):
+        return None
+
+    wanted = [c for c in dict.fromkeys([*columns, *(optional_columns or [])]) if c in positions]
+    usecols = sorted(positions[c] for c in wanted)
+    # dtype=object - как при чтении листа целиком: иначе pandas выводит типы по одним данным,
+    # и числовой артикул с пустой ячейкой приходит float64 ('12345.0' вместо '12345')
+    df = read_excel_safe(file_path, skiprows=header_row + 1, usecols=usecols, dtype=object)
+    names = {pos: name for name, pos in positions.items()}
+    df.columns = [names[pos] for pos in df.columns]
+    return df
+
+
+def _calamine_value(v):
+    """Пустая строка -> None, целое число -> int (calamine отдает все числа как float, openpyxl и pandas - нет)"""
+    if v == "":
+        return None
+    if type(v) is float and v.is_integer():
+        return int(v)
+    return v
+
+
+def open_excel_rows(file_path: str | Path, prefer_calamine: bool = False) -> tuple[int | None, Iterator[tuple]]:
+    """
+    Открывает первый лист для построчного чтения.
+    xlsx/xlsm читаются openpyxl в режиме read_only (память не растет с размером листа),
+    остальные форматы - через calamine. prefer_calamine - xlsx тоже через calamine:
+    лист загружается в память целиком, но в несколько раз быстрее (для предпросмотра).
+    Возвращает (число строк по размерам листа или None, итератор строк).
+    """
+    suffix = Path(file_path).suffix.lower()
+    if suffix in ('.xlsx', '.xlsm') and not prefer_calamine:
+        from openpyxl import load_workbook
+
+        wb = load_workbook(file_path, read_only=True, data_only=True)
+        ws = wb.worksheets[0]
+        # Выгрузки 1С/ERP часто пишут неверный <dimension>, по нему read_only обрезал бы лист
+        # (pandas делает то же самое)
+        ws.reset_dimensions()
+
+        def rows():
+            try:
+                yield from ws.iter_rows(values_only=True)
+            finally:
+                wb.close()
+
+        return None, rows()
+
+    try:
+        from python_calamine import CalamineWorkbook
+    except ImportError:
+        if suffix in ('.xlsx', '.xlsm'):
+            return open_excel_rows(file_path)
+        raise
+
+    sheet = CalamineWorkbook.from_path(str(file_path)).get_sheet_by_index(0)
+    # calamine начинает строки с первой непустой колонки - восстанавливаем отступ слева
+    left = sheet.start[1] if sheet.start else 0
+
+    def rows():
+        for row in sheet.iter_rows():
+            yield (None,) * left + tuple(map(_calamine_value, row))
+
+    return sheet.height, rows()
+
+
+def iter_excel_rows(file_path: str | Path) -> Iterator[tuple]:
+    """Построчно читает первый лист, не загружая его целиком в память (см. open_excel_rows)"""
+    yield from open_excel_rows(file_path)[1]
+
+
+def read_excel_rows(file_path: str | Path, cancel: threading.Event | None = None,
+                    progress: Callable[[int, int | None], None] | None = None,
+                    on_sample: Callable[[pd.DataFrame], None] | None = None,
+                    sample_rows: int = SAMPLE_ROWS) -> pd.DataFrame:
+    """
+    Читает первый лист целиком без заголовка, как read_excel_safe, но по строкам:
+    - после первых sample_rows строк вызывает on_sample(выборка) - для быстрого предпросмотра;
+    - каждые PROGRESS_EVERY строк вызывает progress(прочитано, всего или None)
+      и проверяет cancel - при отмене бросает LoadCancelled.
+    Если построчное чтение не удалось, лист читается через read_excel_safe.
+    """
+    try:
+        total, rows_iter = open_excel_rows(file_path, prefer_calamine=True)
+    except Exception:
+        df = read_excel_safe(file_path)
+        if on_sample is not None:
+            on_sample(df.head(sample_rows))
+        return df
+
+    rows = []
+    for row in rows_iter:
+        rows.append(row)
+        count = len(rows)
+        if count == sample_rows and on_sample is not None:
+            on_sample(pd.DataFrame(rows))
+        if count % PROGRESS_EVERY == 0:
+            if cancel is not None and cancel.is_set():
+                raise LoadCancelled(str(file_path))
+            if progress is not None:
+                progress(count, total)
+    df = pd.DataFrame(rows)
+    if len(rows) < sample_rows and on_sample is not None:
+        on_sample(df)
+    if progress is not None:
+        progress(len(rows), len(rows))
+    return df
+
+
+def iter_excel_batches(file_path: str | Path, header_row: int, columns: list[str],
+                       optional_columns: list[str] | None = None,
+                       batch_size: int = STREAM_BATCH_SIZE) -> Iterator[pd.DataFrame]:
+    """
+    Потоковый аналог read_excel_for_config: отдает пачки по batch_size строк
+    после шапки, только с нужными колонками и названиями из шапки.
+    Если обязательная колонка в шапке не найдена - KeyError при первой итерации.
+    """
+    rows = iter_excel_rows(file_path)
+    header = None
+    for i, row in enumerate(rows):
+        if i == header_row:
+            header = row
+            break
+    if header is None:
+        raise KeyError(f"Строка заголовка {header_row} отсутствует в {file_path}")
+
+    headers = join_header_rows(pd.DataFrame([header]))
+    positions = {}
+    for pos, name in enumerate(headers):
+        if name.strip() and name not in positions:
+            positions[name] = pos
+
+    missing = [c for c in columns if c not in positions]
+    if missing:
+        raise KeyError(f"В шапке {file_path} нет колонок: {missing}")
+
+    wanted = [c for c in dict.fromkeys([*columns, *(optional_columns or [])]) if c in positions]
+    usecols = sorted(positions[c] for c in wanted)
+    names = {pos: name for name, pos in positions.items()}
+    out_columns = [names[pos] for pos in usecols]
+
+    # dtype=object: типы приводит transform_frame, а не вывод pandas по каждой пачке -
+    # иначе артикул и цены зависели бы от того, куда попала граница пачки
+    batch = []
+    for row in rows:
+        size = len(row)
+        batch.append([row[pos] if pos < size else None for pos in usecols])
+        if len(batch) >= batch_size:
+            yield pd.DataFrame(batch, columns=out_columns, dtype=object)
+            batch = []
+    if batch:
+        yield pd.DataFrame(batch, columns=out_columns, dtype=object)
@@ -0,0 +1,76 @@
+"""
+Проверка времени импорта при запуске (python -X importtime).
+
+Импортирует модуль (по умолчанию main - то, что выполняется до появления окна)
+в отдельном процессе несколько раз, берет лучшее время и завершается с ненулевым кодом,
+если оно больше бюджета или при запуске загружаются тяжелые библиотеки,
+которые должны подгружаться только при парсинге или предпросмотре.
+
+    python -m utils.import_budget [--module main] [--budget-ms 1500] [--runs 3]
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+DEFAULT_MODULE = "main"
+DEFAULT_BUDGET_MS = 1500
+# Библиотеки, которые не должны импортироваться при запуске
+DEFERRED_MODULES = ("pandas", "numpy", "openpyxl", "python_calamine", "pyarrow", "xlrd")
+
+# "import time:       123 |        456 |   package.module"
+_LINE_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure(module: str) -> list[tuple[str, int, int]]:
+    """[(модуль, собственное время мкс, накопленное время мкс, уровень вложенности)] одного запуска"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"Не удалось импортировать {module}:\n{proc.stderr[-2000:]}")
+    entries = []
+    for line in proc.stderr.splitlines():
+        m = _LINE_RE.match(line)
+        if m:
+            entries.append((m.group(4), int(m.group(1)), int(m.group(2)), len(m.group(3)) // 2))
+    return entries
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Бюджет времени импорта при запуске")
+    parser.add_argument("--module", default=DEFAULT_MODULE, help="импортируемый модуль")
+    parser.add_argument("--budget-ms", type=int, default=DEFAULT_BUDGET_MS, help="допустимое время импорта, мс")
+    parser.add_argument("--runs", type=int, default=3, help="сколько раз измерять (берется лучшее)")
+    args = parser.parse_args(argv)
+
+    best = None
+    for _ in range(max(args.runs, 1)):
+        entries = measure(args.module)
+        total = next((cumulative for name, _, cumulative, _ in entries if name == args.module), 0)
+        if best is None or total < best[0]:
+            best = (total, entries)
+    total, entries = best
+
+    print(f"Импорт {args.module}: {total / 1000:.0f} мс (бюджет {args.budget_ms} мс)")
+    top_level = sorted((e for e in entries if e[3] <= 1 and e[0] != args.module), key=lambda e: -e[2])
+    for name, _, cumulative, _ in top_level[:15]:
+        print(f"  {cumulative / 1000:8.1f} мс  {name}")
+
+    failed = False
+    loaded = sorted({name.split(".")[0] for name, *_ in entries} & set(DEFERRED_MODULES))
+    if loaded:
+        failed = True
+        print("При запуске загружаются: " + ", ".join(loaded))
+    if total > args.budget_ms * 1000:
+        failed = True
+        print(f"Превышен бюджет: {total / 1000:.0f} мс > {args.budget_ms} мс")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
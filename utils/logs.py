@@ -0,0 +1,121 @@
+"""
+Журналирование приложения.
+
+Модули берут логгер по своему имени (log = logging.getLogger(__name__)) и передают
+аргументы отдельно ("%s", value), поэтому строка собирается, только если сообщение
+кому-то нужно. Подробности по отдельным письмам, соединениям и файлам пишутся
+на уровне DEBUG и по умолчанию отключены; дорогие аргументы оборачиваются в Lazy.
+
+setup_logging() настраивает корневой логгер один раз за запуск:
+- stderr - текстом;
+- pricelist.jsonl в pm.get_logs() - по JSON-объекту на строку, запись в отдельном потоке.
+Уровень - аргумент level или переменная окружения PRICELIST_LOG_LEVEL (по умолчанию INFO).
+Окно выполнения задачи (ui.console.ConsoleSink) подписывается на записи уровня INFO и выше.
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import sys
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+LOG_LEVEL_ENV = "PRICELIST_LOG_LEVEL"
+DEFAULT_LEVEL = "INFO"
+JSON_LOG_FILE = "pricelist.jsonl"
+JSON_LOG_MAX_BYTES = 10 * 1024 * 1024
+JSON_LOG_BACKUPS = 5
+TEXT_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Стандартные атрибуты LogRecord; остальные (extra=...) попадают в JSON отдельными полями
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+_configured = False
+_listener: QueueListener | None = None
+
+
+class Lazy:
+    """Аргумент сообщения, который вычисляется только при форматировании: Lazy(decode_folder_name, name)"""
+    __slots__ = ("func", "args")
+
+    def __init__(self, func, *args):
+        self.func = func
+        self.args = args
+
+    def __str__(self):
+        return str(self.func(*self.args))
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """Запись журнала одной строкой JSON"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created).astimezone().isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _JsonQueueHandler(QueueHandler):
+    """QueueHandler, который оставляет сообщение и исключение отдельными полями для JsonLinesFormatter"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.getMessage()  # Lazy и прочие аргументы вычисляются в потоке, который пишет
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def resolve_level(level: str | int | None = None) -> int:
+    """Уровень из аргумента или PRICELIST_LOG_LEVEL"""
+    level = level if level is not None else os.environ.get(LOG_LEVEL_ENV, DEFAULT_LEVEL)
+    if isinstance(level, int):
+        return level
+    value = logging.getLevelName(str(level).strip().upper())
+    return value if isinstance(value, int) else logging.INFO
+
+
+def setup_logging(level: str | int | None = None, json_file: bool = True) -> logging.Logger:
+    """Обработчики корневого логгера (повторный вызов меняет только уровень)"""
+    global _configured, _listener
+    root = logging.getLogger()
+    root.setLevel(resolve_level(level))
+    if _configured:
+        return root
+    _configured = True
+
+    if sys.stderr is not None:  # у оконного приложения stderr может не быть
+        console = logging.StreamHandler(sys.stderr)
+        console.setFormatter(logging.Formatter(TEXT_FORMAT, datefmt=DATE_FORMAT))
+        root.addHandler(console)
+
+    if json_file:
+        from utils.paths import pm
+
+        file_handler = RotatingFileHandler(
+            os.path.join(pm.get_logs(), JSON_LOG_FILE),
+            maxBytes=JSON_LOG_MAX_BYTES, backupCount=JSON_LOG_BACKUPS, encoding="utf-8",
+        )
+        file_handler.setFormatter(JsonLinesFormatter())
+        log_queue = queue.SimpleQueue()
+        root.addHandler(_JsonQueueHandler(log_queue))
+        _listener = QueueListener(log_queue, file_handler)
+        _listener.start()
+        atexit.register(_listener.stop)
+    return root
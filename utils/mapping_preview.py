@@ -0,0 +1,108 @@
+"""
+Предпросмотр сопоставления ролей в PriceParserApp.
+
+Каждое преобразование колонки (проверка наименования, разбор цены, нормализация остатка,
+квант) считается один раз для пары (колонка, преобразование) и кэшируется, поэтому смена
+одной роли пересчитывает только ее колонку. Для экрана все считается по первым
+PREVIEW_ROWS строкам листа, по всему листу - только при сохранении (full=True).
+"""
+import json
+from typing import Callable
+
+import pandas as pd
+
+from utils.price_parser import parse_price_series
+from utils.stock_normalizer import normalize_stock_value
+
+# Сколько строк листа обрабатывается для предпросмотра
+PREVIEW_ROWS = 1000
+
+NAME_ROLE = "Наименование"
+PRICE_ROLE = "Закупочная цена"
+STOCK_ROLE = "Остаток"
+QUANTUM_ROLE = "Квант"
+VENDOR_COLUMN = "Поставщик"
+
+
+def _name_mask(values: pd.Series) -> pd.Series:
+    return values.notna() & (values.astype(str).str.strip() != "")
+
+
+def _stock(values: pd.Series) -> pd.Series:
+    return values.apply(normalize_stock_value)
+
+
+def _quantum(values: pd.Series) -> pd.Series:
+    try:
+        return pd.to_numeric(values, errors="coerce")
+    except Exception:
+        return pd.Series(1, index=values.index)
+
+
+class MappingPreview:
+    """Кэш преобразований колонок листа (self.df после выбора шапки)"""
+
+    def __init__(self, df: pd.DataFrame, sample_rows: int = PREVIEW_ROWS):
+        self.df = df
+        self.sample = df.iloc[:sample_rows]
+        self._cache: dict[tuple, object] = {}
+
+    @property
+    def is_sample(self) -> bool:
+        """Предпросмотр построен не по всему листу"""
+        return len(self.sample) < len(self.df)
+
+    def _cached(self, key: tuple, full: bool, compute: Callable[[pd.DataFrame], object]):
+        key = (full,) + key
+        if key not in self._cache:
+            self._cache[key] = compute(self.df if full else self.sample)
+        return self._cache[key]
+
+    def name_mask(self, column: str, full: bool = False) -> pd.Series:
+        """Строки с непустым наименованием"""
+        return self._cached(("name", column), full, lambda frame: _name_mask(frame[column]))
+
+    def price(self, column: str, full: bool = False) -> tuple[pd.Series, pd.Series]:
+        """(цены, маска валидных цен) - utils.price_parser.parse_price_series"""
+        return self._cached(("price", column), full, lambda frame: parse_price_series(frame[column]))
+
+    def stock(self, column: str, full: bool = False) -> pd.Series:
+        return self._cached(("stock", column), full, lambda frame: _stock(frame[column]))
+
+    def quantum(self, column: str, full: bool = False, quantum_config: dict | None = None,
+                quantum_row: Callable[[pd.Series], object] | None = None) -> pd.Series:
+        """Квант: по настройке кванта (построчно через quantum_row) или просто числом из колонки"""
+        if quantum_config and quantum_row and quantum_config.get("quantum_column") == column:
+            config_key = json.dumps(quantum_config, sort_keys=True, ensure_ascii=False, default=str)
+            return self._cached(("quantum_config", column, config_key), full,
+                                lambda frame: frame.apply(quantum_row, axis=1))
+        return self._cached(("quantum", column), full, lambda frame: _quantum(frame[column]))
+
+    def build(self, mapping: dict[str, str], vendor: str, full: bool = False, quantum_config: dict | None = None,
+              quantum_row: Callable[[pd.Series], object] | None = None) -> pd.DataFrame:
+        """
+        Итоговая таблица по сопоставлению {роль: колонка}: строки без наименования
+        и с нераспознанной ценой отбрасываются, колонки называются ролями.
+        """
+        frame = self.df if full else self.sample
+        rows = pd.Series(True, index=frame.index)
+        if NAME_ROLE in mapping:
+            rows &= self.name_mask(mapping[NAME_ROLE], full)
+        if PRICE_ROLE in mapping:
+            prices, valid = self.price(mapping[PRICE_ROLE], full)
+            rows &= valid
+
+        columns = {}
+        for role, column in mapping.items():
+            if role == PRICE_ROLE:
+                values = prices
+            elif role == STOCK_ROLE:
+                values = self.stock(column, full)
+            elif role == QUANTUM_ROLE:
+                values = self.quantum(column, full, quantum_config, quantum_row)
+            else:
+                values = frame[column]
+            columns[role] = values[rows]
+        result = pd.DataFrame(columns, index=frame.index[rows.to_numpy()])
+        result[VENDOR_COLUMN] = vendor
+        return result
@@ -0,0 +1,281 @@
+"""
+Метрики загрузки писем.
+
+MetricsRegistry собирает счетчики и гистограммы с метками:
+- imap_command_seconds{command}      - время команд IMAP (SELECT, SEARCH, FETCH_HEADER, FETCH_BODY, LIST, LOGIN);
+- imap_bytes_downloaded_total{command} - байт получено ответами FETCH;
+- imap_reconnects_total{reason}      - переподключения (lost - обрыв во время команды, stale - устаревшее в пуле);
+- pool_wait_seconds                  - ожидание соединения из пула;
+- folder_emails_total{folder}, folder_bytes_total{folder}, folder_scan_seconds{folder} - по папкам;
+- filter_checks_total{result}        - проверка заголовков по правилам (hit / miss).
+
+Снимок - snapshot(); выгрузка в файл - write_json() и write_prometheus() (текстовый формат
+для textfile collector node_exporter). Реестр текущей загрузки - current(), его строку
+status_line() окно выполнения задачи показывает во время работы.
+"""
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+PREFIX = "pricelist_"
+# Границы корзин гистограмм времени, сек
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+JSON_FILE = "ingest_metrics.json"
+PROMETHEUS_FILE = "ingest_metrics.prom"
+
+
+class Counter:
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1):
+        self.value += amount
+
+    def snapshot(self) -> float:
+        return self.value
+
+
+class Gauge(Counter):
+    def set(self, value: float):
+        self.value = value
+
+
+class Histogram:
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # последняя - +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        i = 0
+        while i < len(self.buckets) and value > self.buckets[i]:
+            i += 1
+        self.counts[i] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float | None:
+        """Оценка квантиля по корзинам (верхняя граница корзины)"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(self.buckets, self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return math.inf
+
+    def snapshot(self) -> dict:
+        cumulative, seen = {}, 0
+        for bound, n in zip(self.buckets, self.counts):
+            seen += n
+            cumulative[str(bound)] = seen
+        cumulative["+Inf"] = self.count
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "buckets": cumulative,
+        }
+
+
+_KINDS = {"counter": Counter, "gauge": Gauge, "histogram": Histogram}
+
+
+def _label_key(labels: dict) -> tuple:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels_text(labels: tuple, extra: tuple = ()) -> str:
+    pairs = labels + extra
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _number(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return str(int(value)) if float(value).is_integer() else repr(value)
+
+
+class MetricsRegistry:
+    """Потокобезопасный набор метрик одной загрузки"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics: dict[str, dict] = {}
+        self.started = time.time()
+
+    def _get(self, kind: str, name: str, help_text: str, labels: dict):
+        family = self._metrics.get(name)
+        if family is None:
+            family = self._metrics[name] = {"kind": kind, "help": help_text, "series": {}}
+        key = _label_key(labels)
+        series = family["series"].get(key)
+        if series is None:
+            series = family["series"][key] = _KINDS[kind]()
+        return series
+
+    def inc(self, name: str, amount: float = 1, help_text: str = "", **labels):
+        with self._lock:
+            self._get("counter", name, help_text, labels).inc(amount)
+
+    def set(self, name: str, value: float, help_text: str = "", **labels):
+        with self._lock:
+            self._get("gauge", name, help_text, labels).set(value)
+
+    def observe(self, name: str, value: float, help_text: str = "", **labels):
+        with self._lock:
+            self._get("histogram", name, help_text, labels).observe(value)
+
+    @contextmanager
+    def timer(self, name: str, help_text: str = "", **labels):
+        """Время блока в гистограмму name (и при исключении)"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, help_text, **labels)
+
+    def value(self, name: str, **labels) -> float:
+        """Значение счетчика (0, если его еще нет)"""
+        with self._lock:
+            family = self._metrics.get(name)
+            series = family["series"].get(_label_key(labels)) if family else None
+            return series.value if isinstance(series, Counter) else 0
+
+    def total(self, name: str) -> float:
+        """Сумма счетчика по всем меткам"""
+        with self._lock:
+            family = self._metrics.get(name)
+            return sum(s.value for s in family["series"].values()) if family else 0
+
+    def snapshot(self) -> dict:
+        """{имя: {"type", "help", "series": [{"labels": {...}, "value" | гистограмма}]}} + производные"""
+        with self._lock:
+            metrics = {}
+            for name, family in self._metrics.items():
+                series = []
+                for key, metric in family["series"].items():
+                    entry = {"labels": dict(key)}
+                    data = metric.snapshot()
+                    entry.update(data if isinstance(data, dict) else {"value": data})
+                    series.append(entry)
+                metrics[name] = {"type": family["kind"], "help": family["help"], "series": series}
+        return {
+            "started_at": self.started,
+            "elapsed_seconds": round(time.time() - self.started, 3),
+            "metrics": metrics,
+            "derived": self._derived(),
+        }
+
+    def _derived(self) -> dict:
+        hits = self.value("filter_checks_total", result="hit")
+        misses = self.value("filter_checks_total", result="miss")
+        folders = {}
+        with self._lock:
+            emails = self._metrics.get("folder_emails_total", {}).get("series", {})
+            seconds = self._metrics.get("folder_scan_seconds", {}).get("series", {})
+            for key, counter in emails.items():
+                elapsed = seconds[key].value if key in seconds else 0
+                folders[dict(key).get("folder", "")] = round(counter.value / elapsed, 2) if elapsed else None
+        return {
+            "filter_hit_ratio": round(hits / (hits + misses), 4) if hits + misses else None,
+            "folder_emails_per_second": folders,
+        }
+
+    def to_prometheus(self) -> str:
+        """Текстовый формат Prometheus"""
+        lines = []
+        with self._lock:
+            for name, family in sorted(self._metrics.items()):
+                full_name = PREFIX + name
+                if family["help"]:
+                    lines.append(f"# HELP {full_name} {family['help']}")
+                lines.append(f"# TYPE {full_name} {family['kind']}")
+                for key, metric in sorted(family["series"].items()):
+                    if isinstance(metric, Histogram):
+                        seen = 0
+                        for bound, n in zip(metric.buckets + (math.inf,), metric.counts):
+                            seen += n
+                            le = (("le", _number(bound)),)
+                            lines.append(f"{full_name}_bucket{_labels_text(key, le)} {seen}")
+                        lines.append(f"{full_name}_sum{_labels_text(key)} {_number(metric.sum)}")
+                        lines.append(f"{full_name}_count{_labels_text(key)} {metric.count}")
+                    else:
+                        lines.append(f"{full_name}{_labels_text(key)} {_number(metric.value)}")
+        return "\n".join(lines) + "\n"
+
+    def to_json(self) -> str:
+        return json.dumps(self.snapshot(), ensure_ascii=False, indent=2, default=str)
+
+    def write_json(self, path: str) -> str:
+        return _write_atomic(path, self.to_json())
+
+    def write_prometheus(self, path: str) -> str:
+        return _write_atomic(path, self.to_prometheus())
+
+    def export(self, folder: str) -> tuple[str, str]:
+        """ingest_metrics.json и ingest_metrics.prom в папке folder"""
+        return (self.write_json(os.path.join(folder, JSON_FILE)),
+                self.write_prometheus(os.path.join(folder, PROMETHEUS_FILE)))
+
+    def status_line(self) -> str:
+        """Краткая сводка для окна выполнения задачи"""
+        with self._lock:
+            commands = self._metrics.get("imap_command_seconds", {}).get("series", {})
+            latency = []
+            for key, hist in sorted(commands.items()):
+                p95 = hist.quantile(0.95)
+                if p95 is not None and dict(key).get("command") != "LOGIN":
+                    latency.append(f"{dict(key).get('command')} p95≤{_number(p95)}с")
+            wait = self._metrics.get("pool_wait_seconds", {}).get("series", {}).get(())
+        downloaded = self.total("imap_bytes_downloaded_total") / (1024 * 1024)
+        elapsed = time.time() - self.started
+        parts = [
+            f"Получено: {downloaded:.1f} МБ ({downloaded / elapsed if elapsed > 0 else 0:.2f} МБ/с)",
+            f"Переподключений: {int(self.total('imap_reconnects_total'))}",
+        ]
+        ratio = self._derived()["filter_hit_ratio"]
+        if ratio is not None:
+            parts.append(f"Прошли фильтр: {ratio:.0%}")
+        if wait is not None and wait.count:
+            parts.append(f"Ожидание пула: {wait.sum / wait.count * 1000:.0f} мс")
+        if latency:
+            parts.append(", ".join(latency))
+        return " | ".join(parts)
+
+
+def _write_atomic(path: str, text: str) -> str:
+    """Запись через временный файл, чтобы читатель не увидел файл наполовину"""
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+    return path
+
+
+_current: MetricsRegistry | None = None
+
+
+def current() -> MetricsRegistry | None:
+    """Реестр последней (или идущей) загрузки"""
+    return _current
+
+
+def start_run() -> MetricsRegistry:
+    """Новый реестр для очередной загрузки"""
+    global _current
+    _current = MetricsRegistry()
+    return _current
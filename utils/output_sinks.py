@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import logging
+import os
+import sqlite3
+from typing import Callable, TYPE_CHECKING
+
+import crud
+from utils.paths import pm
+
+if TYPE_CHECKING:
+    # pandas и openpyxl загружаются только при выгрузке (модуль импортируется окном настроек)
+    import pandas as pd
+
+log = logging.getLogger(__name__)
+
+# Форматы выгрузки общего прайса (настройка output_formats, через запятую)
+OUTPUT_FORMATS = {
+    "xlsx": "Excel (.xlsx)",
+    "parquet": "Parquet (.parquet)",
+    "csv": "CSV (.csv, UTF-8)",
+    "sqlite": "SQLite (.sqlite)",
+}
+DEFAULT_OUTPUT_FORMATS = ["xlsx"]
+OUTPUT_BASENAME = "Объединенный прайс"
+
+# Строк данных на лист Excel (1 048 576 минус строка шапки)
+EXCEL_MAX_ROWS = 1_048_575
+# Размер пачки строк для CSV и SQLite
+CHUNK_ROWS = 100_000
+# Колонки, которые в Parquet кодируются словарем (повторяющиеся строки)
+DICTIONARY_COLUMNS = ("Поставщик", "Бренд", "(?) Бренд")
+
+
+def get_output_formats() -> list[str]:
+    """Выбранные в настройках форматы выгрузки (по умолчанию только Excel)"""
+    value = crud.get_settings().get('output_formats')
+    if not value:
+        return list(DEFAULT_OUTPUT_FORMATS)
+    formats = [f.strip().lower() for f in value.split(',')]
+    return [f for f in formats if f in OUTPUT_FORMATS] or list(DEFAULT_OUTPUT_FORMATS)
+
+
+def write_excel(df: pd.DataFrame, basename: str, extra_sheets: dict[str, pd.DataFrame] | None = None) -> list[str]:
+    """
+    Excel-выгрузка. Если строк больше, чем помещается на лист,
+    прайс делится на файлы "<имя> (часть N).xlsx" (дополнительные листы - в первой части)
+    """
+    from utils.convert_df import to_excel_with_role_widths
+
+    if len(df) <= EXCEL_MAX_ROWS:
+        path = pm.save_file(f"{basename}.xlsx")
+        to_excel_with_role_widths(df, path, extra_sheets=extra_sheets)
+        return [path]
+
+    paths = []
+    for part, start in enumerate(range(0, len(df), EXCEL_MAX_ROWS), 1):
+        path = pm.save_file(f"{basename} (часть {part}).xlsx")
+        to_excel_with_role_widths(df.iloc[start:start + EXCEL_MAX_ROWS], path,
+                                  extra_sheets=extra_sheets if part == 1 else None)
+        paths.append(path)
+    log.info("Прайс не помещается на один лист Excel, разделен на %s файла(ов)", len(paths))
+    return paths
+
+
+def write_parquet(df: pd.DataFrame, basename: str, extra_sheets: dict[str, pd.DataFrame] | None = None) -> list[str]:
+    """Parquet-выгрузка (нужен pyarrow), поставщик и бренд кодируются словарем"""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        log.warning("Выгрузка в Parquet недоступна: не установлен pyarrow")
+        return []
+
+    paths = []
+    for name, frame in {basename: df, **(extra_sheets or {})}.items():
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        for col in DICTIONARY_COLUMNS:
+            if col in table.column_names and not pa.types.is_dictionary(table.schema.field(col).type):
+                table = table.set_column(table.schema.get_field_index(col), col, table[col].dictionary_encode())
+        path = pm.save_file(f"{name}.parquet")
+        pq.write_table(table, path)
+        paths.append(path)
+    return paths
+
+
+def write_csv(df: pd.DataFrame, basename: str, extra_sheets: dict[str, pd.DataFrame] | None = None) -> list[str]:
+    """CSV-выгрузка в UTF-8, пишется пачками по CHUNK_ROWS строк"""
+    paths = []
+    for name, frame in {basename: df, **(extra_sheets or {})}.items():
+        path = pm.save_file(f"{name}.csv")
+        frame.to_csv(path, index=False, encoding="utf-8", chunksize=CHUNK_ROWS)
+        paths.append(path)
+    return paths
+
+
+def write_sqlite(df: pd.DataFrame, basename: str, extra_sheets: dict[str, pd.DataFrame] | None = None) -> list[str]:
+    """
+    Выгрузка в отдельный файл SQLite: таблица prices с индексами по артикулу и поставщику,
+    дополнительные листы - отдельными таблицами
+    """
+    path = pm.save_file(f"{basename}.sqlite")
+    if os.path.exists(path):
+        os.remove(path)
+    with sqlite3.connect(path) as con:
+        df.to_sql("prices", con, index=False, chunksize=CHUNK_ROWS)
+        for column, index_name in (("Артикул", "ix_prices_article"), ("Поставщик", "ix_prices_vendor")):
+            if column in df.columns:
+                con.execute(f'CREATE INDEX {index_name} ON prices ("{column}")')
+        for name, frame in (extra_sheets or {}).items():
+            frame.to_sql(name, con, index=False, chunksize=CHUNK_ROWS)
+    return [path]
+
+
+SINKS: dict[str, Callable[..., list[str]]] = {
+    "xlsx": write_excel,
+    "parquet": write_parquet,
+    "csv": write_csv,
+    "sqlite": write_sqlite,
+}
+
+
+def write_outputs(df: pd.DataFrame, formats: list[str] | None = None, basename: str = OUTPUT_BASENAME,
+                  extra_sheets: dict[str, pd.DataFrame] | None = None) -> list[str]:
+    """Выгружает общий прайс во все выбранные форматы, возвращает пути созданных файлов"""
+    if formats is None:
+        formats = get_output_formats()
+    paths = []
+    for fmt in formats:
+        try:
+            written = SINKS[fmt](df, basename, extra_sheets)
+        except Exception as e:
+            log.error("Ошибка выгрузки в %s: %s", fmt, e)
+            continue
+        for path in written:
+            log.info("Сохранено: %s", path)
+        paths.extend(written)
+    return paths
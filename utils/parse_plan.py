@@ -0,0 +1,68 @@
+from dataclasses import dataclass, field
+from datetime import datetime
+
+
+@dataclass(frozen=True)
+class ConfigPlan:
+    """Конфигурация парсинга, отвязанная от сессии БД (совместима с apply_parser_settings)"""
+    id: int
+    name: str
+    vendor_id: int
+    header_row: int
+    filename_template: str | None
+    active: bool
+    to_common: bool
+    save_original: bool
+    save_parsed: bool
+    quantum_config: str | None
+    roles_mapping: tuple[tuple[str, str], ...]  # ((роль, колонка), ...)
+
+
+@dataclass(frozen=True)
+class RulePlan:
+    """Условия правила фильтрации писем поставщика"""
+    id: int
+    extensions: str | None
+    subject_contains: str | None
+    subject_excludes: str | None
+    filename_contains: str | None
+    filename_excludes: str | None
+
+
+@dataclass(frozen=True)
+class AttachmentCandidate:
+    """Вложение, отобранное для парсинга, и конфигурация, которая к нему подходит"""
+    attachment_id: int
+    config_id: int
+    subject: str
+    filename: str
+    filepath: str
+    date: datetime  # дата письма в UTC
+    parsed_at: datetime | None = None  # когда вложение уже разбиралось этой конфигурацией
+
+
+@dataclass(frozen=True)
+class VendorPlan:
+    id: int
+    name: str
+    active: bool
+    rule: RulePlan | None
+    configs: tuple[ConfigPlan, ...]
+    candidates: tuple[AttachmentCandidate, ...] = ()
+
+    def config(self, config_id: int) -> ConfigPlan | None:
+        return next((c for c in self.configs if c.id == config_id), None)
+
+
+@dataclass(frozen=True)
+class ParsePlan:
+    """Все, что нужно для прогона парсинга, загруженное из БД за несколько запросов"""
+    vendors: tuple[VendorPlan, ...]
+    config_changed_at: dict[int, datetime | None] = field(default_factory=dict)
+
+
+@dataclass(frozen=True)
+class ChangeSet:
+    """Что обновить после изменения правил и конфигураций (см. crud.resolve_changes)"""
+    refetch_vendor_ids: frozenset[int] = frozenset()  # поставщики для повторного сканирования почты
+    reparse: dict[int, tuple[int, ...]] = field(default_factory=dict)  # {config_id: (attachment_id, ...)}
@@ -1,238 +1,416 @@
+import contextvars
 import datetime
 import json
+import logging
 import os
 import shutil
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Literal
 
 import pandas as pd
 import crud
-from models import Filters, ParsingConfig
-from utils.convert_df import apply_parser_settings, to_excel_with_role_widths
-from utils.file_reader import read_excel_safe
+from models import ParsingConfig
+from models.runs import PARSE, REBUILD
+from utils import profiler, run_history
+from utils.db import checkpoint
+from utils.convert_df import apply_parser_settings, apply_parser_settings_stream, get_roles_mapping, source_columns
+from utils.file_reader import read_excel_safe, read_excel_for_config
+from utils.logs import Lazy
+from utils.output_sinks import write_outputs
+from utils.parse_plan import VendorPlan, ConfigPlan, AttachmentCandidate
 from utils.paths import pm
+from utils.price_compare import compare_prices, COMPARE_SHEET
+from utils.price_frame import finalize_price_frame, format_memory_report
 
+log = logging.getLogger(__name__)
 
-def find_matching_config(filename, configs: list[ParsingConfig]):
-    """Находит конфигурацию, подходящую для файла"""
-    filename_lower = filename.lower()
+# Сколько вложений пересобираемой конфигурации разбирается одновременно
+REBUILD_WORKERS = 4
 
-    for config in configs:
-        if config.filename_template.lower():
-            pattern = config.filename_template.strip().lower()
-        else:
-            pattern = None
-        if pattern and pattern in filename_lower:
-            return config.id
+# Файлы больше этого размера (МБ) читаются потоково, пачками строк.
+# Переопределяется настройкой stream_threshold_mb
+STREAM_THRESHOLD_MB = 20
 
-    return None
 
+def get_stream_threshold() -> int:
+    """Порог размера файла в байтах, начиная с которого включается потоковое чтение"""
+    try:
+        mb = float(crud.get_settings().get('stream_threshold_mb') or STREAM_THRESHOLD_MB)
+    except (TypeError, ValueError):
+        mb = STREAM_THRESHOLD_MB
+    return int(mb * 1024 * 1024)
 
-def filter_emails_by_rule(
-        emails: list,
-        filter: Filters,
-        start_dt: datetime.datetime | None = None,
-        end_dt: datetime.datetime | None = None,
-        limit: bool = False,
-        ):
-    bad = []
-    configs = crud.list_configs_for_vendor_id(filter.vendor_id)
-    cfgs = {}
-    for cfg in configs:
-        cfgs[cfg.id] = {"cfg": cfg, "items": []}
-    for email in emails:
-        # Проверка расширения
-        if filter.extensions:
-            ext_ok = any(email['filename'].lower().endswith(ext.strip().lower())
-                         for ext in filter.extensions.split(','))
-            if not ext_ok:
-                bad.append(email)
-                continue
 
-        # Проверка темы
-        if filter.subject_contains:
-            subject_ok = any(keyword.strip().lower() in email['subject'].lower()
-                             for keyword in filter.subject_contains.split(';'))
-            if not subject_ok:
-                bad.append(email)
-                continue
+def _to_utc(dt: datetime.datetime) -> datetime.datetime:
+    """Наивная дата в UTC для хранения в общем прайсе"""
+    if not dt.tzinfo:
+        dt = dt.replace(tzinfo=datetime.timezone.utc)
+    return dt.astimezone(datetime.timezone.utc).replace(tzinfo=None)
 
-        if filter.subject_excludes:
-            subject_ex_ok = not any(keyword.strip().lower() in email['subject'].lower()
-                                    for keyword in filter.subject_excludes.split(';'))
-            if not subject_ex_ok:
-                bad.append(email)
-                continue
-
-        # Проверка имени файла (содержит)
-        if filter.filename_contains:
-            filename_ok = any(keyword.strip().lower() in email['filename'].lower()
-                              for keyword in filter.filename_contains.split(';'))
-            if not filename_ok:
-                bad.append(email)
-                continue
 
-        # Проверка имени файла (НЕ содержит)
-        if filter.filename_excludes:
-            filename_ex_ok = not any(keyword.strip().lower() in email['filename'].lower()
-                                     for keyword in filter.filename_excludes.split(';'))
-            if not filename_ex_ok:
-                bad.append(email)
-                continue
+def _system_timezone() -> datetime.timezone:
+    return datetime.timezone(datetime.timedelta(seconds=time.localtime().tm_gmtoff))
 
-        for key, value in cfgs.items():
-            filename_ok = value["cfg"].filename_template.strip().lower() in email['filename'].lower()
-            if filename_ok:
-                value["items"].append(email)
 
-    if limit:
-        for key, value in cfgs.items():
-            try:
-                value["items"] = [max(value["items"], key=lambda x: datetime.datetime.fromisoformat(x['date']))]
-            except:
-                value["items"] = []
-    all_items = [item for value in cfgs.values() for item in value["items"]]
-    if not all_items:
-        return []
-    if start_dt is not None and end_dt is not None:
-        out = []
-        for email in all_items:
-            dt = datetime.datetime.fromisoformat(email['date'])
-            if not dt.tzinfo:
-                dt = dt.replace(tzinfo=datetime.timezone.utc)
-            if start_dt <= dt <= end_dt:
-                out.append(email)
-        return out
-    return all_items
-
-
-def remove_duplicates(df: pd.DataFrame) -> pd.DataFrame:
+def frame_to_master_rows(df: pd.DataFrame) -> list[dict]:
     """
-    Удаляет дубликаты по принципу: для одинаковых "Артикул" и "Поставщик"
-    оставляет только строку с самой свежей "Дата"
+    Превращает разобранный DataFrame в строки общего прайса [{"article", "data"}].
+    Для повторяющегося в файле артикула остается первая строка. Строки без артикула
+    (или все строки, если колонки "Артикул" нет) не схлопываются - у них article = "",
+    ключ по номеру строки вложения им дает crud.upsert_master_prices.
     """
     if df.empty:
-        return df
+        return []
+    payload = df.drop(columns=["Поставщик", "Дата"], errors="ignore")
+    if "Артикул" in payload.columns:
+        articles = payload["Артикул"].map(lambda v: "" if pd.isna(v) else str(v).strip())
+    else:
+        articles = pd.Series("", index=payload.index)
+    keep = ~(articles.duplicated(keep="first") & (articles != ""))
+    payload, articles = payload[keep], articles[keep]
+    # to_json переводит NaN в null, а даты и numpy-типы - в JSON-совместимые значения
+    records = json.loads(payload.to_json(orient="records", date_format="iso", force_ascii=False,
+                                         double_precision=15))
+    return [{"article": article, "data": record} for article, record in zip(articles, records)]
 
-    # Проверяем наличие необходимых колонок
-    required_columns = ['Артикул', 'Поставщик', 'Дата']
-    missing_columns = [col for col in required_columns if col not in df.columns]
 
-    if missing_columns:
-        print(f"Предупреждение: отсутствуют колонки {missing_columns}. Пропускаем дедупликацию.")
-        return df
+def read_master_prices(
+        since: datetime.datetime | None = None,
+        attachment_ids: list[int] | None = None,
+) -> pd.DataFrame:
+    """Читает общий прайс из БД в DataFrame (Дата - в системном часовом поясе)"""
+    return _price_frame(crud.list_master_prices(
+        since=_to_utc(since) if since else None,
+        attachment_ids=attachment_ids,
+    ))
 
-    # ДИАГНОСТИКА
-    print(f"Исходное количество строк: {len(df)}")
-    print(f"Уникальных артикулов до: {df['Артикул'].nunique()}")
-    print(f"Уникальных комбинаций артикул+поставщик до: {df[['Артикул', 'Поставщик']].drop_duplicates().shape[0]}")
-    # Сортируем по дате в порядке убывания (самые свежие первыми)
-    df_sorted = df.sort_values('Дата', ascending=False)
 
-    # Удаляем дубликаты, оставляя первую запись (самую свежую) для каждой комбинации
-    df_deduped = df_sorted.drop_duplicates(subset=['Артикул', 'Поставщик'], keep='first')
+def period_frame(results: list[tuple[VendorPlan, AttachmentCandidate, list[dict]]]) -> pd.DataFrame:
+    """
+    Прайс за период из строк разобранных файлов [(поставщик, вложение, строки)]:
+    для артикула поставщика остается строка из самого свежего письма периода,
+    строки без артикула - все (как при разборе файлов за период до общего прайса).
+    """
+    seen = set()
+    rows = []
+    for vendor, candidate, candidate_rows in sorted(results, key=lambda r: r[1].date, reverse=True):
+        date = _to_utc(candidate.date)
+        for row in candidate_rows:
+            if row["article"]:
+                key = (vendor.id, row["article"])
+                if key in seen:
+                    continue
+                seen.add(key)
+            rows.append((vendor.name, date, row["data"]))
+    return _price_frame(rows)
 
-    # ДИАГНОСТИКА после
-    print(f"Количество строк после: {len(df_deduped)}")
-    print(f"Уникальных артикулов после: {df_deduped['Артикул'].nunique()}")
-    print(
-        f"Уникальных комбинаций артикул+поставщик после: {df_deduped[['Артикул', 'Поставщик']].drop_duplicates().shape[0]}")
-    print(f"Удалено дубликатов: {len(df) - len(df_deduped)}")
 
-    print(f"Удалено дубликатов: {len(df) - len(df_deduped)}")
+def _price_frame(rows: list[tuple]) -> pd.DataFrame:
+    """[(имя поставщика, дата UTC, data)] -> DataFrame (Дата - в системном часовом поясе)"""
+    if not rows:
+        return pd.DataFrame([])
+    df = pd.DataFrame.from_records([data for _, _, data in rows])
+    df["Поставщик"] = [vendor_name for vendor_name, _, _ in rows]
+    df["Дата"] = pd.to_datetime([date for _, date, _ in rows]).tz_localize("UTC").tz_convert(_system_timezone())
+    return df
 
-    return df_deduped
+
+def _profile_enabled(profile: bool | None) -> bool:
+    return profile if profile is not None else profiler.is_enabled(crud.get_settings())
+
+
+def _record_run(run: run_history.RunRecorder, prof: profiler.ParseProfiler, **fields):
+    """Этапы и объемы прогона - в историю запусков"""
+    stages = prof.stage_totals()
+    run.set_stages(stages)
+    run.update(
+        rows_in=sum(stages.get(stage, {}).get("rows") or 0 for stage in ("read", "stream_read")) or None,
+        rows_out=sum(record.rows or 0 for record in prof.files),
+        **fields,
+    )
 
 
 def parse(
         start_dt: datetime.datetime | None = None,
         end_dt: datetime.datetime | None = None,
         limit: bool = False,
-):
-    vendors = crud.list_vendors()
+        profile: bool | None = None,
+) -> dict:
+    """
+    Разбирает новые вложения в общий прайс (таблица master_prices) и выгружает его
+    в выбранные в настройках форматы (см. utils.output_sinks).
+    Возвращает сводку прогона: кандидаты, разобрано, пропущено, ошибки, выгружено строк.
+
+    Вложение разбирается повторно, только если его конфигурация изменилась
+    после предыдущего разбора. Выгрузка:
+    - start_dt/end_dt - строки из писем за период: в общем прайсе только последние версии
+      строк, поэтому выгрузка собирается из файлов периода (уже разобранные читаются заново);
+    - limit - строки из последнего файла каждой конфигурации;
+    - иначе - строки за последние 365 дней.
+    profile - сохранить отчет по этапам (см. utils.profiler), по умолчанию - по настройке profile_parse.
+    Запуск записывается в историю (utils.run_history).
+    """
+    if start_dt is not None and end_dt is not None:
+        mode = "period"
+    else:
+        mode = "limit" if limit else "depth"
+    params = {"since": start_dt, "until": end_dt, "limit": limit}
+    with profiler.run(report=_profile_enabled(profile)) as prof, run_history.record(PARSE, mode, params) as run:
+        summary = _parse(start_dt, end_dt, limit)
+        _record_run(run, prof, files_parsed=summary["parsed"])
+    return summary
 
+
+def _parse(start_dt: datetime.datetime | None, end_dt: datetime.datetime | None, limit: bool) -> dict:
+    started = time.perf_counter()
     days = 365
+    stream_threshold = get_stream_threshold()
+
+    # Поставщики, правила, конфигурации и вложения-кандидаты - одним планом
+    plan = crud.load_parse_plan(start_dt, end_dt, limit, days=days)
 
-    out_dfs = []
-    for vendor in vendors:
-        configs = crud.list_configs_for_vendor(vendor.name)
+    period = start_dt is not None and end_dt is not None
+    # Для выгрузки за период: [(поставщик, вложение, строки)] всех файлов периода
+    period_results = []
+    selected_ids = []
+    parsed_count = skipped_count = failed_count = 0
+    for vendor in plan.vendors:
         if not vendor.active:
-            print(f"Парсинг поставщика {vendor.name} отключен")
+            log.info("Парсинг поставщика %s отключен", vendor.name)
             continue
-        emailfilter = crud.get_email_filter_by_vendor(vendor.id)
-        emails_instances = crud.list_letters(vendor.id, days=days)
-        emails = [
-            {
-                "subject": email.subject,
-                "filename": a.file_name,
-                "filepath": os.path.join(pm.get_user_data(), a.file_path),
-                "date": email.date.isoformat()
-            }
-            for email in emails_instances
-            for a in email.attachments
+        for candidate in vendor.candidates:
+            selected_ids.append(candidate.attachment_id)
+
+            # Уже разобранное вложение пропускаем, если конфигурация с тех пор не менялась
+            changed_at = plan.config_changed_at.get(candidate.config_id)
+            config_obj = vendor.config(candidate.config_id)
+            if candidate.parsed_at is not None and (changed_at is None or candidate.parsed_at >= changed_at):
+                skipped_count += 1
+                if period:
+                    rows = read_candidate(vendor, config_obj, candidate, stream_threshold)
+                    if rows is not None:
+                        period_results.append((vendor, candidate, rows))
+                continue
+
+            rows = parse_candidate(vendor, config_obj, candidate, stream_threshold)
+            if rows is None:
+                failed_count += 1
+                continue
+            parsed_count += 1
+            if period:
+                period_results.append((vendor, candidate, rows))
+            log.info("%s / %s: %s строк добавлено в общий прайс", vendor.name, config_obj.name, len(rows))
+
+    log.info("Разобрано новых файлов: %s", parsed_count)
+    if parsed_count:
+        checkpoint()
+
+    # Выгружаем общий прайс: за период - из файлов периода, иначе из БД
+    if period:
+        with profiler.stage("read_period") as st:
+            out_df = period_frame(period_results)
+            st.rows = len(out_df)
+        exported = export_frame(out_df)
+    elif limit:
+        exported = export_master_prices(attachment_ids=selected_ids)
+    else:
+        exported = export_master_prices(days=days)
+    return {
+        "candidates": len(selected_ids),
+        "parsed": parsed_count,
+        "skipped": skipped_count,
+        "failed": failed_count,
+        "exported_rows": exported,
+        "seconds": round(time.perf_counter() - started, 2),
+    }
+
+
+def export_master_prices(
+        since: datetime.datetime | None = None,
+        attachment_ids: list[int] | None = None,
+        days: int | None = None,
+) -> int:
+    """
+    Выгружает общий прайс из БД (с листом сравнения цен) в выбранные форматы:
+    since - строки из писем с этой даты, attachment_ids - из указанных вложений,
+    days - за последние days дней. Возвращает число выгруженных строк.
+    Выгрузку за прошлый период общий прайс не восстановит (в нем только последние
+    версии строк) - ее собирает parse() из файлов периода (см. period_frame).
+    """
+    if days is not None:
+        since = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=days)
+    with profiler.stage("read_master") as st:
+        out_df = read_master_prices(since=since, attachment_ids=attachment_ids)
+        st.rows = len(out_df)
+    return export_frame(out_df)
+
+
+def export_frame(out_df: pd.DataFrame) -> int:
+    """Приводит типы, строит лист сравнения цен и выгружает прайс в выбранные форматы"""
+    if not out_df.empty:
+        memory_before = out_df.memory_usage(deep=True)
+        with profiler.stage("finalize", len(out_df)):
+            out_df = finalize_price_frame(out_df, float32_prices=crud.get_settings().get('price_float32') == '1')
+        memory_after = out_df.memory_usage(deep=True)
+        log.debug("%s", out_df)
+        app_settings = crud.get_settings()
+        brand_col = next((c for c in out_df.columns if "бренд" in str(c).lower()), None)
+        with profiler.stage("compare", len(out_df)):
+            comparison = compare_prices(out_df, brand_col=brand_col if app_settings.get('compare_by_brand') == '1' else None)
+        with profiler.stage("write_outputs", len(out_df)):
+            write_outputs(out_df, extra_sheets={COMPARE_SHEET: comparison} if not comparison.empty else None)
+        log.info("Память общего прайса по колонкам:\n%s", Lazy(format_memory_report, memory_before, memory_after))
+        log.info('Done!')
+    else:
+        log.info("No data found")
+    return len(out_df)
+
+
+def rebuild_config(config_id: int, days: int = 365, max_workers: int | None = None,
+                   profile: bool | None = None) -> dict:
+    """
+    Пересобирает одну конфигурацию: заново разбирает все сохраненные вложения, которые
+    ей достаются по шаблону имени файла, параллельно в потоках, заменяет ее строки
+    общего прайса и отметки о разборе и выгружает общий прайс за последние days дней.
+    Остальные конфигурации и поставщики не разбираются.
+    """
+    params = {"config_id": config_id, "days": days}
+    with profiler.run(report=_profile_enabled(profile)) as prof, run_history.record(REBUILD, "config", params) as run:
+        summary = _rebuild_config(config_id, days, max_workers)
+        _record_run(run, prof, files_parsed=summary["parsed"])
+    return summary
+
+
+def _rebuild_config(config_id: int, days: int, max_workers: int | None) -> dict:
+    started = time.perf_counter()
+    plan = crud.load_parse_plan(config_id=config_id)
+    vendor = plan.vendors[0] if plan.vendors else None
+    config_obj = vendor.config(config_id) if vendor else None
+    summary = {"config_id": config_id, "attachments": 0, "parsed": 0, "failed": 0, "rows": 0}
+    if config_obj is None:
+        log.error("Конфигурация %s не найдена", config_id)
+        return summary
+    if not vendor.active:
+        log.info("Парсинг поставщика %s отключен", vendor.name)
+        return summary
+
+    candidates = vendor.candidates
+    summary["attachments"] = len(candidates)
+    log.info("Пересборка %s / %s: вложений %s", vendor.name, config_obj.name, len(candidates))
+    stream_threshold = get_stream_threshold()
+    workers = max_workers or min(REBUILD_WORKERS, len(candidates) or 1)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        # Копия контекста на каждую задачу - чтобы в потоке был виден профиль этого прогона
+        futures = [
+            executor.submit(contextvars.copy_context().run, read_candidate, vendor, config_obj, candidate,
+                            stream_threshold)
+            for candidate in candidates
         ]
-        filtered = filter_emails_by_rule(emails, emailfilter, start_dt, end_dt, limit)
-
-        dfs = []
-        for letter in filtered:
-            source_path = Path(letter.get('filepath'))
-            source_ext = source_path.suffix
-            #letter_date = datetime.datetime.strptime(letter.get("date"), "%Y-%m-%d %H:%M")
-            letter_date = datetime.datetime.fromisoformat(letter.get("date"))
-            if not letter_date.tzinfo:
-                letter_date = letter_date.replace(tzinfo=datetime.timezone.utc)
-            utc_offset_sec = time.localtime().tm_gmtoff
-            system_timezone = datetime.timezone(datetime.timedelta(seconds=utc_offset_sec))
-            letter_date = letter_date.astimezone(system_timezone)
-            cfg_id = find_matching_config(letter.get('filename'), configs)
-            if cfg_id is not None:
-                config_obj = next((c for c in configs if c.id == cfg_id), None)
-                out_fname = f"[исходный] {vendor.name} - {config_obj.name} - {letter_date.strftime('%d.%m.%Y %H-%M')}" + source_ext
-                if config_obj.save_original:
-                    try:
-                        if not source_path:
-                            print("Путь к исходному файлу не указан")
-                        elif not os.path.exists(source_path):
-                            print(f"Исходный файл не существует: {source_path}")
-                        else:
-                            shutil.copy2(source_path, pm.save_file(out_fname, mode="source"))
-                            print(f"Успешно скопировано: {source_path} -> {out_fname}")
-
-                    except PermissionError:
-                        print(f"Ошибка доступа при копировании файла")
-                    except Exception as e:
-                        print(f"Ошибка при копировании файла: {e}")
-                try:
-                    df_in = read_excel_safe(source_path)
-                except FileNotFoundError:
-                    print(f"Файл не найден: {source_path}")
-                    continue
-                try:
-                    q_conf = json.loads(config_obj.quantum_config)
-                except:
-                    q_conf = None
-                df_out = apply_parser_settings(df_in, config_obj, vendor.name, date=letter_date, quantum_config=q_conf)
-                dfs.append({
-                    "vendor_id": vendor.id,
-                    "config_id": cfg_id,
-                    "data": df_out
-                })
+        parsed = [future.result() for future in futures]
+
+    results = [
+        (candidate.attachment_id, _to_utc(candidate.date), rows)
+        for candidate, rows in zip(candidates, parsed) if rows is not None
+    ]
+    summary["parsed"] = len(results)
+    summary["failed"] = len(candidates) - len(results)
+    with profiler.stage("db_write", sum(len(rows) for _, _, rows in results)):
+        summary["rows"] = crud.replace_config_prices(vendor.id, config_id, results)
+    checkpoint()
+    log.info("%s / %s: %s строк из %s файлов", vendor.name, config_obj.name, summary['rows'], summary['parsed'])
+
+    export_master_prices(days=days)
+    summary["seconds"] = round(time.perf_counter() - started, 2)
+    return summary
+
+
+def parse_candidate(vendor: VendorPlan, config_obj: ConfigPlan, candidate: AttachmentCandidate,
+                    stream_threshold: int) -> list[dict] | None:
+    """
+    Разбирает одно вложение и добавляет строки в общий прайс.
+    Возвращает строки общего прайса или None, если файл прочитать не удалось.
+    """
+    with profiler.file(candidate.filepath, vendor.name, config_obj.name) as f:
+        rows = read_candidate(vendor, config_obj, candidate, stream_threshold)
+        if rows is None:
+            return None
+        with profiler.stage("db_write", len(rows)):
+            written = crud.upsert_master_prices(vendor.id, config_obj.id, candidate.attachment_id,
+                                                _to_utc(candidate.date), rows)
+        f.rows = written
+        return rows
+
+
+def read_candidate(vendor: VendorPlan, config_obj: ConfigPlan, candidate: AttachmentCandidate,
+                   stream_threshold: int) -> list[dict] | None:
+    """
+    Разбирает одно вложение без записи в БД (исходный и обработанный файлы сохраняются
+    по настройкам конфигурации). Возвращает строки общего прайса или None.
+    """
+    with profiler.file(candidate.filepath, vendor.name, config_obj.name) as f:
+        rows = _read_candidate(vendor, config_obj, candidate, stream_threshold)
+        f.rows = len(rows) if rows is not None else None
+        return rows
+
+
+def _read_candidate(vendor: VendorPlan, config_obj: ConfigPlan, candidate: AttachmentCandidate,
+                    stream_threshold: int) -> list[dict] | None:
+    source_path = Path(candidate.filepath)
+    letter_date = candidate.date.astimezone(_system_timezone())
+    out_fname = f"[исходный] {vendor.name} - {config_obj.name} - {letter_date.strftime('%d.%m.%Y %H-%M')}" + source_path.suffix
+    if config_obj.save_original:
         try:
-            result_df = pd.concat([df["data"] for df in dfs])
-            out_dfs.append(result_df)
-        except:
-            print("No data for " + vendor.name)
+            if not source_path:
+                log.warning("Путь к исходному файлу не указан")
+            elif not os.path.exists(source_path):
+                log.warning("Исходный файл не существует: %s", source_path)
+            else:
+                with profiler.stage("save_original"):
+                    shutil.copy2(source_path, pm.save_file(out_fname, mode="source"))
+                log.debug("Успешно скопировано: %s -> %s", source_path, out_fname)
 
-    # Объединяем все данные
-    if out_dfs:
-        out_df = pd.concat(out_dfs)
+        except PermissionError:
+            log.error("Ошибка доступа при копировании файла")
+        except Exception as e:
+            log.error("Ошибка при копировании файла: %s", e)
+    try:
+        q_conf = json.loads(config_obj.quantum_config)
+    except:
+        q_conf = None
+    df_out = parse_file(source_path, config_obj, vendor.name, letter_date, q_conf, stream_threshold)
+    if df_out is None:
+        return None
+    with profiler.stage("to_rows", len(df_out)):
+        return frame_to_master_rows(df_out)
 
-        # Удаляем дубликаты
-        out_df = remove_duplicates(out_df)#.drop(['Дата'], axis=1)
 
-        print(out_df)
-        to_excel_with_role_widths(out_df, pm.save_file('Объединенный прайс.xlsx'))
-        print('Done!')
-    else:
-        print("No data found")
\ No newline at end of file
+def parse_file(source_path: Path, config_obj: ParsingConfig | ConfigPlan, vendor_name: str, letter_date: datetime.datetime,
+               q_conf: dict | None, stream_threshold: int) -> pd.DataFrame | None:
+    """Читает файл поставщика и применяет к нему конфигурацию. None - файл прочитать не удалось"""
+    # Большие файлы читаем потоково, пачками строк
+    if os.path.exists(source_path) and os.path.getsize(source_path) >= stream_threshold:
+        try:
+            # Этапы stream_read и transform замеряются по пачкам внутри
+            return apply_parser_settings_stream(source_path, config_obj, vendor_name,
+                                                date=letter_date, quantum_config=q_conf)
+        except Exception as e:
+            log.warning("Потоковое чтение %s не удалось (%s), читаем целиком", source_path, e)
+    # Читаем только колонки из конфигурации, при несовпадении шапки - весь лист
+    columns, optional_columns = source_columns(get_roles_mapping(config_obj), q_conf)
+    with profiler.stage("read") as st:
+        try:
+            df_in = read_excel_for_config(source_path, config_obj.header_row, columns, optional_columns)
+        except Exception:
+            df_in = None
+        header_applied = df_in is not None
+        if df_in is None:
+            try:
+                df_in = read_excel_safe(source_path)
+            except FileNotFoundError:
+                log.error("Файл не найден: %s", source_path)
+                return None
+        st.rows = len(df_in)
+    return apply_parser_settings(df_in, config_obj, vendor_name, date=letter_date, quantum_config=q_conf,
+                                 header_applied=header_applied)
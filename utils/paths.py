@@ -1,5 +1,6 @@
 import os
 import sys
+from functools import cached_property
 from pathlib import Path
 from typing import Literal
 import appdirs
@@ -8,6 +9,7 @@ import appdirs
 class PathManager:
     def __init__(self):
         self.is_frozen = getattr(sys, 'frozen', False)
+        self._created_dirs = set()
         self._setup_paths()
 
     def _setup_paths(self):
@@ -69,13 +71,24 @@ class PathManager:
             'site_data': Path(appdirs.site_data_dir(app_name, app_author)),
         }
 
+    @cached_property
+    def app_dirs(self) -> dict[str, Path]:
+        """Стандартные пути, вычисленные один раз за запуск"""
+        return self.get_app_dirs_standard()
+
+    def _ensure_dir(self, key: str) -> Path:
+        """Путь из app_dirs; директория создается при первом обращении"""
+        path = self.app_dirs[key]
+        if key not in self._created_dirs:
+            path.mkdir(parents=True, exist_ok=True)
+            self._created_dirs.add(key)
+        return path
+
     def get_user_data(self):
-        ud = self.get_app_dirs_standard()['user_data'].mkdir(parents=True, exist_ok=True)
-        return self.get_app_dirs_standard()['user_data']
+        return self._ensure_dir('user_data')
 
     def get_logs(self):
-        logs = self.get_app_dirs_standard()['user_logs'].mkdir(parents=True, exist_ok=True)
-        return self.get_app_dirs_standard()['user_logs']
+        return self._ensure_dir('user_logs')
 
 
 pm = PathManager()
\ No newline at end of file
@@ -0,0 +1,82 @@
+import pandas as pd
+
+COMPARE_SHEET = "Сравнение цен"
+
+# Все, кроме букв и цифр (пробелы, дефисы, точки, слэши и т.п.)
+_PUNCTUATION_RE = r"[\W_]+"
+# Ведущие нули в числовой части: '000123' -> '123', 'ab-001' -> 'ab1'
+_LEADING_ZEROS_RE = r"(?<!\d)0+(?=\d)"
+
+
+def _article_text(value):
+    """Целое число, прочитанное как float (12345.0), - в '12345', как у поставщиков с текстовым артикулом"""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return value
+
+
+def normalize_articles(articles: pd.Series, brands: pd.Series | None = None) -> pd.Series:
+    """
+    Нормализованный артикул для сравнения между поставщиками:
+    регистр не важен, пробелы и знаки препинания убираются, ведущие нули отбрасываются,
+    числовой артикул 12345.0 совпадает с текстовым '12345'.
+    Если переданы бренды, артикул уточняется брендом ('бренд:артикул').
+    """
+    # Строковые операции выполняются только над уникальными значениями
+    codes, uniques = pd.factorize(articles)
+    normalized = (
+        pd.Series(uniques, dtype=object).map(_article_text).astype("string")
+        .str.casefold()
+        .str.replace(_PUNCTUATION_RE, "", regex=True)
+        .str.replace(_LEADING_ZEROS_RE, "", regex=True)
+    )
+    key = pd.Series(normalized.array.take(codes, allow_fill=True), index=articles.index, dtype="string")
+    if brands is not None:
+        brand = brands.astype("string").str.casefold().str.replace(_PUNCTUATION_RE, "", regex=True).fillna("")
+        key = key.mask(brand != "", brand + ":" + key)
+    return key.mask(key == "")
+
+
+def compare_prices(df: pd.DataFrame, price_col: str = "Закупочная цена", article_col: str = "Артикул",
+                   vendor_col: str = "Поставщик", brand_col: str | None = None) -> pd.DataFrame:
+    """
+    Сравнение цен по нормализованному артикулу между всеми поставщиками:
+    минимальная, максимальная и медианная цена, число поставщиков и самый дешевый поставщик.
+    """
+    if df.empty or any(c not in df.columns for c in (price_col, article_col, vendor_col)):
+        return pd.DataFrame([])
+
+    brands = df[brand_col] if brand_col and brand_col in df.columns else None
+    data = pd.DataFrame({
+        "key": normalize_articles(df[article_col], brands),
+        "article": df[article_col],
+        "price": pd.to_numeric(df[price_col], errors="coerce"),
+        "vendor": df[vendor_col],
+    })
+    if "Наименование" in df.columns:
+        data["name"] = df["Наименование"]
+    data = data.dropna(subset=["key", "price"])
+    if data.empty:
+        return pd.DataFrame([])
+
+    grouped = data.groupby("key", sort=False, observed=True)
+    stats = grouped["price"].agg(["min", "max", "median"])
+    stats["vendors"] = grouped["vendor"].nunique()
+
+    # Самый дешевый поставщик - строка с минимальной ценой в группе
+    cheapest = data.loc[grouped["price"].idxmin().to_numpy()].set_index("key")
+
+    result = pd.DataFrame({
+        "Артикул": cheapest["article"],
+        "Наименование": cheapest["name"] if "name" in cheapest.columns else None,
+        "Лучший поставщик": cheapest["vendor"],
+        "Мин. цена": stats["min"],
+        "Макс. цена": stats["max"],
+        "Медиана": stats["median"],
+        "Поставщиков": stats["vendors"],
+    }, index=stats.index)
+    if "name" not in cheapest.columns:
+        result = result.drop(columns=["Наименование"])
+    min_price = result["Мин. цена"].where(result["Мин. цена"] > 0)
+    result["Разница, %"] = ((result["Макс. цена"] / min_price - 1) * 100).round(1)
+    return result.sort_values(["Поставщиков", "Разница, %"], ascending=False).reset_index(drop=True)
@@ -0,0 +1,69 @@
+import pandas as pd
+
+from utils.price_parser import parse_price_series
+
+# Колонки общего прайса по типам (роли задаются пользователем, поэтому
+# кроме точных названий проверяются и подстроки)
+CATEGORY_COLUMNS = ("Поставщик",)
+CATEGORY_SUBSTRINGS = ("бренд", "единиц", "ед. изм", "ед.изм")
+PRICE_COLUMNS = ("Закупочная цена", "Цена", "РРЦ", "(?) РРЦ")
+INTEGER_COLUMNS = ("Остаток", "Квант")
+DATE_COLUMNS = ("Дата",)
+
+
+def _is_category_column(name: str) -> bool:
+    lower = str(name).lower()
+    return name in CATEGORY_COLUMNS or any(s in lower for s in CATEGORY_SUBSTRINGS)
+
+
+def _to_nullable_int(series: pd.Series) -> pd.Series:
+    """
+    Приводит колонку к Int64, если все непустые значения - целые числа.
+    Иначе (например, остаток '50+') колонка остается как есть.
+    """
+    numbers = pd.to_numeric(series, errors="coerce")
+    if numbers.notna().sum() != series.notna().sum():
+        return series
+    if not (numbers.dropna() % 1 == 0).all():
+        return numbers
+    return numbers.astype("Int64")
+
+
+def finalize_price_frame(df: pd.DataFrame, float32_prices: bool = False) -> pd.DataFrame:
+    """
+    Приводит общий прайс к компактным типам:
+    - поставщик, бренд, единицы измерения -> category;
+    - цены -> float64 (float32 при float32_prices), текстовые разбираются parse_price_series;
+    - остаток и квант -> Int64, если значения целые;
+    - дата -> datetime64.
+    """
+    if df.empty:
+        return df
+    price_dtype = "float32" if float32_prices else "float64"
+    casts = {}
+    for col in df.columns:
+        series = df[col]
+        if col in DATE_COLUMNS:
+            if not pd.api.types.is_datetime64_any_dtype(series):
+                casts[col] = pd.to_datetime(series, utc=True, errors="coerce")
+        elif col in PRICE_COLUMNS:
+            if not pd.api.types.is_numeric_dtype(series):
+                # РРЦ приходит из файла как есть: '1 500 руб', '12,5'
+                series, _ = parse_price_series(series)
+            casts[col] = series.astype(price_dtype)
+        elif col in INTEGER_COLUMNS:
+            casts[col] = _to_nullable_int(series)
+        elif _is_category_column(col) and not isinstance(series.dtype, pd.CategoricalDtype):
+            casts[col] = series.astype("category")
+    return df.assign(**casts) if casts else df
+
+
+def format_memory_report(before: pd.Series, after: pd.Series) -> str:
+    """Отчет по памяти колонок (df.memory_usage(deep=True) до и после приведения типов)"""
+    lines = [f"{'Колонка':<30}{'До, КБ':>12}{'После, КБ':>12}"]
+    for col in after.index:
+        if col == "Index":
+            continue
+        lines.append(f"{str(col):<30}{before.get(col, 0) / 1024:>12.1f}{after[col] / 1024:>12.1f}")
+    lines.append(f"{'Итого':<30}{before.sum() / 1024:>12.1f}{after.sum() / 1024:>12.1f}")
+    return "\n".join(lines)
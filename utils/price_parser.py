@@ -0,0 +1,45 @@
+import pandas as pd
+
+# Максимальная длина строки с ценой после очистки (отсекаем длинный текст)
+MAX_PRICE_LENGTH = 10
+
+# Пробелы, которые встречаются как разделители тысяч
+_SPACES_RE = r"[\s\u00a0\u202f\u2009]+"
+# Валютные обозначения и сокращения, которые дописывают к цене
+_CURRENCY_RE = r"(?i)(?:руб(?:лей|ля|ль)?\.?|р\.|₽|rub\.?|rur\.?|usd|eur|\$|€)"
+
+
+def parse_price_series(values: pd.Series) -> tuple[pd.Series, pd.Series]:
+    """
+    Векторно разбирает колонку цен.
+    Понимает '1 234,56', '1234.56 руб', '1.234,56', неразрывные пробелы, '1,234.56' и символы валют.
+
+    Возвращает:
+    - prices: float64 колонка (NaN там, где цену разобрать не удалось)
+    - valid: булева маска валидных цен (замена старой valid_price)
+    """
+    # Числовые ячейки (и строки, которые уже являются числом) берем как есть
+    direct = pd.to_numeric(values, errors="coerce")
+    is_text = values.notna() & direct.isna()
+
+    text = values.where(is_text).astype("string")
+    cleaned = (
+        text.str.replace(_SPACES_RE, "", regex=True)
+        .str.replace(_CURRENCY_RE, "", regex=True)
+        .str.strip()
+    )
+    # Есть и запятая, и точка: десятичный разделитель - тот, что стоит последним,
+    # другой разделяет тысячи ('1,234.56' и '1.234,56')
+    both = (cleaned.str.contains(",", regex=False) & cleaned.str.contains(".", regex=False)).fillna(False)
+    comma_last = (cleaned.str.rfind(",") > cleaned.str.rfind(".")).fillna(False)
+    cleaned = cleaned.mask(both & comma_last, cleaned.str.replace(".", "", regex=False))
+    cleaned = cleaned.mask(both & ~comma_last, cleaned.str.replace(",", "", regex=False))
+    cleaned = cleaned.str.replace(",", ".", regex=False)
+
+    number = cleaned.str.extract(r"(\d+(?:\.\d+)?)", expand=False)
+    parsed = pd.to_numeric(number, errors="coerce")
+
+    prices = direct.where(~is_text, parsed).astype("float64")
+    text_ok = cleaned.str.len().le(MAX_PRICE_LENGTH).fillna(False).astype(bool)
+    valid = prices.notna() & (~is_text | text_ok)
+    return prices, valid
@@ -0,0 +1,280 @@
+"""
+Профиль прогона разбора: время этапов и число строк по каждому файлу.
+
+    with profiler.run():                      # parse() / rebuild_config()
+        with profiler.file(path, vendor, config) as f:
+            with profiler.stage("read") as st:
+                df = read_excel_safe(path)
+                st.rows = len(df)
+            f.rows = len(result)
+
+Этапы могут быть вложенными: у каждого считается собственное время (без вложенных этапов),
+так что одно и то же время не попадает в два этапа. Этапы вне file() относятся ко всему прогону
+(чтение общего прайса из БД, выгрузка). Потоки (rebuild_config) профилируются независимо.
+Активный профиль хранится в ContextVar, так что одновременные прогоны (два окна задач)
+не видят замеры друг друга; в пул потоков его передают через contextvars.copy_context().run.
+
+Вне run() stage() и file() возвращают общий пустой контекст - ни замеров, ни выделения памяти.
+parse()/rebuild_config() замеряют этапы всегда (это несколько замеров на файл, для истории
+запусков - utils.run_history), а отчет сохраняется рядом с выгрузкой (PROFILE_BASENAME.json)
+и сводка самых медленных файлов и этапов пишется в журнал, только если включен профиль:
+аргумент profile, настройка profile_parse = 1 или переменная окружения PRICELIST_PROFILE=1.
+"""
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+
+log = logging.getLogger(__name__)
+
+PROFILE_ENV = "PRICELIST_PROFILE"
+PROFILE_BASENAME = "Профиль разбора"
+# Сколько файлов и этапов показывать в сводке
+TOP_N = 10
+
+
+class _Null:
+    """Контекст выключенного профилирования: присваивания (st.rows = ...) игнорируются"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __setattr__(self, name, value):
+        pass
+
+
+_NULL = _Null()
+
+
+class _Record:
+    """Этапы файла или всего прогона: {этап: [секунды, вызовы, строки]}"""
+
+    def __init__(self, name: str | None = None, vendor: str | None = None, config: str | None = None):
+        self.name = name
+        self.vendor = vendor
+        self.config = config
+        self.stages: dict[str, list] = {}
+        self.seconds = 0.0
+        self.rows = None
+
+    def add(self, stage: str, seconds: float, rows: int | None):
+        entry = self.stages.get(stage)
+        if entry is None:
+            entry = self.stages[stage] = [0.0, 0, None]
+        entry[0] += seconds
+        entry[1] += 1
+        if rows is not None:
+            entry[2] = (entry[2] or 0) + rows
+
+    def to_dict(self) -> dict:
+        data = {"file": self.name, "vendor": self.vendor, "config": self.config,
+                "seconds": round(self.seconds, 4), "rows": self.rows} if self.name is not None else {}
+        data["stages"] = {
+            stage: {"seconds": round(seconds, 4), "calls": calls, "rows": rows}
+            for stage, (seconds, calls, rows) in sorted(self.stages.items(), key=lambda kv: -kv[1][0])
+        }
+        return data
+
+
+class _Stage:
+    __slots__ = ("profiler", "name", "rows", "started", "children")
+
+    def __init__(self, profiler: "ParseProfiler", name: str, rows: int | None):
+        self.profiler = profiler
+        self.name = name
+        self.rows = rows
+
+    def __enter__(self):
+        self.children = 0.0
+        self.profiler._stack().append(self)
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.started
+        stack = self.profiler._stack()
+        stack.pop()
+        if stack:
+            stack[-1].children += elapsed
+        self.profiler._record().add(self.name, elapsed - self.children, self.rows)
+        return False
+
+
+class _File:
+    __slots__ = ("profiler", "record", "started", "previous")
+
+    def __init__(self, profiler: "ParseProfiler", record: _Record):
+        self.profiler = profiler
+        self.record = record
+
+    @property
+    def rows(self):
+        return self.record.rows
+
+    @rows.setter
+    def rows(self, value):
+        self.record.rows = value
+
+    def __enter__(self):
+        local = self.profiler._local
+        self.previous = getattr(local, "record", None)
+        local.record = self.record
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.record.seconds = time.perf_counter() - self.started
+        self.profiler._local.record = self.previous
+        with self.profiler._lock:
+            self.profiler.files.append(self.record)
+        return False
+
+
+class ParseProfiler:
+    """Замеры одного прогона разбора"""
+
+    def __init__(self):
+        self.started_at = datetime.now().astimezone()
+        self.started = time.perf_counter()
+        self.seconds = None
+        self.files: list[_Record] = []
+        self.total = _Record()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _stack(self) -> list:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _record(self) -> _Record:
+        return getattr(self._local, "record", None) or self.total
+
+    def stage(self, name: str, rows: int | None = None) -> _Stage:
+        return _Stage(self, name, rows)
+
+    def file(self, path, vendor: str | None = None, config: str | None = None) -> _File:
+        return _File(self, _Record(str(path), vendor, config))
+
+    def finish(self):
+        self.seconds = time.perf_counter() - self.started
+
+    def stage_totals(self) -> dict:
+        """Этапы по всем файлам и прогону вместе, по убыванию времени"""
+        totals = _Record()
+        for record in self.files + [self.total]:
+            for stage, (seconds, calls, rows) in record.stages.items():
+                entry = totals.stages.setdefault(stage, [0.0, 0, None])
+                entry[0] += seconds
+                entry[1] += calls
+                if rows is not None:
+                    entry[2] = (entry[2] or 0) + rows
+        return totals.to_dict()["stages"]
+
+    def report(self) -> dict:
+        files = sorted(self.files, key=lambda r: -r.seconds)
+        return {
+            "started_at": self.started_at.isoformat(timespec="seconds"),
+            "seconds": round(self.seconds if self.seconds is not None else time.perf_counter() - self.started, 4),
+            "files_count": len(files),
+            "stages": self.stage_totals(),
+            "run_stages": self.total.to_dict()["stages"],
+            "files": [r.to_dict() for r in files],
+        }
+
+    def summary(self, top: int = TOP_N) -> str:
+        """Самые медленные файлы и этапы (для журнала)"""
+        report = self.report()
+        lines = [f"Профиль разбора: {report['seconds']:.2f} с, файлов {report['files_count']}",
+                 "Этапы:"]
+        for stage, data in list(report["stages"].items())[:top]:
+            rows = f", строк {data['rows']}" if data["rows"] is not None else ""
+            lines.append(f"  {stage:<16}{data['seconds']:>10.3f} с  x{data['calls']}{rows}")
+        if report["files"]:
+            lines.append("Файлы:")
+        for entry in report["files"][:top]:
+            slowest = next(iter(entry["stages"]), "-")
+            lines.append(f"  {entry['seconds']:>8.3f} с  {entry['vendor']} / {entry['config']}: "
+                         f"{os.path.basename(entry['file'])} (строк {entry['rows']}, дольше всего {slowest})")
+        return "\n".join(lines)
+
+    def save(self, path: str) -> str:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.report(), f, ensure_ascii=False, indent=2)
+        return path
+
+
+_active: contextvars.ContextVar[ParseProfiler | None] = contextvars.ContextVar("profiler", default=None)
+
+
+def run(enabled: bool = True, report: bool = True) -> "ProfiledRun":
+    """
+    Профилирование прогона: with profiler.run(enabled, report) as p - p это ParseProfiler или None.
+    report=False - только замеры (для истории запусков), без файла отчета и сводки в журнале.
+    """
+    return ProfiledRun(enabled, report)
+
+
+def stage(name: str, rows: int | None = None):
+    """Замер этапа (пустой контекст, если профилирование выключено)"""
+    profiler = _active.get()
+    return _NULL if profiler is None else profiler.stage(name, rows)
+
+
+def file(path, vendor: str | None = None, config: str | None = None):
+    """
+    Замер разбора одного файла (пустой контекст, если профилирование выключено).
+    Вложенный file() того же потока ничего не замеряет - время идет во внешний.
+    """
+    profiler = _active.get()
+    if profiler is None or getattr(profiler._local, "record", None) is not None:
+        return _NULL
+    return profiler.file(path, vendor, config)
+
+
+def is_enabled(settings: dict | None = None) -> bool:
+    """PRICELIST_PROFILE=1 или настройка profile_parse = 1"""
+    if os.environ.get(PROFILE_ENV, "").strip() in ("1", "true", "yes"):
+        return True
+    return bool(settings) and settings.get("profile_parse") == "1"
+
+
+class ProfiledRun:
+    """Прогон разбора; по выходу отчет сохраняется рядом с выгрузкой, сводка пишется в журнал"""
+
+    def __init__(self, enabled: bool = True, report: bool = True):
+        self.enabled = enabled
+        self.report = report
+        self.profiler = None
+        self.path = None
+        self._token = None
+
+    def __enter__(self) -> ParseProfiler | None:
+        if self.enabled:
+            self.profiler = ParseProfiler()
+            self._token = _active.set(self.profiler)
+        return self.profiler
+
+    def __exit__(self, *exc):
+        if self.profiler is None:
+            return False
+        _active.reset(self._token)
+        self.profiler.finish()
+        if not self.report:
+            return False
+        try:
+            from utils.paths import pm
+
+            self.path = self.profiler.save(pm.save_file(f"{PROFILE_BASENAME}.json"))
+        except OSError as e:
+            log.warning("Не удалось сохранить профиль разбора: %s", e)
+        log.info("%s\nОтчет: %s", self.profiler.summary(), self.path)
+        return False
@@ -0,0 +1,142 @@
+"""
+Проверка планов запросов crud на большой тестовой БД.
+
+Создает временную БД по моделям, заполняет ее (по умолчанию 1 000 000 писем),
+выполняет основные функции crud, для каждого выполненного SELECT снимает
+EXPLAIN QUERY PLAN и завершается с ненулевым кодом, если какая-то из больших
+таблиц читается полным сканированием.
+
+    python -m utils.query_plans [--letters N]
+"""
+import argparse
+import os
+import re
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import create_engine, event
+
+import models  # noqa: F401 - регистрирует таблицы в Base.metadata
+import utils.db as db
+
+# Таблицы, полное сканирование которых считается регрессией
+LARGE_TABLES = ("letters", "attachments", "master_prices", "parsed_attachments")
+# "SCAN t" и "SCAN t USING INDEX ..." - обход всей таблицы, "SEARCH t USING INDEX ..." - поиск по индексу
+_SCAN_RE = re.compile(r"\bSCAN (\w+)")
+
+VENDORS = 200
+CONFIGS_PER_VENDOR = 3
+
+
+def seed(path: str, letters: int):
+    """Заполняет БД: поставщики, правила, конфигурации, письма, вложения, общий прайс"""
+    con = sqlite3.connect(path)
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    con.executemany("INSERT INTO vendors (id, name, active) VALUES (?, ?, 1)",
+                    [(v, f"Поставщик {v}") for v in range(1, VENDORS + 1)])
+    con.executemany("INSERT INTO emailfilters (id, name, senders, vendor_id, extensions, active) "
+                    "VALUES (?, ?, ?, ?, '.xlsx,.xls', 1)",
+                    [(v, f"Поставщик {v}", f"v{v}@example.com", v) for v in range(1, VENDORS + 1)])
+    con.executemany("INSERT INTO parsing_configs (id, name, vendor_id, header_row, filename_template, active, "
+                    "to_common, save_original, save_parsed) VALUES (?, ?, ?, 0, ?, 1, 1, 0, 0)",
+                    [((v - 1) * CONFIGS_PER_VENDOR + c, f"Прайс {c}", v, f"прайс_{c}")
+                     for v in range(1, VENDORS + 1) for c in range(1, CONFIGS_PER_VENDOR + 1)])
+    con.executemany("INSERT INTO letters (id, letter_id, vendor_id, sender, subject, date) VALUES (?, ?, ?, ?, ?, ?)",
+                    ((i, i, i % VENDORS + 1, "a@example.com", "Прайс",
+                      (now - timedelta(minutes=i)).isoformat(sep=" ")) for i in range(1, letters + 1)))
+    con.executemany("INSERT INTO attachments (id, letter_id, file_name, file_path, size) VALUES (?, ?, ?, ?, 1)",
+                    ((i, i, f"прайс_{i % CONFIGS_PER_VENDOR + 1}.xlsx", f"files/{i}.xlsx")
+                     for i in range(1, letters + 1)))
+    prices = min(letters, 200_000)
+    con.executemany("INSERT INTO master_prices (vendor_id, article, config_id, attachment_id, date, data) "
+                    "VALUES (?, ?, ?, ?, ?, '{}')",
+                    ((i % VENDORS + 1, f"A{i}", 1, i, (now - timedelta(minutes=i)).isoformat(sep=" "))
+                     for i in range(1, prices + 1)))
+    con.executemany("INSERT INTO parsed_attachments (attachment_id, config_id, parsed_at, rows) VALUES (?, 1, ?, 0)",
+                    ((i, now.isoformat(sep=" ")) for i in range(1, prices + 1)))
+    con.commit()
+    con.execute("ANALYZE")
+    con.close()
+
+
+def run_crud_queries():
+    """Основные запросы crud (импорт здесь, чтобы SessionLocal и ReadSessionLocal уже смотрели во временную БД)"""
+    import crud
+
+    now = datetime.now(timezone.utc)
+    vendor = crud.get_vendor_by_name("Поставщик 7")
+    crud.get_email_filter_by_vendor(vendor.id)
+    crud.list_configs_for_vendor(vendor.name)
+    crud.list_configs_for_vendor_id(vendor.id)
+    crud.get_config_by_name("Прайс 1")
+    crud.list_letters(vendor.id, days=30)
+    crud.list_letters(days=1)
+    crud.list_letters_email_ids([vendor.id])
+    crud.find_attachment_by_filename("прайс_1.xlsx")
+    crud.list_attachments_by_letter(42)
+    crud.list_master_prices(since=(now - timedelta(days=1)).replace(tzinfo=None))
+    crud.list_master_prices(attachment_ids=list(range(1, 100)))
+    # План прогона: кандидаты выбирает _parse_candidates_stmt во всех режимах parse() и rebuild_config()
+    crud.load_parse_plan(days=365)
+    crud.load_parse_plan(limit=True, days=365)
+    crud.load_parse_plan(start_dt=now - timedelta(days=3), end_dt=now)
+    crud.load_parse_plan(days=365, config_id=(7 - 1) * CONFIGS_PER_VENDOR + 1)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="EXPLAIN QUERY PLAN для запросов crud")
+    parser.add_argument("--letters", type=int, default=1_000_000, help="сколько писем создать в тестовой БД")
+    args = parser.parse_args(argv)
+
+    tmp_dir = tempfile.mkdtemp(prefix="pricelist-plans-")
+    path = os.path.join(tmp_dir, "plans.db")
+    engine = create_engine("sqlite:///" + path, future=True)
+    event.listen(engine, "connect", db._register_sqlite_functions)
+    db.Base.metadata.create_all(engine)
+
+    started = time.perf_counter()
+    seed(path, args.letters)
+    print(f"Тестовая БД: {args.letters} писем, заполнена за {time.perf_counter() - started:.1f} с")
+
+    # Читающие функции crud идут через ReadSessionLocal - ему свой движок только для чтения
+    read_engine = create_engine("sqlite:///" + path, future=True)
+    event.listen(read_engine, "connect", db._register_sqlite_functions)
+    event.listen(read_engine, "connect", db._set_query_only)
+
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and not executemany:
+            statements.append((statement, parameters))
+
+    for bound in (engine, read_engine):
+        event.listen(bound, "before_cursor_execute", capture)
+    db.SessionLocal.configure(bind=engine)
+    db.ReadSessionLocal.configure(bind=read_engine)
+    run_crud_queries()
+
+    failures = 0
+    con = sqlite3.connect(path)
+    db._register_sqlite_functions(con, None)
+    for statement, parameters in statements:
+        plan = [row[3] for row in con.execute("EXPLAIN QUERY PLAN " + statement, parameters)]
+        scans = [m.group(1) for line in plan for m in [_SCAN_RE.search(line)] if m and m.group(1) in LARGE_TABLES]
+        if scans:
+            failures += 1
+            print("ПОЛНОЕ СКАНИРОВАНИЕ " + ", ".join(scans))
+            print("  " + " ".join(statement.split())[:300])
+            for line in plan:
+                print("    " + line)
+    con.close()
+    engine.dispose()
+    read_engine.dispose()
+
+    print(f"Проверено запросов: {len(statements)}, с полным сканированием: {failures}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
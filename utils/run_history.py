@@ -0,0 +1,221 @@
+"""
+История запусков загрузки и разбора (таблицы runs и run_stages).
+
+    with run_history.record(PARSE, "period", {"since": ...}) as run:
+        ...
+        run.update(files_parsed=..., rows_out=...)
+        run.set_stages(profile.stage_totals())
+
+По выходу запуск сохраняется вместе с временем этапов и пиковой памятью процесса
+(RSS, psutil, замер каждые RSS_INTERVAL секунд в отдельном потоке). Этапы сравниваются
+с предыдущими ROLLING_RUNS запусками того же вида и режима по времени на строку
+(на вызов, если строки этап не считает) - так прогон за год не "замедляется" относительно
+прогона по последним файлам. Этап, который шел дольше SLOWDOWN медиан, попадает
+в warnings запуска и в журнал предупреждением. Ошибка записи истории запуск не прерывает.
+"""
+import logging
+import statistics
+import threading
+import time
+from datetime import datetime
+
+log = logging.getLogger(__name__)
+
+# Сколько предыдущих запусков берется для медианы этапа
+ROLLING_RUNS = 20
+# Медиана считается только по стольким запускам и больше
+MIN_HISTORY = 5
+# Во сколько раз медленнее медианы этап считается замедлившимся
+SLOWDOWN = 2.0
+# Этапы короче этого (сек) не проверяются - на них сравнение шумит
+MIN_STAGE_SECONDS = 0.5
+# Период замера RSS, сек
+RSS_INTERVAL = 0.5
+
+SPARK_CHARS = "▁▂▃▄▅▆▇█"
+
+
+class RssSampler:
+    """Пиковый RSS процесса за время работы (None, если psutil недоступен)"""
+
+    def __init__(self, interval: float = RSS_INTERVAL):
+        self.interval = interval
+        self.peak = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._process = None
+
+    def start(self):
+        try:
+            import psutil
+        except ImportError:
+            return self
+        self._process = psutil.Process()
+        self._sample()
+        self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def _sample(self):
+        rss = self._process.memory_info().rss
+        if self.peak is None or rss > self.peak:
+            self.peak = rss
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def stop(self) -> int | None:
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._sample()
+        return self.peak
+
+
+def median_of(values: list[float]) -> float | None:
+    return statistics.median(values) if len(values) >= MIN_HISTORY else None
+
+
+def unit_seconds(seconds: float, calls: int | None, rows: int | None) -> float:
+    """Время этапа на строку (на вызов, если строк нет)"""
+    return seconds / (rows or calls or 1)
+
+
+def slow_stages(stages: dict[str, dict], history: dict[str, list[tuple]]) -> list[dict]:
+    """
+    Этапы, шедшие дольше SLOWDOWN медиан времени на строку (вызов):
+    [{"stage", "seconds", "median"}], median - медиана в пересчете на объем этого запуска
+    """
+    slow = []
+    for stage, data in stages.items():
+        median = median_of([unit_seconds(*entry) for entry in history.get(stage, [])[-ROLLING_RUNS:]])
+        seconds = data["seconds"]
+        units = data.get("rows") or data.get("calls") or 1
+        if median and seconds >= MIN_STAGE_SECONDS and seconds > SLOWDOWN * median * units:
+            slow.append({"stage": stage, "seconds": round(seconds, 3), "median": round(median * units, 3)})
+    return slow
+
+
+def sparkline(values: list[float]) -> str:
+    """Строка из ▁..█ по значениям (от старых к новым)"""
+    if not values:
+        return ""
+    low, high = min(values), max(values)
+    if high - low < 1e-9:
+        return SPARK_CHARS[0] * len(values)
+    scale = (len(SPARK_CHARS) - 1) / (high - low)
+    return "".join(SPARK_CHARS[round((v - low) * scale)] for v in values)
+
+
+def stage_trends(runs: list, last: int = ROLLING_RUNS) -> list[dict]:
+    """
+    Тренды этапов по запускам (crud.list_runs, новые первыми), отдельно по виду и режиму:
+    [{"kind", "mode", "stage", "runs", "last", "median", "min", "max", "trend", "slow"}] - время в секундах,
+    slow - последний запуск дольше SLOWDOWN медиан по времени на строку (вызов); самые долгие этапы первыми
+    """
+    series: dict[tuple[str, str, str], list] = {}
+    for run in reversed(runs):
+        if run.status != "ok":
+            continue
+        for stage in run.stages:
+            series.setdefault((run.kind, run.mode, stage.stage), []).append(stage)
+    trends = []
+    for (kind, mode, stage), entries in series.items():
+        entries = entries[-last:]
+        values = [entry.seconds for entry in entries]
+        units = [unit_seconds(entry.seconds, entry.calls, entry.rows) for entry in entries]
+        median = statistics.median(values)
+        trends.append({
+            "kind": kind,
+            "mode": mode,
+            "stage": stage,
+            "runs": len(values),
+            "last": values[-1],
+            "median": median,
+            "min": min(values),
+            "max": max(values),
+            "trend": sparkline(values),
+            "slow": len(values) > MIN_HISTORY and values[-1] >= MIN_STAGE_SECONDS
+                    and units[-1] > SLOWDOWN * statistics.median(units[:-1]),
+        })
+    trends.sort(key=lambda t: (t["kind"], t["mode"], -t["median"]))
+    return trends
+
+
+def stages_from_metrics(snapshot: dict) -> dict[str, dict]:
+    """Этапы загрузки из снимка utils.metrics: команды IMAP и ожидание пула (суммарное время по потокам)"""
+    metrics = snapshot.get("metrics", {})
+    stages = {}
+    for series in metrics.get("imap_command_seconds", {}).get("series", []):
+        stages[f"imap_{series['labels'].get('command', '').lower()}"] = {
+            "seconds": series["sum"], "calls": series["count"], "rows": None}
+    for series in metrics.get("pool_wait_seconds", {}).get("series", []):
+        stages["pool_wait"] = {"seconds": series["sum"], "calls": series["count"], "rows": None}
+    return stages
+
+
+class RunRecorder:
+    """Запись одного запуска в историю (см. record())"""
+
+    def __init__(self, kind: str, mode: str, params: dict | None = None):
+        self.kind = kind
+        self.mode = mode
+        self.params = {key: value.isoformat() if isinstance(value, datetime) else value
+                       for key, value in (params or {}).items()}
+        self.fields: dict = {}
+        self.stages: dict[str, dict] = {}
+        self.warnings: list[dict] = []
+        self.run_id = None
+        self._sampler = RssSampler()
+
+    def update(self, **fields):
+        """Объемы запуска: emails_scanned, emails_matched, bytes_fetched, files_parsed, rows_in, rows_out"""
+        self.fields.update(fields)
+
+    def set_stages(self, stages: dict[str, dict]):
+        """{этап: {"seconds", "calls", "rows"}} - как ParseProfiler.stage_totals()"""
+        self.stages = dict(stages)
+
+    def __enter__(self):
+        self.started_at = datetime.now()
+        self.started = time.perf_counter()
+        self._sampler.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self.started
+        peak_rss = self._sampler.stop()
+        try:
+            self._save(seconds, peak_rss, "error" if exc_type else "ok")
+        except Exception as e:
+            log.warning("Не удалось сохранить историю запуска: %s", e)
+        return False
+
+    def _save(self, seconds: float, peak_rss: int | None, status: str):
+        import crud
+        from models import Run, RunStage
+
+        if status == "ok":
+            history = crud.get_stage_history(self.kind, self.mode, ROLLING_RUNS)
+            self.warnings = slow_stages(self.stages, history)
+        run = Run(
+            kind=self.kind, mode=self.mode, params=self.params, started_at=self.started_at,
+            seconds=round(seconds, 3), status=status, peak_rss=peak_rss,
+            warnings=self.warnings or None, **self.fields,
+        )
+        stages = [
+            RunStage(stage=stage, seconds=round(data["seconds"], 4), calls=data.get("calls") or 1,
+                     rows=data.get("rows"))
+            for stage, data in self.stages.items()
+        ]
+        self.run_id = crud.add_run(run, stages)
+        for warning in self.warnings:
+            log.warning("⚠️ Этап %s: %.1f с, медиана последних запусков на тот же объем %.1f с "
+                        "(медленнее в %.1f раза)",
+                        warning["stage"], warning["seconds"], warning["median"],
+                        warning["seconds"] / warning["median"])
+
+
+def record(kind: str, mode: str, params: dict | None = None) -> RunRecorder:
+    return RunRecorder(kind, mode, params)
@@ -1,7 +1,7 @@
 import imaplib
 import email
+import logging
 import random
-import traceback
 from email.header import decode_header
 import os
 import re
@@ -19,20 +19,48 @@ import ssl
 import settings
 from crud import (add_letter, add_attachment, list_vendors, add_vendor,
                   get_vendor_name_by_id, get_email_filter_by_vendor,
-                  update_letter, delete_attachments_by_letter, list_configs_for_vendor_id, list_letters_email_ids)
+                  update_letter, delete_attachments_by_letter, list_letters_email_ids, resolve_changes)
 from models import Letter, Attachment, Filters
+from models.runs import FETCH
+from utils import run_history
+from utils.db import checkpoint
 from utils.imap import decode_folder_name
+from utils.logs import Lazy
+from utils.metrics import MetricsRegistry, start_run
 from utils.paths import pm
 
+log = logging.getLogger(__name__)
+
+
+def _command_label(command: str, args: tuple) -> str:
+    """Имя команды для метрик: uid FETCH различается по запрашиваемой части письма"""
+    if command == "uid" and args:
+        name = str(args[0]).upper()
+        if name == "FETCH":
+            return "FETCH_HEADER" if "HEADER" in str(args[-1]).upper() else "FETCH_BODY"
+        return name
+    return command.upper()
+
+
+def _fetched_bytes(msg_data) -> int:
+    """Размер данных в ответе FETCH"""
+    size = 0
+    for item in msg_data or ():
+        if isinstance(item, tuple) and len(item) > 1 and isinstance(item[1], bytes):
+            size += len(item[1])
+    return size
+
 
 class ThreadSafeIMAPConnection:
     """Потокобезопасная обертка для IMAP соединения"""
 
-    def __init__(self, email: str, password: str, imap_server: str = "imap.yandex.ru", port: int = 993):
+    def __init__(self, email: str, password: str, imap_server: str = "imap.yandex.ru", port: int = 993,
+                 metrics: MetricsRegistry | None = None):
         self.email = email
         self.password = password
         self.imap_server = imap_server
         self.port = port
+        self.metrics = metrics or MetricsRegistry()
         self._lock = threading.RLock()
         self._connection = None
         self.connected = False
@@ -54,24 +82,25 @@ class ThreadSafeIMAPConnection:
                 return True
 
             try:
-                print(f"🔄 Устанавливаем соединение с {self.imap_server}...")
+                log.debug("🔄 Устанавливаем соединение с %s...", self.imap_server)
                 # Создаем SSL контекст без проверки сертификата
                 ssl_context = ssl.create_default_context()
                 ssl_context.check_hostname = False
                 ssl_context.verify_mode = ssl.CERT_NONE
 
-                self._connection = imaplib.IMAP4_SSL(
-                    self.imap_server,
-                    self.port,
-                    ssl_context=ssl_context
-                )
-                self._connection.login(self.email, self.password)
+                with self.metrics.timer("imap_command_seconds", "IMAP command latency", command="LOGIN"):
+                    self._connection = imaplib.IMAP4_SSL(
+                        self.imap_server,
+                        self.port,
+                        ssl_context=ssl_context
+                    )
+                    self._connection.login(self.email, self.password)
                 self.connected = True
                 self.last_activity = time.time()
-                print(f"✅ Успешное подключение к {self.email}")
+                log.debug("✅ Успешное подключение к %s", self.email)
                 return True
             except Exception as e:
-                print(f"❌ Ошибка подключения: {e}")
+                log.error("❌ Ошибка подключения: %s", e)
                 self.connected = False
                 self._connection = None
                 return False
@@ -93,13 +122,17 @@ class ThreadSafeIMAPConnection:
             if not self.connected:
                 raise Exception("Соединение не установлено")
 
+            label = _command_label(command, args)
             try:
                 self.last_activity = time.time()
-                result = getattr(self._connection, command)(*args)
+                with self.metrics.timer("imap_command_seconds", "IMAP command latency", command=label):
+                    result = getattr(self._connection, command)(*args)
                 self.last_activity = time.time()
+                self._count_bytes(label, result)
                 return result
             except (imaplib.IMAP4.abort, ssl.SSLError, ConnectionError) as e:
-                print(f"🔌 Потеряно соединение, переподключаемся... Ошибка: {e}")
+                log.warning("🔌 Потеряно соединение, переподключаемся... Ошибка: %s", e)
+                self.metrics.inc("imap_reconnects_total", help_text="IMAP reconnects", reason="lost")
                 self.connected = False
                 self._connection = None
                 # Пытаемся переподключиться
@@ -108,14 +141,21 @@ class ThreadSafeIMAPConnection:
                     # Но мы не знаем какая папка была выбрана, поэтому эта ответственность на вызывающей стороне
                     # Просто повторяем команду
                     try:
-                        result = getattr(self._connection, command)(*args)
+                        with self.metrics.timer("imap_command_seconds", "IMAP command latency", command=label):
+                            result = getattr(self._connection, command)(*args)
                         self.last_activity = time.time()
+                        self._count_bytes(label, result)
                         return result
                     except Exception as retry_e:
                         raise Exception(f"Не удалось выполнить команду после переподключения: {retry_e}")
                 else:
                     raise Exception(f"Не удалось переподключиться: {e}")
 
+    def _count_bytes(self, label: str, result):
+        if label.startswith("FETCH"):
+            self.metrics.inc("imap_bytes_downloaded_total", _fetched_bytes(result[1]),
+                             "Bytes received in FETCH responses", command=label)
+
     def is_connection_stale(self, timeout=300):
         """Проверяет, не устарело ли соединение"""
         return time.time() - self.last_activity > timeout
@@ -124,12 +164,14 @@ class ThreadSafeIMAPConnection:
 class ConnectionPool:
     """Пул IMAP соединений для многопоточного доступа"""
 
-    def __init__(self, email: str, password: str, imap_server: str, port: int, max_connections: int = 5):
+    def __init__(self, email: str, password: str, imap_server: str, port: int, max_connections: int = 5,
+                 metrics: MetricsRegistry | None = None):
         self.email = email
         self.password = password
         self.imap_server = imap_server
         self.port = port
         self.max_connections = max_connections
+        self.metrics = metrics or MetricsRegistry()
         self._connections = queue.Queue()
         self._lock = threading.Lock()
         self._created_connections = 0
@@ -142,6 +184,10 @@ class ConnectionPool:
 
     def get_connection(self):
         """Получение соединения из пула"""
+        with self.metrics.timer("pool_wait_seconds", "Time to obtain a connection from the pool"):
+            return self._get_connection()
+
+    def _get_connection(self):
         try:
             # Пытаемся получить существующее соединение
             conn = self._connections.get_nowait()
@@ -150,7 +196,8 @@ class ConnectionPool:
                 return conn
             else:
                 # Переподключаем если соединение разорвано или устарело
-                print("🔌 Соединение устарело или разорвано, переподключаем...")
+                log.debug("🔌 Соединение устарело или разорвано, переподключаем...")
+                self.metrics.inc("imap_reconnects_total", help_text="IMAP reconnects", reason="stale")
                 conn.disconnect()
                 if conn.connect():
                     return conn
@@ -166,14 +213,14 @@ class ConnectionPool:
         with self._lock:
             if self._created_connections < self.max_connections:
                 conn = ThreadSafeIMAPConnection(
-                    self.email, self.password, self.imap_server, self.port
+                    self.email, self.password, self.imap_server, self.port, self.metrics
                 )
                 if conn.connect():
                     self._created_connections += 1
-                    print(f"📡 Создано новое соединение ({self._created_connections}/{self.max_connections})")
+                    log.debug("📡 Создано новое соединение (%s/%s)", self._created_connections, self.max_connections)
                     return conn
             # Ждем доступное соединение
-            print("⏳ Ожидание доступного соединения...")
+            log.debug("⏳ Ожидание доступного соединения...")
             return self._connections.get()
 
     def return_connection(self, conn):
@@ -181,14 +228,14 @@ class ConnectionPool:
         if conn.connected:
             # Проверяем, не устарело ли соединение перед возвратом в пул
             if conn.is_connection_stale():
-                print("🔌 Соединение устарело, закрываем...")
+                log.debug("🔌 Соединение устарело, закрываем...")
                 conn.disconnect()
             else:
                 self._connections.put(conn)
 
     def close_all(self):
         """Закрытие всех соединений"""
-        print("🔒 Закрытие всех соединений...")
+        log.debug("🔒 Закрытие всех соединений...")
         while not self._connections.empty():
             try:
                 conn = self._connections.get_nowait()
@@ -213,7 +260,7 @@ class ProgressTracker:
         """Установка общего количества писем"""
         with self.lock:
             self.total_emails = total
-            print(f"📊 Всего писем для обработки: {total}")
+            log.info("📊 Всего писем для обработки: %s", total)
 
     def increment_processed(self, success: bool = True):
         """Увеличение счетчика обработанных писем"""
@@ -237,10 +284,9 @@ class ProgressTracker:
                     emails_per_second = 0
                     eta = 0
 
-                print(f"📈 Прогресс: {self.processed_emails}/{self.total_emails} "
-                      f"({progress:.1f}%) | Успешно: {self.successful_emails} | "
-                      f"Ошибки: {self.failed_emails} | Скорость: {emails_per_second:.1f} писем/сек | "
-                      f"Осталось: {timedelta(seconds=int(eta))}")
+                log.info("📈 Прогресс: %s/%s (%.1f%%) | Успешно: %s | Ошибки: %s | Скорость: %.1f писем/сек | "
+                         "Осталось: %s", self.processed_emails, self.total_emails, progress, self.successful_emails,
+                         self.failed_emails, emails_per_second, timedelta(seconds=int(eta)))
 
     def get_summary(self):
         """Получение итоговой статистики"""
@@ -259,13 +305,17 @@ class EmailProcessor:
     """Обработчик одного письма"""
 
     def __init__(self, connection_pool: ConnectionPool, email_uid: str, folder: str,
-                 db_scope: List[Filters], vendors: List, progress_tracker: ProgressTracker):
+                 db_scope: List[Filters], vendors: List, progress_tracker: ProgressTracker,
+                 folder_label: str | None = None):
         self.connection_pool = connection_pool
         self.email_uid = email_uid
         self.folder = folder
         self.db_scope = db_scope
         self.vendors = vendors
         self.progress_tracker = progress_tracker
+        self.metrics = connection_pool.metrics
+        # Имя папки в метриках (раскодированное)
+        self.folder_label = folder_label or folder
 
     def process(self) -> Optional[Dict]:
         """Основная логика обработки письма"""
@@ -276,25 +326,28 @@ class EmailProcessor:
                 # Сначала получаем только заголовки для фильтрации
                 email_headers = self.get_email_headers(conn, self.email_uid)
                 if not email_headers:
-                    print(f"❌ Не удалось получить заголовки для письма {self.email_uid}")
+                    log.warning("❌ Не удалось получить заголовки для письма %s", self.email_uid)
                     self.progress_tracker.increment_processed(False)
                     return None
 
                 # Проверяем фильтры на основе заголовков
-                if not self._passes_header_filters(email_headers):
+                passed = self._passes_header_filters(email_headers)
+                self.metrics.inc("filter_checks_total", help_text="Header filter checks",
+                                 result="hit" if passed else "miss")
+                if not passed:
                     #print(f"⏭️ Письмо {self.email_uid} не прошло фильтрацию по заголовкам")
                     self.progress_tracker.increment_processed(False)
                     return None
 
                 # Если прошло фильтрацию - получаем полное содержимое
-                print(f"✅ Письмо {self.email_uid} прошло фильтрацию, получаем содержимое...")
+                log.debug("✅ Письмо %s прошло фильтрацию, получаем содержимое...", self.email_uid)
                 email_info = self.get_full_email_content(conn, self.email_uid, email_headers)
                 if email_info and email_info.get('excel_attachments'):
                     result = self.process_email_content(email_info)
                     self.progress_tracker.increment_processed(result is not None)
                     return result
                 else:
-                    print(f"ℹ️ В письме {self.email_uid} нет Excel вложений")
+                    log.debug("ℹ️ В письме %s нет Excel вложений", self.email_uid)
                     self.progress_tracker.increment_processed(False)
                     return None
 
@@ -303,7 +356,7 @@ class EmailProcessor:
                 self.connection_pool.return_connection(conn)
 
         except Exception as e:
-            print(f"❌ Ошибка обработки письма {self.email_uid}: {e}")
+            log.error("❌ Ошибка обработки письма %s: %s", self.email_uid, e)
             self.progress_tracker.increment_processed(False)
 
         return None
@@ -318,6 +371,7 @@ class EmailProcessor:
             status, msg_data = conn.execute('uid', 'FETCH', email_uid, "(BODY.PEEK[HEADER])")
             if status != "OK":
                 return None
+            self._count_folder_bytes(msg_data)
 
             email_headers = msg_data[0][1]
             msg = email.message_from_bytes(email_headers)
@@ -340,7 +394,7 @@ class EmailProcessor:
                 )
                 add_letter(letter)
             except Exception as e:
-                print(f"❌ Ошибка при обработке письма {email_uid}: {e}")
+                log.error("❌ Ошибка при обработке письма %s: %s", email_uid, e)
             return {
                 'uid': email_uid,
                 'subject': subject,
@@ -350,9 +404,13 @@ class EmailProcessor:
             }
 
         except Exception as e:
-            print(f"❌ Ошибка получения заголовков письма {email_uid}: {e}")
+            log.error("❌ Ошибка получения заголовков письма %s: %s", email_uid, e)
             return None
 
+    def _count_folder_bytes(self, msg_data):
+        self.metrics.inc("folder_bytes_total", _fetched_bytes(msg_data), "Bytes fetched per folder",
+                         folder=self.folder_label)
+
     def _passes_header_filters(self, email_headers: Dict) -> bool:
         """Проверка письма по фильтрам на основе заголовков"""
         raw_from = email_headers['from'].strip()
@@ -386,6 +444,7 @@ class EmailProcessor:
             status, msg_data = conn.execute('uid', 'FETCH', email_uid, "(BODY.PEEK[])")
             if status != "OK":
                 return {}
+            self._count_folder_bytes(msg_data)
 
             email_body = msg_data[0][1]
             msg = email.message_from_bytes(email_body)
@@ -406,7 +465,7 @@ class EmailProcessor:
             return email_info
 
         except Exception as e:
-            print(f"❌ Ошибка получения полного содержимого письма {email_uid}: {e}")
+            log.error("❌ Ошибка получения полного содержимого письма %s: %s", email_uid, e)
             return {}
 
     def _process_email_content(self, msg) -> Dict:
@@ -485,7 +544,7 @@ class EmailProcessor:
             return payload.decode('utf-8', errors='replace')
 
         except Exception as e:
-            print(f"❌ Ошибка декодирования payload: {e}")
+            log.warning("❌ Ошибка декодирования payload: %s", e)
             return ""
 
     def _decode_header(self, header) -> str:
@@ -512,7 +571,7 @@ class EmailProcessor:
 
             return decoded_header
         except Exception as e:
-            print(f"❌ Ошибка декодирования заголовка: {e}")
+            log.warning("❌ Ошибка декодирования заголовка: %s", e)
             return str(header) if header else ""
 
     def process_email_content(self, email_info: Dict) -> Optional[Dict]:
@@ -620,7 +679,7 @@ class EmailProcessor:
                 downloaded_files.append(filepath)
 
             except Exception as e:
-                print(f"❌ Ошибка скачивания Excel файла {filename}: {e}")
+                log.error("❌ Ошибка скачивания Excel файла %s: %s", filename, e)
 
         return downloaded_files
 
@@ -674,7 +733,7 @@ class EmailProcessor:
                 add_attachment(attachment)
 
         except Exception as e:
-            print(f"❌ Ошибка сохранения в БД для письма {email_info['uid']}: {e}")
+            log.error("❌ Ошибка сохранения в БД для письма %s: %s", email_info['uid'], e)
 
 
 class FolderScanner:
@@ -689,19 +748,22 @@ class FolderScanner:
         self.criteria = criteria
         self.progress_tracker = progress_tracker
         self.emails_to_pass = emails_to_pass
+        self.metrics = connection_pool.metrics
 
     def scan_folder(self) -> List[Dict]:
         """Сканирование папки и обработка писем"""
-        print(f"📁 Начинаем сканирование папки: {decode_folder_name(self.folder_name)}")
+        started = time.perf_counter()
+        folder_label = decode_folder_name(self.folder_name)
+        log.debug("📁 Начинаем сканирование папки: %s", Lazy(decode_folder_name, self.folder_name))
 
         try:
             # Получаем UID писем в папке
             email_uids = self.get_email_uids()
             if not email_uids:
-                print(f"ℹ️ В папке {decode_folder_name(self.folder_name)} нет писем для обработки")
+                log.debug("ℹ️ В папке %s нет писем для обработки", Lazy(decode_folder_name, self.folder_name))
                 return []
 
-            print(f"🔍 Найдено {len(email_uids)} писем в папке {decode_folder_name(self.folder_name)}")
+            log.info("🔍 Найдено %s писем в папке %s", len(email_uids), Lazy(decode_folder_name, self.folder_name))
 
             # Обрабатываем письма в пуле потоков
             results = []
@@ -711,7 +773,7 @@ class FolderScanner:
                 for email_uid in email_uids:
                     processor = EmailProcessor(
                         self.connection_pool, email_uid, self.folder_name,
-                        self.db_scope, self.vendors, self.progress_tracker
+                        self.db_scope, self.vendors, self.progress_tracker, folder_label
                     )
                     future = executor.submit(processor.process)
                     future_to_email[future] = email_uid
@@ -724,13 +786,16 @@ class FolderScanner:
                             results.append(result)
                     except Exception as e:
                         email_uid = future_to_email[future]
-                        print(f"❌ Ошибка обработки письма {email_uid}: {e}")
+                        log.error("❌ Ошибка обработки письма %s: %s", email_uid, e)
 
+            self.metrics.inc("folder_emails_total", len(email_uids), "Emails processed per folder",
+                             folder=folder_label)
+            self.metrics.set("folder_scan_seconds", time.perf_counter() - started, "Folder scan duration",
+                             folder=folder_label)
             return results
 
         except Exception as e:
-            print(f"❌ Ошибка сканирования папки {decode_folder_name(self.folder_name)}: {e}")
-            traceback.print_exc()
+            log.exception("❌ Ошибка сканирования папки %s: %s", Lazy(decode_folder_name, self.folder_name), e)
             return []
 
     def get_email_uids(self) -> List[str]:
@@ -755,7 +820,7 @@ class FolderScanner:
             finally:
                 self.connection_pool.return_connection(conn)
         except Exception as e:
-            print(f"❌ Ошибка поиска писем в папке {self.folder_name}: {e}")
+            log.error("❌ Ошибка поиска писем в папке %s: %s", self.folder_name, e)
         return []
 
 
@@ -774,6 +839,7 @@ class OptimizedYandexIMAPClient:
         self.connection_pool = None
         self.vendors = list_vendors()
         self.progress_tracker = ProgressTracker()
+        self.metrics = MetricsRegistry()
         self.emails_to_pass = []
 
     def set_credentials(self, email: str, password: str, server: str = "imap.yandex.ru", port: int = 993):
@@ -786,63 +852,69 @@ class OptimizedYandexIMAPClient:
         self.exluded_folders = folders
 
     def set_emails_to_pass(self):
-        vendor_list = []
-        for vendor in self.vendors:
-            not_this = False
-            email_filter = get_email_filter_by_vendor(vendor.id)
-            try:
-                with open(Path(pm.get_user_data() / f"v{email_filter.id}"), 'r') as f:
-                    dt = datetime.fromisoformat(f.read())
-            except:
-                dt = vendor.last_load - timedelta(days=10)
-                with open(Path(pm.get_user_data() / f"v{email_filter.id}"), 'w') as f:
-                    f.write(dt.isoformat())
-            if dt >= vendor.last_load:
-                not_this = True
-            configs = list_configs_for_vendor_id(vendor_id=vendor.id)
-            for config in configs:
-                try:
-                    with open(Path(pm.get_user_data() / str(config.id)), 'r') as f:
-                        dt = datetime.fromisoformat(f.read())
-                except:
-                    dt = vendor.last_load - timedelta(days=10)
-                    with open(Path(pm.get_user_data() / str(config.id)), 'w') as f:
-                        f.write(dt.isoformat())
-                if dt >= vendor.last_load:
-                    continue
-            if not not_this:
-                vendor_list.append(vendor.id)
-        self.emails_to_pass = list_letters_email_ids(vendor_list)
+        """
+        Уже сохраненные письма пропускаются при сканировании,
+        кроме поставщиков, правило фильтрации которых изменилось после последней загрузки.
+        Изменения конфигураций повторного сканирования не требуют - такие вложения
+        разбираются заново из сохраненных файлов.
+        """
+        changes = resolve_changes()
+        if changes.refetch_vendor_ids:
+            log.info("🔁 Правила изменены, повторное сканирование поставщиков: %s", len(changes.refetch_vendor_ids))
+        vendor_list = [vendor.id for vendor in self.vendors if vendor.id not in changes.refetch_vendor_ids]
+        self.emails_to_pass = list_letters_email_ids(vendor_list) if vendor_list else []
 
     def get_all_prices(self, limit_by_folder=None, days=None, since_date=None,
                        before_date=None, folder="attachments", unread_only=False,
                        simple_scope: Filters = None, max_folder_workers: int = 10):
-        """Многопоточное получение всех прайсов"""
+        """Многопоточное получение всех прайсов; запуск записывается в историю (utils.run_history)"""
+        if limit_by_folder:
+            mode = "limit"
+        else:
+            mode = "period" if since_date else "depth"
+        params = {"days": days, "since": since_date, "until": before_date, "limit_by_folder": limit_by_folder,
+                  "unread_only": unread_only, "workers": max_folder_workers}
+        with run_history.record(FETCH, mode, params) as run:
+            results = self._get_all_prices(limit_by_folder, days, since_date, before_date, unread_only,
+                                           simple_scope, max_folder_workers)
+            summary = self.progress_tracker.get_summary()
+            run.set_stages(run_history.stages_from_metrics(self.metrics.snapshot()))
+            run.update(
+                emails_scanned=summary["processed"],
+                emails_matched=int(self.metrics.value("filter_checks_total", result="hit")),
+                bytes_fetched=int(self.metrics.total("imap_bytes_downloaded_total")),
+            )
+        return results
+
+    def _get_all_prices(self, limit_by_folder, days, since_date, before_date, unread_only,
+                        simple_scope: Filters | None, max_folder_workers: int):
         self.progress_tracker = ProgressTracker()
-        print("🚀 Запуск многопоточного сканирования писем...")
+        self.metrics = start_run()
+        log.info("🚀 Запуск многопоточного сканирования писем...")
 
         # Настройка области поиска
         db_scope = self._setup_scope(simple_scope)
         if not db_scope:
-            print("❌ Нет активных правил фильтрации для сканирования")
+            log.warning("❌ Нет активных правил фильтрации для сканирования")
             return []
 
-        print(f"📋 Активные правила фильтрации: {len(db_scope)}")
+        log.info("📋 Активные правила фильтрации: %s", len(db_scope))
 
         # Создаем пул соединений
         self.connection_pool = ConnectionPool(
             self.email, self.password, self.imap_server, self.port,
-            max_connections=max_folder_workers * 2
+            max_connections=max_folder_workers * 2,
+            metrics=self.metrics
         )
         self.set_emails_to_pass()
         try:
             # Получаем список папок
             folders = self.get_available_folders()
             if not folders:
-                print("❌ Не найдено папок для сканирования")
+                log.warning("❌ Не найдено папок для сканирования")
                 return []
 
-            print(f"📂 Найдено {len(folders)} папок для сканирования")
+            log.info("📂 Найдено %s папок для сканирования", len(folders))
 
             # ИЗМЕНЕНИЕ ЗДЕСЬ: Определяем критерии поиска в зависимости от стратегии
             if limit_by_folder:
@@ -853,7 +925,7 @@ class OptimizedYandexIMAPClient:
                     before_date=None,
                     unread_only=unread_only
                 )
-                print(f"🔍 Стратегия LIMIT: сканируем только последние 30 дней")
+                log.info("🔍 Стратегия LIMIT: сканируем только последние 30 дней")
             else:
                 # Обычная стратегия - используем переданные параметры
                 search_criteria = self._build_search_criteria(
@@ -864,19 +936,19 @@ class OptimizedYandexIMAPClient:
                 )
 
             # Сначала собираем все UID писем для подсчета общего количества
-            print("🔍 Подсчет общего количества писем...")
+            log.info("🔍 Подсчет общего количества писем...")
             all_email_uids = []
             for folder_name in folders:
                 scanner = FolderScanner(self.connection_pool, folder_name, db_scope, self.vendors, search_criteria, emails_to_pass=self.emails_to_pass)
                 folder_uids = scanner.get_email_uids()
                 all_email_uids.extend(folder_uids)
-                print(f"   {decode_folder_name(folder_name)}: {len(folder_uids)} писем")
+                log.debug("   %s: %s писем", Lazy(decode_folder_name, folder_name), len(folder_uids))
 
             total_emails = len(all_email_uids)
             self.progress_tracker.set_total(total_emails)
 
             if total_emails == 0:
-                print("ℹ️ Нет писем для обработки")
+                log.info("ℹ️ Нет писем для обработки")
                 return []
 
             # Сканируем папки в пуле потоков
@@ -900,33 +972,43 @@ class OptimizedYandexIMAPClient:
                     try:
                         folder_results = future.result()
                         all_results.extend(folder_results)
-                        print(
-                            f"✅ [{completed}/{len(folders)}] Завершено сканирование папки {decode_folder_name(folder_name)}: найдено {len(folder_results)} писем")
+                        log.info("✅ [%s/%s] Завершено сканирование папки %s: найдено %s писем", completed, len(folders),
+                                 Lazy(decode_folder_name, folder_name), len(folder_results))
                     except Exception as e:
                         folder_name = future_to_folder[future]
-                        print(f"❌ [{completed}/{len(folders)}] Ошибка сканирования папки {decode_folder_name(folder_name)}: {e}")
+                        log.error("❌ [%s/%s] Ошибка сканирования папки %s: %s", completed, len(folders),
+                                  Lazy(decode_folder_name, folder_name), e)
 
             # Выводим итоговую статистику
             summary = self.progress_tracker.get_summary()
-            print(f"\n🎉 СКАНИРОВАНИЕ ЗАВЕРШЕНО!")
-            print(f"📊 ИТОГИ:")
-            print(f"   Всего писем: {summary['total']}")
-            print(f"   Обработано: {summary['processed']}")
-            print(f"   Успешно: {summary['successful']}")
-            print(f"   Ошибки: {summary['failed']}")
-            print(f"   Затрачено времени: {timedelta(seconds=int(summary['elapsed_seconds']))}")
-            print(f"   Скорость: {summary['emails_per_second']:.1f} писем/сек")
-            print(f"   Найдено писем с Excel: {len(all_results)}")
+            log.info(
+                "🎉 СКАНИРОВАНИЕ ЗАВЕРШЕНО!\n📊 ИТОГИ:\n   Всего писем: %s\n   Обработано: %s\n   Успешно: %s\n"
+                "   Ошибки: %s\n   Затрачено времени: %s\n   Скорость: %.1f писем/сек\n   Найдено писем с Excel: %s",
+                summary['total'], summary['processed'], summary['successful'], summary['failed'],
+                timedelta(seconds=int(summary['elapsed_seconds'])), summary['emails_per_second'], len(all_results),
+                extra={"summary": summary},
+            )
 
             return self._format_results(all_results)
 
         except Exception as e:
-            print(f"💥 Критическая ошибка при обработке писем: {e}")
-            traceback.print_exc()
+            log.exception("💥 Критическая ошибка при обработке писем: %s", e)
             return []
         finally:
             if self.connection_pool:
                 self.connection_pool.close_all()
+            self._export_metrics()
+            # Письма записывались множеством мелких транзакций - переносим WAL в БД
+            checkpoint()
+
+    def _export_metrics(self):
+        """Метрики загрузки - в журнал и в файлы ingest_metrics.json / ingest_metrics.prom (pm.get_logs())"""
+        log.info("📊 %s", self.metrics.status_line())
+        try:
+            json_path, prom_path = self.metrics.export(pm.get_logs())
+            log.debug("Метрики сохранены: %s, %s", json_path, prom_path)
+        except OSError as e:
+            log.warning("Не удалось сохранить метрики: %s", e)
 
     def get_available_folders(self) -> List[str]:
         """Получение списка доступных папок"""
@@ -950,7 +1032,7 @@ class OptimizedYandexIMAPClient:
             finally:
                 self.connection_pool.return_connection(conn)
         except Exception as e:
-            print(f"❌ Ошибка получения списка папок: {e}")
+            log.error("❌ Ошибка получения списка папок: %s", e)
         return []
 
     def _setup_scope(self, simple_scope: Filters = None) -> List[Filters]:
@@ -1021,18 +1103,45 @@ class OptimizedYandexIMAPClient:
         return out
 
 
-# Создание клиента с настройками
-s = settings.get_settings()
-client = OptimizedYandexIMAPClient(
-    s.get('email_username'),
-    s.get('email_password'),
-    s.get('email_server', 'imap.yandex.ru'),
-    int(s.get('email_port', 993))
-)
+_client: OptimizedYandexIMAPClient | None = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> OptimizedYandexIMAPClient:
+    """Клиент с настройками почты из БД; создается при первом обращении"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            s = settings.get_settings()
+            _client = OptimizedYandexIMAPClient(
+                s.get('email_username'),
+                s.get('email_password'),
+                s.get('email_server', 'imap.yandex.ru'),
+                int(s.get('email_port', 993))
+            )
+        return _client
+
+
+def reset_client():
+    """Сбрасывает клиента: следующий get_client() прочитает настройки почты заново"""
+    global _client
+    with _client_lock:
+        _client = None
+
+
+def __getattr__(name):
+    # ya_client.client - прежнее имя глобального клиента
+    if name == "client":
+        return get_client()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 if __name__ == '__main__':
-    results = client.get_all_prices(
+    from utils.logs import setup_logging
+
+    setup_logging()
+    results = get_client().get_all_prices(
         days=30,
         max_folder_workers=2
     )
-    print(f"🎊 Обработка завершена! Результатов: {len(results)}")
\ No newline at end of file
+    log.info("🎊 Обработка завершена! Результатов: %s", len(results))
\ No newline at end of file